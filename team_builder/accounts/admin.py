@@ -5,6 +5,15 @@ from . import models
 admin.site.register(models.AuthenticationToken)
 
 
+class AvatarJobAdmin(admin.ModelAdmin):
+    """The admin page for the avatar queue"""
+    list_display = ('user', 'avatar_name', 'status', 'attempts', 'created_at')
+    list_filter = ('status',)
+
+
+admin.site.register(models.AvatarJob, AvatarJobAdmin)
+
+
 class UserAdmin(admin.ModelAdmin):
     """The admin page for the custom user model"""
     fields = (
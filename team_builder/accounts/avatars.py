@@ -0,0 +1,367 @@
+"""
+Shrinks uploaded avatars in a background worker.
+
+User.save() queues an AvatarJob for every new avatar, so the upload
+request never opens the image. The process_avatars command claims jobs
+one at a time, shrinks avatars larger than AVATAR_MAX_SIZE and swaps the
+result in for the original, which is shown until then. It also makes a
+smaller copy for each of AVATAR_VARIANT_SIZES, so pages showing a small
+avatar don't download the large one (see the {% avatar %} tag).
+
+JPEGs stay JPEGs and are decoded at a reduced size, other formats become
+PNGs. The size of the avatar is stored on the user, so nothing has to open
+the file to find it.
+
+Avatars are named after the hash of their content (see storage.py), so
+users can share a file. Files are only deleted once no user or queued job
+has them, and the cleanup_avatars command removes any that were missed.
+Files are written first, and the avatar is only locked while a user is
+given it or it is deleted (see AvatarFile), so an upload of the same
+image can't reuse a file that is being deleted.
+
+Jobs are claimed with a conditional UPDATE, so any number of workers can
+run. A job whose worker died is queued again after STALE_JOB_TIMEOUT, and
+a job that failed MAX_ATTEMPTS times is left as failed.
+"""
+
+import datetime
+import os
+from io import BytesIO
+
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.db.models import F
+from django.utils import timezone
+
+from PIL import Image
+
+from .models import AvatarFile, AvatarJob
+from .storage import content_file_name
+
+# Avatars larger than this are shrunk to fit, keeping their aspect ratio
+AVATAR_MAX_SIZE = (500, 500)
+
+# The sizes, in pixels, of the smaller copies made of every avatar
+AVATAR_VARIANT_SIZES = (64, 128)
+
+# The quality shrunk JPEGs are saved with
+JPEG_QUALITY = 85
+
+# How many times a job is tried before it is left as failed
+MAX_ATTEMPTS = 3
+
+# How long a job may run before its worker is presumed dead
+STALE_JOB_TIMEOUT = datetime.timedelta(minutes=10)
+
+# The folder of the smaller copies, uploads are saved in 'avatars'
+VARIANT_FOLDER = 'avatar_variants'
+
+
+def requeue_stale_jobs() -> int:
+    """
+    Queues the jobs of workers that died again, or fails them if they
+    were already tried MAX_ATTEMPTS times
+
+    :return: How many jobs were queued again
+    """
+    stale = AvatarJob.objects.filter(
+        status=AvatarJob.RUNNING,
+        started_at__lt=timezone.now() - STALE_JOB_TIMEOUT,
+    )
+    stale.filter(attempts__gte=MAX_ATTEMPTS).update(
+        status=AvatarJob.FAILED, error='The worker stopped responding',
+        finished_at=timezone.now(),
+    )
+    return stale.update(status=AvatarJob.PENDING)
+
+
+def claim_job():
+    """
+    Claims the oldest pending job. The UPDATE only succeeds for one
+    worker, the others move on to the next job.
+
+    :return: A running AvatarJob, or None if there are no pending jobs
+    """
+    while True:
+        job = AvatarJob.objects.filter(status=AvatarJob.PENDING).first()
+        if job is None:
+            return None
+
+        claimed = AvatarJob.objects.filter(
+            pk=job.pk, status=AvatarJob.PENDING
+        ).update(
+            status=AvatarJob.RUNNING, started_at=timezone.now(),
+            attempts=F('attempts') + 1,
+        )
+        if claimed:
+            job.refresh_from_db()
+            return job
+
+
+def shrink_avatar(image, max_size: tuple):
+    """
+    Shrinks an image to fit in max_size
+
+    :param image: A Pillow Image, which isn't changed
+    :param max_size: A (width, height) tuple
+    :return: A smaller Image, or None if the image was small enough
+    """
+    if image.width <= max_size[0] and image.height <= max_size[1]:
+        return None
+
+    image = image.copy()
+    image.thumbnail(max_size)
+    return image
+
+
+def image_format(name: str) -> str:
+    """
+    Gets the format an avatar file is saved in, from its name
+
+    :param name: The name of the file
+    :return: 'JPEG' or 'PNG'
+    """
+    return 'JPEG' if name.lower().endswith(('.jpg', '.jpeg')) else 'PNG'
+
+
+def encode_image(image, file_format: str) -> ContentFile:
+    """
+    Saves an image to a file
+
+    :param image: A Pillow Image
+    :param file_format: 'JPEG' or 'PNG'
+    :return: A ContentFile
+    """
+    options = {}
+    if file_format == 'JPEG':
+        options['quality'] = JPEG_QUALITY
+        # JPEGs have no transparency or palette
+        if image.mode not in ('RGB', 'L'):
+            image = image.convert('RGB')
+
+    file = BytesIO()
+    image.save(file, format=file_format, **options)
+    return ContentFile(file.getvalue())
+
+
+def variant_name(avatar_name: str, size: int) -> str:
+    """
+    Gets the file name of an avatar's smaller copy. They are kept in their
+    own folder, which uploads can't be saved to.
+
+    :param avatar_name: The name of the avatar file
+    :param size: One of AVATAR_VARIANT_SIZES
+    :return: The file name of the copy
+    """
+    extension = 'jpg' if image_format(avatar_name) == 'JPEG' else 'png'
+    # Avatar names are unique, 'a.jpg' and 'a.png' make different copies
+    return '{}/{}.{}.{}'.format(
+        VARIANT_FOLDER, os.path.basename(avatar_name), size, extension
+    )
+
+
+def _variant_width(user, size: int) -> int:
+    """Gets the width of a smaller copy, from the size of the avatar"""
+    if not (user.avatar_width and user.avatar_height):
+        return size
+
+    scale = min(size / user.avatar_width, size / user.avatar_height)
+    return max(round(user.avatar_width * scale), 1)
+
+
+def avatar_sources(user) -> list:
+    """
+    Gets the urls of a user's avatar and its smaller copies
+
+    :param user: A User with an avatar
+    :return: A list of (url, width) tuples, smallest first
+    """
+    storage = user.avatar.storage
+    sources = [
+        (storage.url(variant_name(user.avatar.name, int(size))),
+         _variant_width(user, int(size)))
+        for size in user.avatar_variants.split(',') if size
+    ]
+    # Avatars the worker hasn't processed yet have no stored size
+    sources.append(
+        (user.avatar.url, user.avatar_width or AVATAR_MAX_SIZE[0])
+    )
+    return sources
+
+
+def delete_if_unused(storage, avatar_name: str, job=None) -> bool:
+    """
+    Deletes an avatar file and its smaller copies, unless a user or a
+    queued job still has it
+
+    :param storage: The storage of the avatar field
+    :param avatar_name: The name of the avatar file
+    :param job: The job calling this, which doesn't count
+    :return: True if the files were deleted
+    """
+    jobs = AvatarJob.objects.filter(
+        avatar_name=avatar_name,
+        status__in=[AvatarJob.PENDING, AvatarJob.RUNNING],
+    )
+    if job is not None:
+        jobs = jobs.exclude(pk=job.pk)
+
+    # Checked and deleted under the lock, or an upload of the same image
+    # could reuse the file in between
+    with AvatarFile.lock(avatar_name):
+        if get_user_model().objects.filter(avatar=avatar_name).exists() \
+                or jobs.exists():
+            return False
+
+        storage.delete(avatar_name)
+        for size in AVATAR_VARIANT_SIZES:
+            storage.delete(variant_name(avatar_name, size))
+        AvatarFile.objects.filter(name=avatar_name).delete()
+    return True
+
+
+def _avatar_of_variant(variant: str) -> str:
+    """Gets the name of the avatar file a smaller copy was made from"""
+    # Copies are named like 'avatar_variants/<avatar file>.64.jpg'
+    upload_folder = get_user_model()._meta.get_field('avatar').upload_to
+    return '{}/{}'.format(
+        upload_folder, os.path.basename(variant).rsplit('.', 2)[0]
+    )
+
+
+def orphaned_files(storage, min_age: datetime.timedelta) -> list:
+    """
+    Finds the avatar files no user or queued job has, or that only their
+    smaller copies are left of
+
+    :param storage: The storage of the avatar field
+    :param min_age: Newer files are left alone, their user may not have
+    been saved yet
+    :return: A sorted list of avatar file names, to pass to
+    delete_if_unused, which checks them again under a lock
+    """
+    in_use = set(
+        get_user_model().objects.exclude(avatar='').exclude(avatar=None)
+        .values_list('avatar', flat=True)
+    )
+    in_use.update(AvatarJob.objects.filter(
+        status__in=[AvatarJob.PENDING, AvatarJob.RUNNING]
+    ).values_list('avatar_name', flat=True))
+
+    upload_folder = get_user_model()._meta.get_field('avatar').upload_to
+    oldest_new_file = timezone.now() - min_age
+    orphans = set()
+    for folder in (upload_folder, VARIANT_FOLDER):
+        try:
+            file_names = storage.listdir(folder)[1]
+        except FileNotFoundError:
+            continue
+
+        for file_name in file_names:
+            name = '{}/{}'.format(folder, file_name)
+            avatar_name = name
+            if folder == VARIANT_FOLDER:
+                avatar_name = _avatar_of_variant(name)
+            if avatar_name not in in_use and \
+                    storage.get_modified_time(name) < oldest_new_file:
+                orphans.add(avatar_name)
+    return sorted(orphans)
+
+
+def _avatar_is_current(job) -> bool:
+    """Checks if the user still has the avatar the job was queued for"""
+    return get_user_model().objects.filter(
+        pk=job.user_id, avatar=job.avatar_name
+    ).exists()
+
+
+def process_avatar(job) -> None:
+    """
+    Shrinks the avatar of a job, makes its smaller copies and swaps them
+    in for the original. Jobs for an avatar the user has replaced since
+    are skipped.
+
+    :param job: A running AvatarJob
+    """
+    if not _avatar_is_current(job):
+        return
+
+    avatar = job.user.avatar
+    storage = avatar.storage
+    with storage.open(job.avatar_name) as file:
+        # Only the header is read until load()
+        image = Image.open(file)
+        source_format = image.format
+        # Large JPEGs are decoded at a half, quarter or eighth of their size,
+        # as long as that is still larger than AVATAR_MAX_SIZE
+        if source_format == 'JPEG':
+            image.draft(image.mode, AVATAR_MAX_SIZE)
+        image.load()
+
+    name = job.avatar_name
+    # The files are written before the avatar is locked
+    files = {}
+    shrunk = shrink_avatar(image, AVATAR_MAX_SIZE)
+    if shrunk is not None:
+        image = shrunk
+        extension = '.jpg' if source_format == 'JPEG' else '.png'
+        shrunk = encode_image(image, image_format(extension))
+        name = content_file_name(avatar.field, job.user, shrunk, extension)
+        files[name] = shrunk
+
+    sizes = []
+    for size in AVATAR_VARIANT_SIZES:
+        variant = shrink_avatar(image, (size, size))
+        # Small avatars are their own small copy
+        if variant is None:
+            continue
+
+        # Copies are named after their avatar, so a stored one is the same
+        files[variant_name(name, size)] = encode_image(
+            variant, image_format(variant_name(name, size))
+        )
+        sizes.append(str(size))
+
+    with AvatarFile.lock_stored(storage, name, files):
+        user = get_user_model().objects.select_for_update().get(
+            pk=job.user_id
+        )
+        # Another avatar was uploaded while this one was processed
+        replaced = user.avatar.name != job.avatar_name
+        if not replaced:
+            user.avatar = name
+            user.avatar_variants = ','.join(sizes)
+            user.avatar_width, user.avatar_height = image.size
+            user.save(update_fields=[
+                'avatar', 'avatar_variants', 'avatar_width', 'avatar_height',
+                'updated_at',
+            ])
+
+    if replaced:
+        delete_if_unused(storage, name, job)
+    if name != job.avatar_name:
+        delete_if_unused(storage, job.avatar_name, job)
+
+
+def run_job(job) -> None:
+    """
+    Runs a claimed job and records how it went. Failed jobs are queued
+    again until they were tried MAX_ATTEMPTS times.
+
+    :param job: A running AvatarJob
+    """
+    try:
+        process_avatar(job)
+    except Exception as error:
+        job.error = '{}: {}'.format(type(error).__name__, error)
+        if job.attempts >= MAX_ATTEMPTS:
+            job.status = AvatarJob.FAILED
+            job.finished_at = timezone.now()
+        else:
+            job.status = AvatarJob.PENDING
+    else:
+        job.status = AvatarJob.DONE
+        job.error = ''
+        job.finished_at = timezone.now()
+
+    job.save(update_fields=['status', 'error', 'finished_at'])
@@ -0,0 +1,43 @@
+import datetime
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+
+from accounts import avatars
+
+
+class Command(BaseCommand):
+    """
+    Deletes avatar files no user has anymore, like the originals of shrunk
+    avatars a worker didn't get to delete, with their smaller copies. See
+    accounts/avatars.py.
+    """
+    help = 'Deletes avatars and avatar copies that no user has'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--min-age', type=float, default=1,
+            help='Only deletes files older than this many hours (default 1)'
+        )
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Lists the files, without deleting them'
+        )
+
+    def handle(self, *args, **options):
+        storage = get_user_model()._meta.get_field('avatar').storage
+        orphans = avatars.orphaned_files(
+            storage, datetime.timedelta(hours=options['min_age'])
+        )
+
+        deleted = 0
+        for name in orphans:
+            # Files that were reused in the meantime are kept
+            if options['dry_run'] \
+                    or avatars.delete_if_unused(storage, name):
+                deleted += 1
+                self.stdout.write(name)
+
+        self.stdout.write('{} {} avatars'.format(
+            'Found' if options['dry_run'] else 'Deleted', deleted
+        ))
@@ -0,0 +1,39 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from accounts import avatars
+
+
+class Command(BaseCommand):
+    """
+    The background worker that shrinks uploaded avatars. Run one or more
+    alongside the web server, see accounts/avatars.py.
+    """
+    help = 'Shrinks the avatars queued by uploads'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once', action='store_true',
+            help='Processes the queued avatars, then stops'
+        )
+        parser.add_argument(
+            '--interval', type=float, default=2,
+            help='How many seconds to wait between checks for new avatars'
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            # A long running worker must not hold on to broken connections
+            close_old_connections()
+            avatars.requeue_stale_jobs()
+
+            job = avatars.claim_job()
+            if job is not None:
+                avatars.run_job(job)
+                self.stdout.write('{}: {}'.format(job, job.error or 'ok'))
+            elif options['once']:
+                return
+            else:
+                time.sleep(options['interval'])
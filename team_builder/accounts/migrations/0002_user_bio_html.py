@@ -0,0 +1,30 @@
+# Generated by Django 2.0.4 on 2026-10-18 09:04
+
+from django.db import migrations, models
+
+# django-markdownx
+from markdownx.utils import markdownify
+
+
+def render_existing_bios(apps, schema_editor):
+    """Renders the Markdown bio of every existing User"""
+    user_model = apps.get_model('accounts', 'User')
+    for pk, bio in user_model.objects.values_list('pk', 'bio').iterator():
+        if bio:
+            user_model.objects.filter(pk=pk).update(bio_html=markdownify(bio))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='bio_html',
+            field=models.TextField(blank=True, editable=False),
+        ),
+        migrations.RunPython(render_existing_bios, migrations.RunPython.noop),
+    ]
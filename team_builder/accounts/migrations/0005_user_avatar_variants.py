@@ -0,0 +1,18 @@
+# Generated by Django 2.0.4 on 2026-10-18 12:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0004_avatarjob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='avatar_variants',
+            field=models.CharField(blank=True, editable=False, max_length=50),
+        ),
+    ]
@@ -1,5 +1,6 @@
 import datetime
-from io import BytesIO
+import os
+from contextlib import contextmanager
 
 from django.conf import settings
 from django.contrib.auth.models import (
@@ -7,15 +8,15 @@ from django.contrib.auth.models import (
     BaseUserManager,
     PermissionsMixin
 )
-from django.core.files.base import ContentFile
-from django.db import models
+from django.db import models, transaction
 from django.utils import timezone
 
-from PIL import Image
-
 # django-markdownx
 from markdownx.models import MarkdownxField
-from markdownx.utils import markdownify
+
+from team_builder.markdown_rendering import RenderedMarkdownMixin
+
+from .storage import content_file_name, save_by_content
 
 
 class UserManager(BaseUserManager):
@@ -48,7 +49,7 @@ class UserManager(BaseUserManager):
         return user
 
 
-class User(AbstractBaseUser, PermissionsMixin):
+class User(RenderedMarkdownMixin, AbstractBaseUser, PermissionsMixin):
     """This is a new default User class"""
     # The following are set/created by the accounts application
     date_joined = models.DateTimeField(default=timezone.now)
@@ -56,10 +57,27 @@ class User(AbstractBaseUser, PermissionsMixin):
     is_active = models.BooleanField(default=False)
     is_staff = models.BooleanField(default=False)
     username = models.CharField(max_length=50, unique=True)
+    # For conditional GETs of the profile and project pages
+    updated_at = models.DateTimeField(auto_now=True)
 
     # These are not set by accounts
-    avatar = models.ImageField(null=True, blank=True)
+    # Named after the hash of their content, see accounts/storage.py
+    avatar = models.ImageField(upload_to='avatars', null=True, blank=True)
+    # The sizes of the smaller copies made of avatar, like '64,128', see
+    # accounts/avatars.py
+    avatar_variants = models.CharField(
+        max_length=50, blank=True, editable=False
+    )
+    # The size of avatar in pixels, set by the avatar worker
+    avatar_width = models.PositiveIntegerField(
+        null=True, blank=True, editable=False
+    )
+    avatar_height = models.PositiveIntegerField(
+        null=True, blank=True, editable=False
+    )
     bio = MarkdownxField(max_length=500, blank=True)
+    # bio rendered as HTML, see RenderedMarkdownMixin
+    bio_html = models.TextField(blank=True, editable=False)
     color = models.CharField(max_length=50, blank=True)
 
     objects = UserManager()
@@ -69,53 +87,140 @@ class User(AbstractBaseUser, PermissionsMixin):
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = ['username']
 
+    markdown_fields = {'bio': 'bio_html'}
+
     def __str__(self):
         return self.username
 
     @property
     def bio_markdown(self):
-        """This allows us to turn self.bio into markdown to send
+        """This sends self.bio, already rendered from markdown,
         to a template for display."""
-        return markdownify(self.bio)
+        return self.bio_html
 
     def save(self, *args, **kwargs):
         """
-        Double checks the size of the avatar. If the image is to big
-        shrink it down below 500x500
+        Queues an AvatarJob when a new avatar is uploaded. The avatar is
+        shown as it was uploaded until the job has shrunk it and made its
+        smaller copies.
         """
+        # A new upload isn't written to storage until the field's pre_save
+        new_avatar = bool(self.avatar) and not self.avatar._committed
+        if not new_avatar:
+            super(User, self).save(*args, **kwargs)
+            return
+
+        # Stored here instead, under the hash of the image, so an image
+        # that is already stored isn't stored again
+        upload = self.avatar
+        field = self._meta.get_field('avatar')
+        self.avatar = content_file_name(
+            field, self, upload, os.path.splitext(upload.name)[1]
+        )
+        # The smaller copies and size are of the old avatar
+        self.avatar_variants = ''
+        self.avatar_width = self.avatar_height = None
 
-        # This function was writen with help in part from this stack overflow
-        # post  (https://stackoverflow.com/questions/22035833/
-        # how-to-go-form-django-image-field-to-pil-image-and-back)
-        super(User, self).save(*args, **kwargs)
+        with AvatarFile.lock_stored(
+                field.storage, self.avatar.name, {self.avatar.name: upload}):
+            super(User, self).save(*args, **kwargs)
+            AvatarJob.objects.create(user=self, avatar_name=self.avatar.name)
+
+
+class AvatarFile(models.Model):
+    """
+    An avatar file in storage. Its row is locked while a user is given the
+    file or it is deleted, so one upload can't reuse a file that is being
+    deleted for no longer having any users, see accounts/avatars.py.
+    """
+    name = models.CharField(max_length=255, unique=True)
+    locked_at = models.DateTimeField(default=timezone.now)
 
-        # Checks if the image is larger than 500 x 500
-        avatar = self.avatar
+    def __str__(self):
+        return self.name
 
-        # If the user does not have an avatar pass
-        try:
-            height = avatar.height
-            width = avatar.width
+    @classmethod
+    @contextmanager
+    def lock(cls, name: str):
+        """
+        Locks an avatar file until the end of the block, which is run in
+        a transaction
 
-        except ValueError:
-            pass
+        :param name: The name of the file
+        """
+        with transaction.atomic():
+            # An UPDATE locks the row on every database, SQLite locks the
+            # whole database. A missing row is created and the UPDATE run
+            # again, another process may have deleted it in the meantime.
+            while not cls.objects.filter(name=name).update(
+                    locked_at=timezone.now()):
+                cls.objects.get_or_create(name=name)
+            yield
+
+    @classmethod
+    @contextmanager
+    def lock_stored(cls, storage, name: str, files: dict):
+        """
+        Stores files, then locks an avatar file until the end of the block
+        once they are all still stored. Writing the files doesn't hold the
+        lock, which holds a write on the database, and files deleted
+        before the lock was taken are stored again.
+
+        :param storage: The storage of the avatar field
+        :param name: The name of the avatar file to lock
+        :param files: A dictionary of file name to Django File, for the
+        avatar and its smaller copies
+        """
+        while True:
+            for file_name, content in files.items():
+                save_by_content(storage, file_name, content)
 
-        else:
-            # If the height or width is lower than 500 we are good
-            if height > 500 or width > 500:
-                # Open the image in Pillow
-                image = Image.open(avatar.open())
+            with cls.lock(name):
+                if all(storage.exists(file_name) for file_name in files):
+                    yield
+                    return
 
-                size = (500, 500)
-                image.thumbnail(size)
 
-                file = BytesIO()
+class AvatarJob(models.Model):
+    """
+    An uploaded avatar waiting to be shrunk by the process_avatars
+    worker, see accounts/avatars.py
+    """
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUS_CHOICES = (
+        (PENDING, 'Pending'),
+        (RUNNING, 'Running'),
+        (DONE, 'Done'),
+        (FAILED, 'Failed'),
+    )
+
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='avatar_jobs'
+    )
+    # The avatar file the job was queued for
+    avatar_name = models.CharField(max_length=255)
+
+    status = models.CharField(
+        max_length=10, choices=STATUS_CHOICES, default=PENDING,
+        db_index=True
+    )
+    attempts = models.PositiveSmallIntegerField(default=0)
+    error = models.TextField(blank=True)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['pk']
 
-                image.save(file, format='png')
-                # This will call this save() method recursively once
-                self.avatar.save(
-                    self.avatar.name, ContentFile(file.getvalue())
-                )
+    def __str__(self):
+        return '{}: {} ({})'.format(self.user, self.avatar_name, self.status)
 
 
 class AuthenticationToken(models.Model):
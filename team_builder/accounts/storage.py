@@ -0,0 +1,50 @@
+"""
+Names avatar files after the SHA-256 hash of their content.
+
+The same image always gets the same name, so an image uploaded again, by
+anyone, is only stored once, and a name never points at different content.
+That lets browsers cache avatars forever, see views.serve_media.
+"""
+
+import hashlib
+
+
+def content_name(content, extension: str) -> str:
+    """
+    Gets the file name of some content
+
+    :param content: A Django File
+    :param extension: The file extension, like '.png'
+    :return: The hash of the content with the extension
+    """
+    content_hash = hashlib.sha256()
+    for chunk in content.chunks():
+        content_hash.update(chunk)
+    content.seek(0)
+    return content_hash.hexdigest() + extension.lower()
+
+
+def content_file_name(field, instance, content, extension: str) -> str:
+    """
+    Gets the name a file is stored under for a FileField
+
+    :param field: The FileField the file is for
+    :param instance: The model instance the file is for
+    :param content: A Django File
+    :param extension: The file extension, like '.png'
+    :return: The folder of the field and the name of the content
+    """
+    return field.generate_filename(instance, content_name(content, extension))
+
+
+def save_by_content(storage, name: str, content) -> None:
+    """
+    Stores a file, unless the same content is already stored. The file
+    could be deleted right after it was found, see AvatarFile.lock_stored.
+
+    :param storage: The storage of the field
+    :param name: The name from content_file_name
+    :param content: A Django File
+    """
+    if not storage.exists(name):
+        storage.save(name, content)
@@ -0,0 +1,33 @@
+from django import template
+from django.utils.html import format_html, format_html_join
+
+from accounts.avatars import avatar_sources
+
+register = template.Library()
+
+
+@register.simple_tag
+def avatar(user, size: int, css_class: str = ''):
+    """
+    Shows a user's avatar, letting the browser pick the smallest copy that
+    looks sharp at the size it is shown
+
+    {% avatar user_profile 240 'circle--primary--avatar' %}
+
+    :param user: A User with an avatar
+    :param size: The width the avatar is shown at, in CSS pixels
+    :param css_class: The class of the img tag
+    :return: An img tag
+    """
+    sources = avatar_sources(user)
+
+    # Browsers without srcset get the smallest copy that is big enough
+    src = next((url for url, width in sources if width >= size),
+               sources[-1][0])
+
+    return format_html(
+        '<img class="{}" src="{}" srcset="{}" sizes="{}px" alt="{}">',
+        css_class, src,
+        format_html_join(', ', '{} {}w', sources),
+        size, user,
+    )
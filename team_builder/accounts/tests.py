@@ -1,10 +1,29 @@
 import datetime
+import shutil
+import tempfile
+from io import BytesIO, StringIO
+from unittest import mock
 
+from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.test import TestCase
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from django.template import Context, Template
+from django.test import RequestFactory, TestCase, override_settings
 from django.urls import reverse
 
+from PIL import Image
+
+from . import avatars
 from . import models
+from . import views
+
+
+def create_image(width: int, height: int) -> ContentFile:
+    """Creates a JPEG image file of the given size"""
+    file = BytesIO()
+    Image.new('RGB', (width, height), 'red').save(file, format='jpeg')
+    return ContentFile(file.getvalue(), name='avatar.jpg')
 
 
 class AccountViewsTests(TestCase):
@@ -57,3 +76,265 @@ class AccountViewsTests(TestCase):
         self.assertTrue(user.is_active)
 
         self.assertEqual(resp.status_code, 302)
+
+
+class AvatarJobTests(TestCase):
+    """Tests the background processing of uploaded avatars"""
+
+    def setUp(self):
+        """Creates a user and keeps uploaded files out of the media folder"""
+        self.media_root = tempfile.mkdtemp()
+        self.media_override = override_settings(MEDIA_ROOT=self.media_root)
+        self.media_override.enable()
+
+        self.user = get_user_model().objects.create_user(
+            'test@test.com', 'user', 'testpass'
+        )
+
+    def tearDown(self):
+        self.media_override.disable()
+        shutil.rmtree(self.media_root)
+
+    def test_upload_queues_job(self):
+        """Ensures an upload is saved as is and queued for the worker"""
+        self.user.avatar = create_image(800, 600)
+        self.user.save()
+
+        self.assertEqual(self.user.avatar.width, 800)
+        job = models.AvatarJob.objects.get()
+        self.assertEqual(job.avatar_name, self.user.avatar.name)
+        self.assertEqual(job.status, models.AvatarJob.PENDING)
+
+        # Saving the user again doesn't queue another job
+        self.user.bio = 'New bio'
+        self.user.save()
+        self.assertEqual(models.AvatarJob.objects.count(), 1)
+
+    def test_worker_shrinks_avatar(self):
+        """Ensures the worker swaps in a shrunk avatar"""
+        # Large enough for the JPEG to be decoded at a reduced size
+        self.user.avatar = create_image(2000, 1500)
+        self.user.save()
+        original = self.user.avatar.name
+
+        call_command('process_avatars', '--once', stdout=StringIO())
+
+        self.user.refresh_from_db()
+        self.assertEqual(
+            (self.user.avatar.width, self.user.avatar.height), (500, 375)
+        )
+        self.assertEqual(
+            (self.user.avatar_width, self.user.avatar_height), (500, 375)
+        )
+        self.assertTrue(self.user.avatar.name.endswith('.jpg'))
+        self.assertFalse(self.user.avatar.storage.exists(original))
+
+        # The smaller copies are made from the same upload
+        self.assertEqual(self.user.avatar_variants, '64,128')
+        storage = self.user.avatar.storage
+        with storage.open(
+                avatars.variant_name(self.user.avatar.name, 64)) as file:
+            variant = Image.open(file)
+            self.assertEqual(
+                (variant.format, variant.size), ('JPEG', (64, 48))
+            )
+        self.assertEqual(
+            models.AvatarJob.objects.get().status, models.AvatarJob.DONE
+        )
+        # Swapping in the shrunk avatar doesn't queue another job
+        self.assertIsNone(avatars.claim_job())
+
+    def test_small_avatar_copies(self):
+        """Ensures only the copies smaller than the avatar are made"""
+        self.user.avatar = create_image(100, 100)
+        self.user.save()
+        avatars.run_job(avatars.claim_job())
+
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.avatar.name.endswith('.jpg'))
+        self.assertEqual(self.user.avatar_variants, '64')
+
+    def test_worker_saves_png(self):
+        """Ensures avatars that aren't JPEGs are shrunk to a PNG"""
+        image = BytesIO()
+        Image.new('RGBA', (600, 900), 'red').save(image, format='gif')
+        self.user.avatar = ContentFile(image.getvalue(), name='avatar.gif')
+        self.user.save()
+        avatars.run_job(avatars.claim_job())
+
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.avatar.name.endswith('.png'))
+        self.assertEqual(
+            (self.user.avatar_width, self.user.avatar_height), (333, 500)
+        )
+        # The copies are as wide as the avatar is, scaled down
+        self.assertEqual(
+            [width for url, width in avatars.avatar_sources(self.user)],
+            [43, 85, 333]
+        )
+
+    def test_avatar_tag(self):
+        """Ensures the avatar tag lists every copy of the avatar"""
+        self.user.avatar = create_image(800, 800)
+        self.user.save()
+        avatars.run_job(avatars.claim_job())
+        self.user.refresh_from_db()
+
+        html = Template(
+            "{% load avatars %}{% avatar user 100 'avatar' %}"
+        ).render(Context({'user': self.user}))
+
+        variant_url = self.user.avatar.storage.url(
+            avatars.variant_name(self.user.avatar.name, 128)
+        )
+        self.assertIn('src="{}"'.format(variant_url), html)
+        self.assertIn('{} 128w'.format(variant_url), html)
+        self.assertIn('{} 500w'.format(self.user.avatar.url), html)
+        self.assertIn('sizes="100px"', html)
+
+    def test_worker_skips_replaced_avatar(self):
+        """Ensures a job for an avatar replaced since is skipped"""
+        self.user.avatar = create_image(800, 600)
+        self.user.save()
+        self.user.avatar = create_image(100, 100)
+        self.user.save()
+        current = self.user.avatar.name
+
+        avatars.run_job(avatars.claim_job())
+        avatars.run_job(avatars.claim_job())
+
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.avatar.name, current)
+        self.assertEqual(
+            models.AvatarJob.objects.filter(
+                status=models.AvatarJob.DONE).count(),
+            2
+        )
+
+    def test_same_avatar_is_stored_once(self):
+        """Ensures an image uploaded again reuses the stored file"""
+        other_user = get_user_model().objects.create_user(
+            'other@test.com', 'other', 'testpass'
+        )
+        self.user.avatar = create_image(100, 100)
+        self.user.save()
+        other_user.avatar = create_image(100, 100)
+        other_user.save()
+
+        self.assertEqual(self.user.avatar.name, other_user.avatar.name)
+        self.assertTrue(self.user.avatar.name.startswith('avatars/'))
+        self.assertEqual(
+            len(self.user.avatar.storage.listdir('avatars')[1]), 1
+        )
+
+    def test_shared_avatar_is_kept(self):
+        """Ensures shrinking one user's avatar keeps another's file"""
+        other_user = get_user_model().objects.create_user(
+            'other@test.com', 'other', 'testpass'
+        )
+        self.user.avatar = create_image(800, 600)
+        self.user.save()
+        original = self.user.avatar.name
+        other_user.avatar = create_image(800, 600)
+        other_user.save()
+
+        avatars.run_job(avatars.claim_job())
+        self.assertTrue(self.user.avatar.storage.exists(original))
+
+        avatars.run_job(avatars.claim_job())
+        self.user.refresh_from_db()
+        other_user.refresh_from_db()
+        self.assertEqual(self.user.avatar.name, other_user.avatar.name)
+        self.assertFalse(self.user.avatar.storage.exists(original))
+
+    def test_upload_during_delete(self):
+        """Ensures a file deleted while it is reused is kept or stored"""
+        self.user.avatar = create_image(100, 100)
+        self.user.save()
+        avatars.run_job(avatars.claim_job())
+        self.user.refresh_from_db()
+        name = self.user.avatar.name
+        self.user.avatar = None
+        self.user.save()
+
+        storage = self.user.avatar.storage
+        exists = storage.exists
+
+        def check_then_delete(file_name):
+            """Another worker deletes the unused file right after the
+            upload found it, before the upload locked it"""
+            found = exists(file_name)
+            if not deleted:
+                deleted.append(avatars.delete_if_unused(storage, name))
+            return found
+
+        deleted = []
+
+        other_user = get_user_model().objects.create_user(
+            'other@test.com', 'other', 'testpass'
+        )
+        other_user.avatar = create_image(100, 100)
+        with mock.patch.object(
+                storage, 'exists', side_effect=check_then_delete):
+            other_user.save()
+
+        self.assertEqual(deleted, [True])
+        self.assertEqual(other_user.avatar.name, name)
+        self.assertTrue(storage.exists(name))
+        # The upload finds the file deleted and stores it again
+        avatars.run_job(avatars.claim_job())
+        other_user.avatar = None
+        other_user.save()
+        self.assertTrue(avatars.delete_if_unused(storage, name))
+        other_user.avatar = create_image(100, 100)
+        other_user.save()
+        self.assertTrue(storage.exists(name))
+
+    def test_cleanup_avatars(self):
+        """Ensures only the files no user has are deleted"""
+        self.user.avatar = create_image(100, 100)
+        self.user.save()
+        avatars.run_job(avatars.claim_job())
+        self.user.refresh_from_db()
+
+        storage = self.user.avatar.storage
+        orphan = storage.save('avatars/orphan.jpg', create_image(10, 10))
+        orphan_variant = avatars.variant_name(orphan, 64)
+        storage.save(orphan_variant, create_image(10, 10))
+
+        # New files may belong to a user that isn't saved yet
+        call_command('cleanup_avatars', stdout=StringIO())
+        self.assertTrue(storage.exists(orphan))
+
+        call_command('cleanup_avatars', '--min-age', '0', stdout=StringIO())
+        self.assertFalse(storage.exists(orphan))
+        self.assertFalse(storage.exists(orphan_variant))
+        self.assertTrue(storage.exists(self.user.avatar.name))
+        self.assertTrue(storage.exists(
+            avatars.variant_name(self.user.avatar.name, 64)
+        ))
+
+    def test_avatars_are_cached_forever(self):
+        """Ensures avatars are served with an immutable Cache-Control"""
+        self.user.avatar = create_image(100, 100)
+        self.user.save()
+
+        path = self.user.avatar.url[len(settings.MEDIA_URL):]
+        resp = views.serve_media(RequestFactory().get('/'), path)
+        self.assertEqual(resp.status_code, 200)
+        self.assertIn('immutable', resp['Cache-Control'])
+        self.assertIn('max-age=31536000', resp['Cache-Control'])
+
+    def test_failed_job_is_retried(self):
+        """Ensures a job that fails is retried, then left as failed"""
+        self.user.avatar = ContentFile(b'not an image', name='avatar.jpg')
+        self.user.save()
+
+        for _ in range(avatars.MAX_ATTEMPTS):
+            avatars.run_job(avatars.claim_job())
+
+        job = models.AvatarJob.objects.get()
+        self.assertEqual(job.status, models.AvatarJob.FAILED)
+        self.assertEqual(job.attempts, avatars.MAX_ATTEMPTS)
+        self.assertTrue(job.error)
+        self.assertIsNone(avatars.claim_job())
@@ -6,6 +6,7 @@ most likely, but were is the fun in that. This is just a practice project.
 
 import datetime
 
+from django.conf import settings
 from django.contrib.auth import login, logout
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.contrib.auth.tokens import PasswordResetTokenGenerator
@@ -13,11 +14,17 @@ from django.core.mail import EmailMessage
 from django.http import Http404
 from django.shortcuts import redirect, render
 from django.urls import reverse_lazy
+from django.utils.cache import patch_cache_control
 from django.views import generic
+from django.views.static import serve
 
 from . import forms
 from . import models
 
+# Avatars and their copies are named after their content, so their urls
+# always show the same file
+IMMUTABLE_MEDIA_FOLDERS = ('avatars/', 'avatar_variants/')
+
 
 def create_email_verification_token(user: models.User) -> None:
     """
@@ -136,4 +143,22 @@ def token_confirmation(request, token: str):
         login(request, user_model)
         return redirect('profiles:login_router')
     else:
-        raise Http404("Invalid Token")
\ No newline at end of file
+        raise Http404("Invalid Token")
+
+
+def serve_media(request, path: str):
+    """
+    Serves uploaded files while DEBUG is on. Avatars are cached by
+    browsers for a year, as their url changes whenever the image does. In
+    production the web server does this, see the README.
+
+    :param request: Standard django request object
+    :param path: The file's path in MEDIA_ROOT
+    :return: The file, or a 404
+    """
+    response = serve(request, path, document_root=settings.MEDIA_ROOT)
+    if path.startswith(IMMUTABLE_MEDIA_FOLDERS):
+        patch_cache_control(
+            response, public=True, max_age=60 * 60 * 24 * 365, immutable=True
+        )
+    return response
@@ -165,14 +165,44 @@
 
   function saveImage () {
       /**
-       * Takes the image drawn on the canvas and adds it to the html form
+       * Takes the image drawn on the canvas and uploads it as a PNG file,
+       * in a multipart form with the form's CSRF token
        *
-       * Then submits the form.
+       * Then shows the profile, or the editor with the upload error.
        */
-      let dataUrl= $('data-url')
-      let imageInfo = canvas.toDataURL();
-      dataUrl.value = imageInfo;
-      form.submit()
+      canvas.discardActiveObject();
+      canvas.renderAll();
+
+      // The drawing is copied at the canvas's size, high density screens
+      // draw it larger
+      let output = document.createElement('canvas');
+      output.width = canvas.width;
+      output.height = canvas.height;
+      output.getContext('2d').drawImage(
+          canvas.lowerCanvasEl, 0, 0, output.width, output.height
+      );
+
+      output.toBlob(function(blob) {
+          let token = form.elements['csrfmiddlewaretoken'].value;
+          let data = new FormData();
+          data.append('csrfmiddlewaretoken', token);
+          data.append('avatar', blob, 'avatar.png');
+
+          let request = new XMLHttpRequest();
+          request.open('POST', form.action);
+          request.setRequestHeader('X-CSRFToken', token);
+          request.onload = function() {
+              if (request.status === 200) {
+                  // A saved image redirects to the profile
+                  window.location.href = request.responseURL;
+              } else {
+                  document.open();
+                  document.write(request.responseText);
+                  document.close();
+              }
+          };
+          request.send(data);
+      }, 'image/png');
   }
 
 
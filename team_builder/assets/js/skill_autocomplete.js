@@ -0,0 +1,67 @@
+(function() {
+  /**
+   * Skill autocomplete
+   *
+   * Skill select boxes only hold the skills that are already selected.
+   * A search box is added in front of every select box with a
+   * data-autocomplete-url, and while the user types the matching skills
+   * are fetched and added to the select box.
+   */
+
+  let typingTimer = null;
+
+  function fillOptions(select, skills) {
+    /**
+     * Replaces the unselected options of a select box with skills
+     */
+    Array.from(select.options).forEach(function(option) {
+      if (!option.selected && option.value !== '') {
+        select.removeChild(option);
+      }
+    });
+
+    let shownValues = Array.from(select.options).map(function(option) {
+      return option.value;
+    });
+
+    skills.forEach(function(skill) {
+      if (shownValues.indexOf(String(skill.id)) === -1) {
+        select.appendChild(new Option(skill.skill, skill.id));
+      }
+    });
+  }
+
+  function searchSkills(input) {
+    /**
+     * Fetches the skills matching the text of an autocomplete search box
+     */
+    let select = input.nextElementSibling;
+    let url = select.dataset.autocompleteUrl +
+        '?q=' + encodeURIComponent(input.value);
+
+    fetch(url)
+      .then(function(response) { return response.json(); })
+      .then(function(data) { fillOptions(select, data.skills); });
+  }
+
+  // Listening on the document also covers forms added by dynamicformsets.js
+  document.addEventListener('input', function(event) {
+    if (!event.target.classList.contains('skill-autocomplete')) {
+      return;
+    }
+    clearTimeout(typingTimer);
+    typingTimer = setTimeout(searchSkills, 200, event.target);
+  });
+
+  document.addEventListener('DOMContentLoaded', function() {
+    let selects = document.querySelectorAll('select[data-autocomplete-url]');
+
+    Array.from(selects).forEach(function(select) {
+      let input = document.createElement('input');
+      input.type = 'text';
+      input.className = 'skill-autocomplete';
+      input.placeholder = 'Search skills...';
+      select.parentNode.insertBefore(input, select);
+    });
+  });
+})();
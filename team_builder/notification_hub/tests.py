@@ -1,5 +1,5 @@
 from django.contrib.auth import get_user_model
-from django.test import TestCase
+from django.test import TestCase, override_settings
 from django.urls import reverse
 
 # django-notifications-hq
@@ -186,3 +186,34 @@ class NotificationHubViewsTests(TestCase):
 
         self.assertTemplateUsed('notifications_unread.html')
 
+    def test_notifications_streamed(self):
+        """Ensures the notifications are streamed a chunk at a time"""
+        self.client.login(username='user@user.com', password='testpass')
+        url = reverse('notification_hub:notifications')
+        whole_page = self.client.get(url).content
+
+        with override_settings(STREAMING_LISTINGS=True,
+                               STREAMING_CHUNK_SIZE=1):
+            resp = self.client.get(url)
+            self.assertTrue(resp.streaming)
+            chunks = list(resp.streaming_content)
+
+        # The layout is sent first, then each notification, newest first,
+        # then the rest of the page
+        self.assertEqual(len(chunks), 4)
+        self.assertIn(b'<html', chunks[0])
+        self.assertNotIn(self.message_1.encode(), chunks[0])
+        self.assertIn(self.message_2.encode(), chunks[1])
+        self.assertIn(self.message_1.encode(), chunks[2])
+        self.assertIn(b'</html>', chunks[3])
+        self.assertEqual(b''.join(chunks), whole_page)
+
+    def test_no_notifications_streamed(self):
+        """Ensures a streamed page without notifications says so"""
+        self.user.notifications.all().delete()
+        self.client.login(username='user@user.com', password='testpass')
+
+        with override_settings(STREAMING_LISTINGS=True):
+            resp = self.client.get(reverse('notification_hub:unread'))
+        self.assertTrue(resp.streaming)
+        self.assertContains(resp, 'You are up to date on notifications!')
@@ -1,6 +1,8 @@
 from django.contrib.auth.decorators import login_required
 from django.http import Http404
-from django.shortcuts import get_object_or_404, redirect, render
+from django.shortcuts import get_object_or_404, redirect
+
+from team_builder.streaming import stream_render
 
 
 def get_notification_and_authenticate(request, pk: int):
@@ -42,7 +44,7 @@ def notifications(request):
         request.user.notifications.all().prefetch_related("actor")
     )
 
-    return render(
+    return stream_render(
         request,
         'notification_hub/notifications.html',
         {
@@ -84,7 +86,7 @@ def deletion_view(request):
         request.user.notifications.read().prefetch_related('actor')
     )
 
-    return render(
+    return stream_render(
         request,
         'notification_hub/deletion.html',
         {
@@ -145,7 +147,7 @@ def read(request):
         request.user.notifications.read().prefetch_related('actor')
     )
 
-    return render(
+    return stream_render(
         request,
         'notification_hub/read.html',
         {
@@ -168,7 +170,7 @@ def unread(request):
         request.user.notifications.unread().prefetch_related('actor')
     )
 
-    return render(
+    return stream_render(
         request,
         'notification_hub/unread.html',
         {
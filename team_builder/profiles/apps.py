@@ -3,3 +3,7 @@ from django.apps import AppConfig
 
 class ProfilesConfig(AppConfig):
     name = 'profiles'
+
+    def ready(self):
+        """Connects the profiles signal receivers"""
+        from . import signals  # noqa: F401
@@ -0,0 +1,149 @@
+"""
+An in memory prefix index of Skill names for the skill autocomplete.
+
+Every word of a skill name is kept in a sorted list, so typing 'dev' finds
+'Python Developer' with two binary searches instead of a database query.
+
+Every web process has its own index, built from the database with the
+shared skills version (see caching.get_skills_version()). When a Skill is
+saved or deleted its receiver bumps the version and inserts or removes the
+Skill's entries with bisect.insort, so the process that accepted a skill
+doesn't have to rebuild. An index that finds the version moved by another
+process is rebuilt from the database on its next search, and so is one
+older than SKILLS_CACHE_TIMEOUT, as processes that don't share a cache
+never see each other's versions.
+"""
+
+import bisect
+import threading
+import time
+
+from . import caching
+from . import models
+
+# The most skills an autocomplete lookup returns
+AUTOCOMPLETE_LIMIT = 10
+
+
+class SkillPrefixIndex(object):
+    """A sorted list of (word, skill name, pk) entries for every Skill"""
+
+    def __init__(self):
+        self._entries = None
+        self._names = None
+        self._version = None
+        self._built_at = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _entries_for(pk: int, skill: str) -> list:
+        """Creates an entry for every word a skill name can be found by"""
+        words = skill.lower().split()
+        return [
+            (' '.join(words[index:]), skill, pk)
+            for index in range(len(words))
+        ]
+
+    def _is_current(self, version: int) -> bool:
+        """Checks if the index was built and is up to date with version"""
+        return (
+            self._entries is not None and self._version == version and
+            time.time() - self._built_at < caching.SKILLS_CACHE_TIMEOUT
+        )
+
+    def _load(self) -> list:
+        """Builds the index from the database, if it is out of date"""
+        version = caching.get_skills_version()
+        with self._lock:
+            if not self._is_current(version):
+                names = dict(models.Skill.objects.values_list('pk', 'skill'))
+                entries = []
+                for pk, skill in names.items():
+                    entries.extend(self._entries_for(pk, skill))
+                entries.sort()
+                self._entries = entries
+                self._names = names
+                self._version = version
+                self._built_at = time.time()
+            return self._entries
+
+    def _update(self, pk: int, skill, version) -> None:
+        """
+        Replaces the entries of a Skill, if the index was only missing
+        this change
+
+        :param pk: The pk of the Skill
+        :param skill: The new skill name, or None to remove the Skill
+        :param version: The skills version the change moved to, or None
+        """
+        with self._lock:
+            # Another process changed the skills as well, or the version
+            # was evicted, so the next search rebuilds the index
+            if version is None or not self._is_current(version - 1):
+                return
+
+            # Searches may be reading the current list
+            entries = list(self._entries)
+            if pk in self._names:
+                for entry in self._entries_for(pk, self._names.pop(pk)):
+                    del entries[bisect.bisect_left(entries, entry)]
+            if skill is not None:
+                self._names[pk] = skill
+                for entry in self._entries_for(pk, skill):
+                    bisect.insort(entries, entry)
+
+            self._entries = entries
+            self._version = version
+
+    def add(self, pk: int, skill: str, version) -> None:
+        """
+        Adds a new or renamed Skill to the index
+
+        :param pk: The pk of the Skill
+        :param skill: The skill name
+        :param version: What caching.invalidate_skills() returned
+        """
+        self._update(pk, skill, version)
+
+    def remove(self, pk: int, version) -> None:
+        """
+        Removes a deleted Skill from the index
+
+        :param pk: The pk of the Skill
+        :param version: What caching.invalidate_skills() returned
+        """
+        self._update(pk, None, version)
+
+    def reset(self) -> None:
+        """Throws the index away so it is rebuilt on the next search"""
+        with self._lock:
+            self._entries = None
+
+    def search(self, prefix: str, limit: int = AUTOCOMPLETE_LIMIT) -> list:
+        """
+        Finds the skills with a word starting with prefix
+
+        :param prefix: The text a user has typed
+        :param limit: The most skills to return
+        :return: A list of {'id': pk, 'skill': name} dictionaries
+        """
+        prefix = ' '.join(prefix.lower().split())
+        if not prefix:
+            return []
+
+        entries = self._load()
+        start = bisect.bisect_left(entries, (prefix,))
+
+        found = []
+        seen = set()
+        for word, skill, pk in entries[start:]:
+            if not word.startswith(prefix) or len(found) >= limit:
+                break
+            if pk not in seen:
+                seen.add(pk)
+                found.append({'id': pk, 'skill': skill})
+
+        return sorted(found, key=lambda item: item['skill'].lower())
+
+
+skill_index = SkillPrefixIndex()
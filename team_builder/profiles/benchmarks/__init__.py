@@ -0,0 +1,9 @@
+"""
+Benchmarks for the profiles search views and listing templates.
+
+corpus.py fills the database with a reproducible synthetic corpus,
+runner.py times the search views against it and rendering.py times the
+project card templates with each template engine. They are used by the
+benchmark_search and benchmark_templates management commands, which run
+in a throwaway test database so a real database is never touched.
+"""
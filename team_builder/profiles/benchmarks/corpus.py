@@ -0,0 +1,270 @@
+"""
+Generates a synthetic corpus of users, skills, projects, positions and
+applicants for benchmarking.
+
+The same sizes and seed always create the same rows. Everything is
+inserted with bulk_create, so the search signal receivers never run and
+the search indexes are built once at the end instead.
+"""
+
+import random
+from collections import namedtuple
+from contextlib import contextmanager
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.db import connection, transaction
+from django.db.models import Max
+from django.test.utils import (setup_test_environment,
+                               teardown_test_environment)
+
+from .. import caching
+from .. import models
+from .. import search
+
+# What a corpus holds that the benchmarks need to search with
+Corpus = namedtuple('Corpus', ['skills', 'text_terms', 'user'])
+
+TECHNOLOGIES = (
+    'Android', 'Angular', 'C#', 'Django', 'Elixir', 'Flask', 'Go', 'Java',
+    'JavaScript', 'Kotlin', 'PHP', 'Python', 'Rails', 'React', 'Rust',
+    'Scala', 'Swift', 'Vue', 'WordPress', 'iOS',
+)
+ROLES = (
+    'Designer', 'Developer', 'Engineer', 'Tester', 'Writer',
+)
+ADJECTIVES = (
+    'Agile', 'Bright', 'Clever', 'Daring', 'Eager', 'Friendly', 'Global',
+    'Humble', 'Instant', 'Jolly', 'Kind', 'Lively', 'Modern', 'Nimble',
+    'Open', 'Quiet', 'Rapid', 'Simple', 'Tidy', 'Urban',
+)
+NOUNS = (
+    'Atlas', 'Beacon', 'Compass', 'Garden', 'Harbor', 'Kitchen', 'Library',
+    'Market', 'Network', 'Orchard', 'Planner', 'Radio', 'Studio', 'Tracker',
+    'Wallet',
+)
+WORDS = (
+    'accessible', 'analytics', 'api', 'backend', 'booking', 'community',
+    'dashboard', 'database', 'events', 'frontend', 'games', 'health',
+    'learning', 'maps', 'mobile', 'music', 'payments', 'recipes', 'search',
+    'social', 'sports', 'travel', 'volunteers', 'weather',
+)
+
+# The most positions a project has, and applicants a position has
+MAX_POSITIONS = 4
+MAX_APPLICANTS = 3
+
+# How many projects each generated user owns, on average
+PROJECTS_PER_USER = 10
+
+
+def _sentence(rng: random.Random, length: int) -> str:
+    """Creates a sentence of random WORDS"""
+    return ' '.join(rng.choice(WORDS) for _ in range(length)).capitalize()
+
+
+def _next_pk(model) -> int:
+    """Gets the pk after the largest one already used by a model"""
+    return (model.objects.aggregate(largest=Max('pk'))['largest'] or 0) + 1
+
+
+def _create_users(rng: random.Random, count: int) -> list:
+    """Creates count active Users and returns their pks"""
+    user_model = get_user_model()
+    first_pk = _next_pk(user_model)
+    password = make_password(None)
+
+    user_model.objects.bulk_create(
+        user_model(
+            pk=pk, email='benchmark{}@example.com'.format(pk),
+            username='benchmark{}'.format(pk), password=password,
+            is_active=True, bio=_sentence(rng, 8),
+        )
+        for pk in range(first_pk, first_pk + count)
+    )
+    return list(range(first_pk, first_pk + count))
+
+
+def _create_skills() -> list:
+    """Creates a Skill for every technology and role, returns all skills"""
+    existing = set(models.Skill.objects.values_list('skill', flat=True))
+    models.Skill.objects.bulk_create(
+        models.Skill(skill='{} {}'.format(technology, role))
+        for technology in TECHNOLOGIES for role in ROLES
+        if '{} {}'.format(technology, role) not in existing
+    )
+    # bulk_create doesn't send the signals that do this
+    caching.invalidate_skills()
+    return list(models.Skill.objects.order_by('pk'))
+
+
+def _create_projects(rng: random.Random, count: int, user_pks: list,
+                     skill_pks: list, batch_size: int) -> None:
+    """
+    Creates count Projects, with their Positions and Applicants, in
+    batches of batch_size Projects
+    """
+    project_pk = _next_pk(models.Project)
+    position_pk = _next_pk(models.Position)
+    applicant_pk = _next_pk(models.Applicants)
+
+    position_through = models.Project.positions.through
+    applicant_through = models.Position.applicants.through
+
+    for batch_start in range(0, count, batch_size):
+        projects, positions, applicants = [], [], []
+        project_positions, position_applicants = [], []
+
+        for number in range(batch_start, min(count, batch_start + batch_size)):
+            projects.append(models.Project(
+                pk=project_pk, owner_id=rng.choice(user_pks),
+                title='{} {} {}'.format(
+                    rng.choice(ADJECTIVES), rng.choice(NOUNS), number
+                ),
+                time_line='{} weeks'.format(rng.randint(1, 52)),
+                requirements=_sentence(rng, 5),
+                description=_sentence(rng, rng.randint(10, 40)),
+            ))
+
+            for _ in range(rng.randint(1, MAX_POSITIONS)):
+                filled_by = rng.choice(user_pks) if rng.random() < 0.3 \
+                    else None
+                positions.append(models.Position(
+                    pk=position_pk, related_project_id=project_pk,
+                    skill_id=rng.choice(skill_pks),
+                    filled=filled_by is not None, filled_by_id=filled_by,
+                    information=_sentence(rng, rng.randint(5, 15)),
+                    time_commitment='{} hours a week'.format(
+                        rng.randint(1, 40)
+                    ),
+                ))
+                project_positions.append(position_through(
+                    project_id=project_pk, position_id=position_pk
+                ))
+
+                for _ in range(rng.randint(0, MAX_APPLICANTS)):
+                    applicants.append(models.Applicants(
+                        pk=applicant_pk, applicant_id=rng.choice(user_pks),
+                        position_id=position_pk,
+                    ))
+                    position_applicants.append(applicant_through(
+                        position_id=position_pk, applicants_id=applicant_pk
+                    ))
+                    applicant_pk += 1
+
+                position_pk += 1
+            project_pk += 1
+
+        # bulk_create doesn't call save(), which renders the Markdown
+        for obj in projects + positions:
+            obj.render_markdown_fields()
+
+        with transaction.atomic():
+            models.Project.objects.bulk_create(projects)
+            models.Position.objects.bulk_create(positions)
+            models.Applicants.objects.bulk_create(applicants)
+            position_through.objects.bulk_create(project_positions)
+            applicant_through.objects.bulk_create(position_applicants)
+
+
+def _index_terms(kind: str, values, batch_size: int) -> None:
+    """Adds (object_id, value) pairs to the trigram index in batches"""
+    values = list(values)
+    for batch_start in range(0, len(values), batch_size):
+        batch = values[batch_start:batch_start + batch_size]
+        grams = {object_id: search.trigrams(value)
+                 for object_id, value in batch}
+
+        with transaction.atomic():
+            models.SearchTerm.objects.filter(
+                kind=kind, object_id__in=list(grams)
+            ).delete()
+            models.SearchTerm.objects.bulk_create(
+                models.SearchTerm(
+                    kind=kind, object_id=object_id, value=value,
+                    trigram_count=len(grams[object_id]),
+                )
+                for object_id, value in batch
+            )
+            terms = models.SearchTerm.objects.filter(
+                kind=kind, object_id__in=list(grams)
+            ).values_list('pk', 'object_id')
+            models.Trigram.objects.bulk_create(
+                models.Trigram(gram=gram, term_id=term_pk)
+                for term_pk, object_id in terms
+                for gram in grams[object_id]
+            )
+
+
+def generate_corpus(projects: int, seed: int = 0,
+                    batch_size: int = 1000) -> Corpus:
+    """
+    Fills the database with a synthetic corpus and builds its search
+    indexes
+
+    :param projects: How many Projects to create
+    :param seed: The random seed, the same seed creates the same corpus
+    :param batch_size: How many Projects are inserted at a time
+    :return: A Corpus to run the benchmarks with
+    """
+    rng = random.Random(seed)
+
+    user_pks = _create_users(rng, max(projects // PROJECTS_PER_USER, 10))
+    skills = _create_skills()
+    skill_pks = [skill.pk for skill in skills]
+
+    _create_projects(rng, projects, user_pks, skill_pks, batch_size)
+
+    search.index_all_projects()
+    # bulk_create doesn't send the signals that make the searches stale
+    caching.clear_search_results()
+    _index_terms(
+        models.SearchTerm.PROJECT_TITLE,
+        models.Project.objects.values_list('pk', 'title').iterator(),
+        batch_size,
+    )
+    _index_terms(
+        models.SearchTerm.SKILL,
+        ((skill.pk, skill.skill) for skill in skills),
+        batch_size,
+    )
+
+    # The user searching for projects that need their skills
+    user = get_user_model().objects.get(pk=user_pks[0])
+    all_skills = models.AllSkills.objects.create(user=user)
+    all_skills.skills.set(rng.sample(skills, 5))
+
+    text_terms = (
+        [rng.choice(WORDS) for _ in range(5)] +
+        [rng.choice(NOUNS) for _ in range(5)] +
+        # Misspelled searches use the trigram fallback
+        ['Djnago', 'Pyhton']
+    )
+    return Corpus(
+        skills=[skill.skill for skill in rng.sample(skills, 10)],
+        text_terms=text_terms,
+        user=user,
+    )
+
+
+@contextmanager
+def benchmark_database(keepdb: bool = False):
+    """
+    Switches to a throwaway test database for a benchmark, so no real
+    data is touched
+
+    :param keepdb: Keeps the test database and its corpus afterwards
+    """
+    setup_test_environment()
+    old_name = connection.settings_dict['NAME']
+    connection.creation.create_test_db(
+        verbosity=0, autoclobber=True, keepdb=keepdb
+    )
+
+    try:
+        yield
+    finally:
+        connection.creation.destroy_test_db(
+            old_name, verbosity=0, keepdb=keepdb
+        )
+        teardown_test_environment()
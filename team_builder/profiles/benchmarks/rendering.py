@@ -0,0 +1,113 @@
+"""
+Times how long the listing templates take to render a project card with
+each template engine.
+
+Every render gives the cards a new card version, so no card comes from
+the fragment cache and only the rendering itself is measured.
+"""
+
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.cache.utils import make_template_fragment_key
+from django.template import engines
+from django.template.utils import InvalidTemplateEngineError
+from django.test import RequestFactory
+from django.utils.module_loading import import_string
+
+from team_builder import jinja2_environment
+
+from .. import caching
+from .. import models
+from .corpus import Corpus
+from .runner import percentile
+
+# The listing templates with project cards, and the context variable and
+# card fragment name each uses
+CARD_TEMPLATES = (
+    ('profiles/homepage.html', 'object_list', caching.HOMEPAGE_CARD),
+    ('profiles/project_view_all.html', 'projects',
+     caching.OWNED_PROJECT_CARD),
+)
+
+
+def template_backends() -> dict:
+    """
+    Gets the template engines to time, Jinja2 only if it is installed
+
+    :return: A dictionary of engine name to template backend
+    """
+    backends = {'django': engines['django']}
+    if jinja2_environment.Environment is not None:
+        try:
+            backends['jinja2'] = engines['jinja2']
+        except InvalidTemplateEngineError:
+            # JINJA2_LISTINGS is off, so the backend isn't configured
+            params = dict(settings.JINJA2_BACKEND, NAME='jinja2')
+            backend = import_string(params.pop('BACKEND'))
+            backends['jinja2'] = backend(params)
+    return backends
+
+
+def _render_cards(backend, card_template: tuple, projects: list, request,
+                  version: str) -> float:
+    """Renders a listing page with uncached cards, returning the seconds"""
+    template_name, variable, fragment_name = card_template
+    for project in projects:
+        project.card_version = version
+
+    template = backend.get_template(template_name)
+    start = time.perf_counter()
+    template.render({variable: projects, 'current_tab': 'Benchmark'},
+                    request)
+    elapsed = time.perf_counter() - start
+
+    # The cards rendered are never shown again
+    cache.delete_many([
+        make_template_fragment_key(fragment_name, [project.pk, version])
+        for project in projects
+    ])
+    return elapsed
+
+
+def run_render_benchmarks(corpus: Corpus, cards: int = 100,
+                          repeat: int = 20) -> list:
+    """
+    Renders every listing template repeat times with each engine
+
+    :param corpus: The Corpus being benchmarked
+    :param cards: How many project cards each render has
+    :param repeat: How many times each template is rendered
+    :return: A list of dictionaries with the milliseconds each card took
+    """
+    projects = list(
+        models.Project.objects.order_by('pk')
+        .prefetch_related('positions__skill')[:cards]
+    )
+    request = RequestFactory().get('/')
+    request.user = corpus.user
+
+    results = []
+    for card_template in CARD_TEMPLATES:
+        for engine, backend in template_backends().items():
+            # Compiles the template before it is timed
+            _render_cards(backend, card_template, projects, request,
+                          'benchmark-warmup')
+
+            per_card = [
+                _render_cards(backend, card_template, projects, request,
+                              'benchmark-{}'.format(run)) / len(projects)
+                for run in range(repeat)
+            ]
+            results.append({
+                'template': card_template[0],
+                'engine': engine,
+                'cards': len(projects),
+                'renders': repeat,
+                'p50_ms_per_card': round(percentile(per_card, 50) * 1000, 4),
+                'mean_ms_per_card': round(
+                    sum(per_card) / len(per_card) * 1000, 4
+                ),
+            })
+    return results
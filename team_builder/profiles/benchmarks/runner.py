@@ -0,0 +1,132 @@
+"""
+Times the search views against a corpus.
+
+Every search is requested twice, first with an empty cache and then
+again, so both the search itself and a cached search are measured.
+"""
+
+import math
+import time
+from collections import namedtuple
+from urllib.parse import urlencode
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from .corpus import Corpus
+
+# The latency percentiles reported for every view
+PERCENTILES = (50, 90, 99)
+
+# The timings of a single view
+ViewResult = namedtuple(
+    'ViewResult', ['view', 'cached', 'requests', 'latencies', 'queries']
+)
+
+
+def percentile(values: list, percent: float) -> float:
+    """
+    Gets a percentile of a list of numbers, with the nearest rank method
+
+    :param values: A list of numbers
+    :param percent: The percentile to get, from 0 to 100
+    :return: The value at the percentile, or 0 if there are no values
+    """
+    if not values:
+        return 0
+    ordered = sorted(values)
+    rank = max(math.ceil(len(ordered) * percent / 100), 1)
+    return ordered[rank - 1]
+
+
+def search_urls(corpus: Corpus) -> dict:
+    """
+    Creates the urls requested for each search view
+
+    :param corpus: The Corpus being benchmarked
+    :return: A dictionary of view name to a list of urls
+    """
+    search_url = reverse('profiles:search')
+    return {
+        'SearchListView': [
+            '{}?{}'.format(search_url, urlencode({'search_term': term}))
+            for term in corpus.text_terms
+        ],
+        'SearchBySkillListView': [
+            # See Skill's readable_to_url method
+            reverse('profiles:search_by_skill',
+                    kwargs={'skill': skill.replace(' ', '_')})
+            for skill in corpus.skills
+        ],
+        'SearchYourSkillsView': [reverse('profiles:search_your_skills')],
+    }
+
+
+def _time_request(client: Client, url: str) -> tuple:
+    """Requests a url, returning the seconds it took and queries it ran"""
+    with CaptureQueriesContext(connection) as queries:
+        start = time.perf_counter()
+        response = client.get(url)
+        elapsed = time.perf_counter() - start
+
+    if response.status_code != 200:
+        raise RuntimeError(
+            '{} returned {}'.format(url, response.status_code)
+        )
+    return elapsed, len(queries)
+
+
+def run_benchmarks(corpus: Corpus, repeat: int = 5) -> list:
+    """
+    Requests every search url repeat times, cold and cached
+
+    :param corpus: The Corpus being benchmarked
+    :param repeat: How many times each url is requested
+    :return: A list of ViewResult, a cold and a cached one per view
+    """
+    client = Client()
+    client.force_login(corpus.user)
+
+    results = []
+    for view, urls in search_urls(corpus).items():
+        timings = {False: ([], []), True: ([], [])}
+
+        for _ in range(repeat):
+            for url in urls:
+                cache.clear()
+                for cached in (False, True):
+                    elapsed, query_count = _time_request(client, url)
+                    timings[cached][0].append(elapsed)
+                    timings[cached][1].append(query_count)
+
+        for cached, (latencies, queries) in timings.items():
+            results.append(ViewResult(
+                view=view, cached=cached, requests=len(latencies),
+                latencies=latencies, queries=queries,
+            ))
+    return results
+
+
+def summarize(result: ViewResult) -> dict:
+    """
+    Summarizes a ViewResult for printing or saving as JSON
+
+    :param result: A ViewResult
+    :return: A dictionary of latency percentiles in milliseconds and
+    query counts
+    """
+    summary = {
+        'view': result.view,
+        'cached': result.cached,
+        'requests': result.requests,
+        'mean_queries': sum(result.queries) / len(result.queries),
+        'max_queries': max(result.queries),
+    }
+    for percent in PERCENTILES:
+        summary['p{}_ms'.format(percent)] = round(
+            percentile(result.latencies, percent) * 1000, 2
+        )
+    return summary
@@ -0,0 +1,485 @@
+"""
+Caching for the profiles app.
+
+Search results are cached as search.SearchResults, the found Project pks
+and their skill facet counts, keyed by the kind of search and the
+normalized search term. Each entry is stored with the versions it depends
+on: one per Project found, one per Skill a skill search looked for, and
+the versions Projects join text or skill searches by. An entry is stale
+as soon as one of those versions moved, so a change only throws away the
+searches it could affect, and there is no list of cached terms to keep in
+sync. See invalidate_project_searches()
+
+The ordered list of Skills shown in the sidebar is cached under a version
+number, which is bumped whenever a Skill is saved or deleted. The list
+expires after SKILLS_CACHE_TIMEOUT anyway, as processes that don't share a
+cache, like with LocMemCache, never see each other's bumps.
+
+Project listings cache each project's card as a template fragment, keyed
+by the project's pk and a card version that is bumped whenever the project
+or one of its positions changes. See set_card_versions()
+
+Whole pages are cached for logged out visitors in page groups, like
+'project:<pk>'. Each group has a version that the signal receivers bump,
+see purge_pages()
+
+Search results and pages go through get_or_rebuild(), so when a popular
+entry expires only one request rebuilds it while the others are given
+the expired copy, instead of every request rebuilding it at once.
+"""
+
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.cache.utils import make_template_fragment_key
+from django.db.models import prefetch_related_objects
+
+from . import models
+
+SKILL_SEARCH = 'skill'
+TEXT_SEARCH = 'text'
+# The projects needing some Skills, searched by their pks
+SKILL_IDS_SEARCH = 'skill_ids'
+
+# How long search results are kept, in seconds
+SEARCH_CACHE_TIMEOUT = getattr(settings, 'SEARCH_CACHE_TIMEOUT', 60 * 15)
+
+# The longest the skills list is kept, in seconds
+SKILLS_CACHE_TIMEOUT = getattr(settings, 'SKILLS_CACHE_TIMEOUT', 60 * 15)
+
+# How long an expired search result or page may still be served while a
+# single request rebuilds it, in seconds
+CACHE_STALE_GRACE = getattr(settings, 'CACHE_STALE_GRACE', 60 * 5)
+
+# The longest a request may take to rebuild a cached value before another
+# request may start rebuilding it too, in seconds
+REBUILD_LOCK_TIMEOUT = getattr(settings, 'REBUILD_LOCK_TIMEOUT', 30)
+
+# How long a request waits for another request's rebuild of a value that
+# has no expired copy, and how often it checks, in seconds
+REBUILD_WAIT = getattr(settings, 'REBUILD_WAIT', 2)
+REBUILD_POLL_INTERVAL = 0.05
+
+# How long a page is cached for logged out visitors, in seconds
+PAGE_CACHE_TIMEOUT = getattr(settings, 'PAGE_CACHE_TIMEOUT', 60 * 10)
+
+# The page group every cached page is part of
+ALL_PAGES = 'all'
+
+# The {% cache %} fragment names of the project cards, by template
+HOMEPAGE_CARD = 'homepage_project_card'
+OWNED_PROJECT_CARD = 'owned_project_card'
+
+# The cache key of the current skills list version
+SKILLS_VERSION_KEY = 'profiles:skills_version'
+
+# The cache key of the version every cached search depends on
+SEARCH_VERSION_KEY = 'profiles:search_version'
+
+# The cache key of the version bumped when a Project may have started
+# matching text searches, or a Skill similar to a misspelled search
+SEARCH_TEXT_VERSION_KEY = 'profiles:search_version:text'
+
+
+def normalize_search_term(search_term: str) -> str:
+    """Lowercases a search term and collapses its whitespace"""
+    return ' '.join(search_term.lower().split())
+
+
+def search_cache_key(kind: str, search_term: str) -> str:
+    """
+    Creates the cache key for a search's results
+
+    :param kind: SKILL_SEARCH, TEXT_SEARCH or SKILL_IDS_SEARCH
+    :param search_term: A normalized search term
+    :return: A cache key that is safe for any cache backend
+    """
+    digest = hashlib.md5(search_term.encode('utf-8')).hexdigest()
+    return 'profiles:search:{}:{}'.format(kind, digest)
+
+
+def _search_project_key(project_pk: int) -> str:
+    """The cache key of the version of a Project in search results"""
+    return 'profiles:search_version:project:{}'.format(project_pk)
+
+
+def _search_skill_key(skill_pk: int) -> str:
+    """The cache key of the version of the open positions for a Skill"""
+    return 'profiles:search_version:skill:{}'.format(skill_pk)
+
+
+def _increment(counter: str, amount: int = 1) -> None:
+    """Adds to a cache statistics counter"""
+    _increment_key('profiles:stats:{}'.format(counter), amount)
+
+
+def _increment_key(key: str, amount: int = 1) -> None:
+    """Adds to a counter that never expires"""
+    cache.add(key, 0, timeout=None)
+    try:
+        cache.incr(key, amount)
+    except ValueError:
+        # The counter was evicted between add() and incr()
+        cache.set(key, amount, timeout=None)
+
+
+def get_stats() -> dict:
+    """
+    Gets all of the profiles cache statistics counters
+
+    :return: A dictionary of counter name to count
+    """
+    counters = (
+        'search_hits', 'search_misses', 'search_stale', 'search_waits',
+        'search_invalidations',
+        'page_hits', 'page_misses', 'page_stale', 'page_waits',
+    )
+    keys = {'profiles:stats:{}'.format(counter): counter
+            for counter in counters}
+    found = cache.get_many(list(keys))
+    return {counter: found.get(key, 0) for key, counter in keys.items()}
+
+
+def _lock_key(key: str) -> str:
+    """The cache key held while a cached value is being rebuilt"""
+    return '{}:rebuilding'.format(key)
+
+
+def _get_entry(key: str, is_current=None):
+    """
+    Gets a cache entry, ignoring one that is_current() says is out of date
+    """
+    entry = cache.get(key)
+    if entry is not None and is_current is not None \
+            and not is_current(entry[0]):
+        return None
+    return entry
+
+
+def _wait_for_rebuild(key: str, is_current=None):
+    """
+    Waits for another request to rebuild a cached value
+
+    :param key: The cache key being rebuilt
+    :param is_current: See get_or_rebuild()
+    :return: The cache entry, or None if the rebuild failed, was not
+    cached or took longer than REBUILD_WAIT
+    """
+    deadline = time.time() + REBUILD_WAIT
+    while time.time() < deadline:
+        time.sleep(REBUILD_POLL_INTERVAL)
+
+        entry = _get_entry(key, is_current)
+        if entry is not None:
+            return entry
+        if cache.get(_lock_key(key)) is None:
+            return None
+    return None
+
+
+def get_or_rebuild(key: str, rebuild, timeout: int, counter: str,
+                   cache_if=None, is_current=None):
+    """
+    Gets a cached value, making sure only one request at a time rebuilds it.
+
+    Values are kept for CACHE_STALE_GRACE seconds past their timeout.
+    When an expired value is requested the first request rebuilds it and
+    the others are given the expired value meanwhile. When there is no
+    value at all the others wait up to REBUILD_WAIT seconds for it.
+
+    :param key: The cache key of the value
+    :param rebuild: A function without arguments that creates the value
+    :param timeout: How long the value is fresh for, in seconds
+    :param counter: The prefix of the statistics counters, like 'search'
+    :param cache_if: A function that takes the value and returns False if
+    it should not be cached
+    :param is_current: A function that takes a cached value and returns
+    False if it is out of date, which is never served
+    :return: The cached or rebuilt value
+    """
+    entry = _get_entry(key, is_current)
+    if entry is not None:
+        value, fresh_until = entry
+        if time.time() < fresh_until:
+            _increment('{}_hits'.format(counter))
+            return value
+
+    locked = cache.add(_lock_key(key), True, REBUILD_LOCK_TIMEOUT)
+    if not locked:
+        # Another request is already rebuilding the value
+        if entry is None:
+            entry = _wait_for_rebuild(key, is_current)
+            counter_name = '{}_waits'
+        else:
+            counter_name = '{}_stale'
+
+        if entry is not None:
+            _increment(counter_name.format(counter))
+            return entry[0]
+
+    _increment('{}_misses'.format(counter))
+    try:
+        value = rebuild()
+        if cache_if is None or cache_if(value):
+            cache.set(key, (value, time.time() + timeout),
+                      timeout + CACHE_STALE_GRACE)
+    finally:
+        if locked:
+            cache.delete(_lock_key(key))
+
+    return value
+
+
+def _search_dependencies(kind: str, results) -> list:
+    """
+    Gets the cache keys of the versions a search's results depend on
+
+    :param kind: SKILL_SEARCH, TEXT_SEARCH or SKILL_IDS_SEARCH
+    :param results: The search.SearchResults of the search
+    :return: A list of version cache keys
+    """
+    keys = [SEARCH_VERSION_KEY]
+    keys += [_search_project_key(pk) for pk in results.project_ids]
+    keys += [_search_skill_key(pk) for pk in results.skill_ids]
+
+    # Any Project can start matching a text search, and the similar
+    # Projects of a misspelled search
+    if kind == TEXT_SEARCH or results.fuzzy:
+        keys.append(SEARCH_TEXT_VERSION_KEY)
+    # New and renamed Skills can match a searched skill name
+    if kind == SKILL_SEARCH or results.fuzzy:
+        keys.append(SKILLS_VERSION_KEY)
+    return keys
+
+
+def _versions_are_current(value) -> bool:
+    """Checks if none of the versions a cached search was stored with moved"""
+    versions = value[1]
+    return cache.get_many(list(versions)) == versions
+
+
+def get_search_results(kind: str, search_term: str, run_search):
+    """
+    Gets what a search found, running the search on a miss
+
+    :param kind: SKILL_SEARCH, TEXT_SEARCH or SKILL_IDS_SEARCH
+    :param search_term: The string a user searched with
+    :param run_search: A function that takes the normalized search
+    term and returns search.SearchResults
+    :return: search.SearchResults
+    """
+    search_term = normalize_search_term(search_term)
+
+    def rebuild():
+        """Runs the search and gets the versions it depends on"""
+        # Read first, so a change made during the search still moves them
+        versions = _get_versions([
+            SEARCH_VERSION_KEY, SEARCH_TEXT_VERSION_KEY, SKILLS_VERSION_KEY
+        ])
+        results = run_search(search_term)
+
+        keys = _search_dependencies(kind, results)
+        versions.update(
+            _get_versions([key for key in keys if key not in versions])
+        )
+        return results, {key: versions[key] for key in keys}
+
+    return get_or_rebuild(
+        search_cache_key(kind, search_term), rebuild, SEARCH_CACHE_TIMEOUT,
+        'search', is_current=_versions_are_current
+    )[0]
+
+
+def invalidate_project_searches(project_pk: int, could_join: bool = False,
+                                skill_pks=()) -> None:
+    """
+    Makes the cached searches a changed Project could be in stale
+
+    :param project_pk: The primary key of a changed Project
+    :param could_join: True if the Project may now match text searches it
+    didn't, like when its text changed or a position opened
+    :param skill_pks: The Skills of its changed open positions, whose
+    searches the Project may now match
+    """
+    keys = [_search_project_key(project_pk)]
+    keys += [_search_skill_key(pk) for pk in skill_pks]
+    if could_join:
+        keys.append(SEARCH_TEXT_VERSION_KEY)
+
+    for key in keys:
+        _bump_version(key)
+    _increment('search_invalidations')
+
+
+def clear_search_results() -> None:
+    """
+    Makes every cached search result stale, used when Projects are
+    created without their signals
+    """
+    _bump_version(SEARCH_VERSION_KEY)
+
+
+def get_skills() -> list:
+    """
+    Gets every Skill ordered by name, for the skills sidebar. The list is
+    only loaded from the database when its version has no cached list.
+
+    :return: A list of Skill model objects
+    """
+    key = 'profiles:skills:{}'.format(get_skills_version())
+
+    skills = cache.get(key)
+    if skills is None:
+        # Skill.skill is unique, so the database orders it by its index
+        skills = list(models.Skill.objects.order_by('skill'))
+        cache.set(key, skills, SKILLS_CACHE_TIMEOUT)
+
+    return skills
+
+
+def get_skills_version() -> int:
+    """Gets the skills version, which changes whenever a Skill does"""
+    return _get_versions([SKILLS_VERSION_KEY])[SKILLS_VERSION_KEY]
+
+
+def invalidate_skills():
+    """
+    Moves to a new skills list version, used when a Skill changes
+
+    :return: The new version, or None if there was no version to move on
+    """
+    return _bump_version(SKILLS_VERSION_KEY)
+
+
+def _get_versions(keys: list) -> dict:
+    """
+    Gets the version counters stored under some cache keys.
+
+    A missing version starts from the clock instead of from 0, so a
+    version that was evicted from the cache can't match anything cached
+    under one of its old values.
+
+    :param keys: A list of version cache keys
+    :return: A dictionary of key to version
+    """
+    versions = cache.get_many(keys)
+
+    missing = [key for key in keys if key not in versions]
+    if missing:
+        new_version = int(time.time() * 1000000)
+        for key in missing:
+            cache.add(key, new_version, timeout=None)
+        # Another request may have added a version first
+        versions.update(cache.get_many(missing))
+
+    return versions
+
+
+def _bump_version(key: str):
+    """
+    Moves a version counter on, making what was cached with it stale
+
+    :param key: The cache key of the version
+    :return: The new version, or None if there was no version
+    """
+    try:
+        return cache.incr(key)
+    except ValueError:
+        # Without a version a new one is made the next time it's needed
+        return None
+
+
+def _card_version_key(project_pk: int) -> str:
+    """The cache key of a Project's card version"""
+    return 'profiles:card_version:{}'.format(project_pk)
+
+
+def set_card_versions(projects) -> None:
+    """
+    Sets card_version on each Project, for the {% cache %} tag of its card
+
+    :param projects: A list of Project model objects
+    """
+    keys = {_card_version_key(project.pk): project for project in projects}
+    versions = _get_versions(list(keys))
+
+    for key, project in keys.items():
+        project.card_version = versions[key]
+
+
+def bump_card_version(project_pk: int) -> None:
+    """
+    Makes a Project's cached cards out of date, used when the Project or
+    one of its Positions changes
+
+    :param project_pk: The primary key of a Project
+    """
+    _bump_version(_card_version_key(project_pk))
+
+
+def uncached_project_cards(projects, fragment_name: str) -> list:
+    """
+    Finds the Projects whose card is not cached, with one cache lookup.
+    set_card_versions() has to have been called on the Projects.
+
+    :param projects: A list of Project model objects
+    :param fragment_name: HOMEPAGE_CARD or OWNED_PROJECT_CARD
+    :return: A list of the Projects whose card has to be rendered
+    """
+    keys = {
+        make_template_fragment_key(
+            fragment_name, [project.pk, project.card_version]
+        ): project
+        for project in projects
+    }
+    found = cache.get_many(list(keys))
+    return [project for key, project in keys.items() if key not in found]
+
+
+def prepare_project_cards(projects, fragment_name: str) -> None:
+    """
+    Gets a page of Projects ready for their cached cards. Positions are
+    only loaded for the Projects whose card has to be rendered.
+
+    :param projects: A list of Project model objects
+    :param fragment_name: HOMEPAGE_CARD or OWNED_PROJECT_CARD
+    """
+    set_card_versions(projects)
+    prefetch_related_objects(
+        uncached_project_cards(projects, fragment_name), 'positions__skill'
+    )
+
+
+def _page_version_key(group: str) -> str:
+    """The cache key of a page group's version"""
+    return 'profiles:page_version:{}'.format(group)
+
+
+def page_cache_key(group: str, path: str) -> str:
+    """
+    Creates the cache key of a page, from the current versions of its
+    group and of every page
+
+    :param group: The page group, like 'homepage' or 'project:<pk>'
+    :param path: The full path of the page, with its query string
+    :return: A cache key that is safe for any cache backend
+    """
+    keys = [_page_version_key(ALL_PAGES), _page_version_key(group)]
+    versions = _get_versions(keys)
+
+    digest = hashlib.md5(path.encode('utf-8')).hexdigest()
+    return 'profiles:page:{}:{}:{}:{}'.format(
+        group, versions[keys[0]], versions[keys[1]], digest
+    )
+
+
+def purge_pages(*groups) -> None:
+    """
+    Makes every cached page of some page groups stale
+
+    :param groups: Page groups, ALL_PAGES for every page
+    """
+    for group in groups:
+        _bump_version(_page_version_key(group))
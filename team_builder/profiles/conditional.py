@@ -0,0 +1,133 @@
+"""
+ETags and Last-Modified dates for conditional GETs of the project and
+profile pages.
+
+Every row a page shows has an updated_at column, so a single aggregate
+query finds when the page last changed. Django's condition() decorator
+then answers with a 304 before the view runs its queries or renders a
+template. The signal receivers in signals.py touch updated_at for the
+changes auto_now can't see, like deleted rows and renamed skills.
+
+Logged in users only get an ETag. Their pages also show if they have
+unread notifications, which no date can describe.
+"""
+
+import hashlib
+
+from django.contrib.auth import get_user_model
+from django.db.models import Max
+
+from . import models
+
+
+def _latest(*dates):
+    """Gets the latest of some dates, ignoring None"""
+    dates = [date for date in dates if date is not None]
+    return max(dates) if dates else None
+
+
+def _viewer_state(request) -> str:
+    """
+    Describes what the page layout shows about the logged in user, which
+    changes the page without any of its rows changing
+    """
+    user = request.user
+    if not user.is_authenticated:
+        return 'anonymous'
+
+    has_unread = user.notifications.unread().exists()
+    return '{}:{}:{}:{}'.format(
+        user.pk, user.updated_at.timestamp(), user.color, has_unread
+    )
+
+
+def _etag(request, last_modified) -> str:
+    """Creates an ETag from a page's last change and its viewer"""
+    if last_modified is None:
+        return None
+
+    state = '{}|{}'.format(last_modified.timestamp(), _viewer_state(request))
+    return hashlib.md5(state.encode('utf-8')).hexdigest()
+
+
+def _project_changed(request, pk: int):
+    """
+    Gets when a project page's rows last changed: the Project, its owner,
+    its Positions or the Users filling them. Only queried once a request.
+    """
+    if not hasattr(request, '_project_last_modified'):
+        dates = models.Project.objects.filter(pk=pk).annotate(
+            positions_updated=Max('positions__updated_at'),
+            filled_by_updated=Max('positions__filled_by__updated_at'),
+        ).values_list(
+            'updated_at', 'owner__updated_at',
+            'positions_updated', 'filled_by_updated',
+        ).first()
+        request._project_last_modified = _latest(*dates) if dates else None
+
+    return request._project_last_modified
+
+
+def project_last_modified(request, pk: int):
+    """
+    Gets when a project page last changed, for anonymous users
+
+    :param request: Standard django request object
+    :param pk: The primary key of a Project
+    :return: A datetime, or None
+    """
+    if request.user.is_authenticated:
+        return None
+    return _project_changed(request, pk)
+
+
+def project_etag(request, pk: int) -> str:
+    """
+    Creates the ETag of a project page
+
+    :param request: Standard django request object
+    :param pk: The primary key of a Project
+    :return: An ETag, or None if there is no such Project
+    """
+    return _etag(request, _project_changed(request, pk))
+
+
+def _profile_changed(request, pk: int):
+    """
+    Gets when a profile page's rows last changed: the User, or the
+    Projects and Positions they own. Only queried once a request.
+    """
+    if not hasattr(request, '_profile_last_modified'):
+        dates = get_user_model().objects.filter(pk=pk).annotate(
+            projects_updated=Max('project__updated_at'),
+            positions_updated=Max('project__positions__updated_at'),
+        ).values_list(
+            'updated_at', 'projects_updated', 'positions_updated'
+        ).first()
+        request._profile_last_modified = _latest(*dates) if dates else None
+
+    return request._profile_last_modified
+
+
+def profile_last_modified(request, pk: int):
+    """
+    Gets when a profile page last changed, for anonymous users
+
+    :param request: Standard django request object
+    :param pk: The primary key of a User
+    :return: A datetime, or None
+    """
+    if request.user.is_authenticated:
+        return None
+    return _profile_changed(request, pk)
+
+
+def profile_etag(request, pk: int) -> str:
+    """
+    Creates the ETag of a profile page
+
+    :param request: Standard django request object
+    :param pk: The primary key of a User
+    :return: An ETag, or None if there is no such User
+    """
+    return _etag(request, _profile_changed(request, pk))
@@ -1,4 +1,18 @@
+from functools import wraps
+
+from django.conf import settings
 from django.http import Http404
+from django.utils.cache import (get_conditional_response,
+                                patch_cache_control, patch_vary_headers)
+from django.utils.http import parse_http_date_safe
+
+from team_builder.streaming import join_streaming_response
+
+from . import caching
+
+# How long browsers and proxies may keep a page for logged out visitors,
+# in seconds. They can't be purged, so this is kept short.
+PAGE_CACHE_MAX_AGE = getattr(settings, 'PAGE_CACHE_MAX_AGE', 60)
 
 
 def logged_in_admin_or_staff_required(func):
@@ -11,3 +25,57 @@ def logged_in_admin_or_staff_required(func):
             raise Http404("You are not an admin or staff user!")
         return func(request, *args, **kwargs)
     return check_login
+
+
+def anonymous_page_cache(group: str):
+    """
+    Caches whole pages for logged out visitors, who all see the same page.
+    Logged in users always get a freshly rendered, private page.
+
+    :param group: The page group the page is purged with, formatted with
+    the view's keyword arguments, like 'project:{pk}'
+    """
+    def decorator(func):
+        @wraps(func)
+        def cached_page(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD') or \
+                    request.user.is_authenticated:
+                response = func(request, *args, **kwargs)
+                patch_cache_control(response, private=True)
+                patch_vary_headers(response, ('Cookie',))
+                return response
+
+            def render_page():
+                response = func(request, *args, **kwargs)
+                if hasattr(response, 'render') and callable(response.render):
+                    response.render()
+                # Only whole pages can be cached
+                response = join_streaming_response(response)
+
+                patch_cache_control(
+                    response, public=True, max_age=PAGE_CACHE_MAX_AGE
+                )
+                patch_vary_headers(response, ('Cookie',))
+                return response
+
+            response = caching.get_or_rebuild(
+                caching.page_cache_key(
+                    group.format(**kwargs), request.get_full_path()
+                ),
+                render_page, caching.PAGE_CACHE_TIMEOUT, 'page',
+                # Pages setting cookies belong to a single visitor
+                cache_if=lambda response: (
+                    response.status_code == 200 and not response.cookies
+                ),
+            )
+
+            # The cached page may still be current for the browser
+            last_modified = response.get('Last-Modified')
+            return get_conditional_response(
+                request, etag=response.get('ETag'),
+                last_modified=last_modified and
+                parse_http_date_safe(last_modified),
+                response=response,
+            )
+        return cached_page
+    return decorator
@@ -3,6 +3,7 @@ import random
 from django import forms
 from django.contrib.auth import get_user_model
 from django.forms import formset_factory
+from django.urls import reverse_lazy
 
 from . import models
 
@@ -20,6 +21,48 @@ CHOICES = [
 ]
 
 
+class SkillAutocompleteMixin(object):
+    """
+    Only renders the selected skills as options. The other skills are
+    fetched from 'profiles:skill_autocomplete' while the user types,
+    see assets/js/skill_autocomplete.js
+    """
+
+    def __init__(self, attrs=None):
+        attrs = dict(attrs or {})
+        attrs['data-autocomplete-url'] = reverse_lazy(
+            'profiles:skill_autocomplete'
+        )
+        super(SkillAutocompleteMixin, self).__init__(attrs)
+
+    def optgroups(self, name, value, attrs=None):
+        all_choices = self.choices
+        selected = [pk for pk in value if str(pk).isdigit()]
+
+        self.choices = [
+            (skill.pk, str(skill))
+            for skill in all_choices.queryset.filter(pk__in=selected)
+        ]
+        if not self.allow_multiple_selected:
+            self.choices.insert(0, ('', '---------'))
+
+        try:
+            return super(SkillAutocompleteMixin, self).optgroups(
+                name, value, attrs
+            )
+        finally:
+            self.choices = all_choices
+
+
+class SkillAutocompleteSelect(SkillAutocompleteMixin, forms.Select):
+    """A Skill select box that is filled in by autocomplete"""
+
+
+class SkillAutocompleteSelectMultiple(SkillAutocompleteMixin,
+                                      forms.SelectMultiple):
+    """A multiple Skill select box that is filled in by autocomplete"""
+
+
 class NewSkillForm(forms.Form):
     """Form for potential Skills"""
     skill = forms.CharField(max_length=35)
@@ -43,6 +86,7 @@ class SkillForm(forms.ModelForm):
         labels = {
             'name': 'Skill'
         }
+        widgets = {'skills': SkillAutocompleteSelectMultiple}
 
 
 SkillFormSet = formset_factory(SkillForm, extra=0)
@@ -89,7 +133,10 @@ class PositionForm(forms.ModelForm):
             'information',
         ]
 
-        widgets = {'information': forms.Textarea(attrs={'rows': 10})}
+        widgets = {
+            'information': forms.Textarea(attrs={'rows': 10}),
+            'skill': SkillAutocompleteSelect,
+        }
 
 
 class EditPositionForm(PositionForm):
@@ -139,4 +186,9 @@ class UserForm(forms.ModelForm):
         if honey_pot == '':
             return honey_pot
         else:
-            raise forms.ValidationError("Take that bot!")
\ No newline at end of file
+            raise forms.ValidationError("Take that bot!")
+
+
+class AvatarUploadForm(forms.Form):
+    """The image drawn in the image editor"""
+    avatar = forms.ImageField()
@@ -0,0 +1,91 @@
+import json
+import time
+
+from django.core.management.base import BaseCommand
+
+from profiles.benchmarks.corpus import benchmark_database, generate_corpus
+from profiles.benchmarks.runner import PERCENTILES, run_benchmarks, summarize
+
+
+class Command(BaseCommand):
+    """
+    Times the search views against a synthetic corpus. The corpus is
+    created in a throwaway test database, so no real data is touched.
+    """
+    help = 'Reports latency percentiles and query counts of the searches'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--projects', type=int, default=10000,
+            help='How many projects the corpus has (default 10000)'
+        )
+        parser.add_argument(
+            '--seed', type=int, default=0,
+            help='The corpus random seed, the same seed creates the same '
+                 'corpus'
+        )
+        parser.add_argument(
+            '--repeat', type=int, default=5,
+            help='How many times every search is requested'
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='How many projects are inserted at a time'
+        )
+        parser.add_argument(
+            '--json', dest='json_file',
+            help='Also saves the results to this JSON file, so releases '
+                 'can be compared'
+        )
+        parser.add_argument(
+            '--keepdb', action='store_true',
+            help='Keeps the test database and its corpus after the run'
+        )
+
+    def handle(self, *args, **options):
+        with benchmark_database(options['keepdb']):
+            start = time.perf_counter()
+            corpus = generate_corpus(
+                options['projects'], seed=options['seed'],
+                batch_size=options['batch_size'],
+            )
+            self.stdout.write('Created {} projects in {:.1f}s'.format(
+                options['projects'], time.perf_counter() - start
+            ))
+
+            summaries = [
+                summarize(result)
+                for result in run_benchmarks(corpus, options['repeat'])
+            ]
+
+        self.write_table(summaries)
+
+        if options['json_file']:
+            with open(options['json_file'], 'w') as file:
+                json.dump({
+                    'projects': options['projects'],
+                    'seed': options['seed'],
+                    'repeat': options['repeat'],
+                    'results': summaries,
+                }, file, indent=2)
+
+    def write_table(self, summaries: list) -> None:
+        """Prints a row of latencies and query counts for every view"""
+        percentiles = ['p{}_ms'.format(percent) for percent in PERCENTILES]
+        header = '{:<24} {:<7} {:>8}'.format('view', 'cache', 'requests')
+        header += ''.join(' {:>9}'.format(name) for name in percentiles)
+        header += ' {:>8} {:>8}'.format('queries', 'max')
+        self.stdout.write(header)
+
+        for summary in summaries:
+            row = '{:<24} {:<7} {:>8}'.format(
+                summary['view'], 'warm' if summary['cached'] else 'cold',
+                summary['requests'],
+            )
+            row += ''.join(
+                ' {:>9.2f}'.format(summary[name]) for name in percentiles
+            )
+            row += ' {:>8.1f} {:>8}'.format(
+                summary['mean_queries'], summary['max_queries']
+            )
+            self.stdout.write(row)
@@ -0,0 +1,58 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from profiles.benchmarks.corpus import benchmark_database, generate_corpus
+from profiles.benchmarks.rendering import run_render_benchmarks
+
+
+class Command(BaseCommand):
+    """
+    Times the project card listing templates with the Django template
+    language and, if it is installed, Jinja2. The corpus is created in a
+    throwaway test database, so no real data is touched.
+    """
+    help = 'Reports how long each template engine takes to render a card'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--cards', type=int, default=100,
+            help='How many project cards each render has (default 100)'
+        )
+        parser.add_argument(
+            '--seed', type=int, default=0,
+            help='The corpus random seed'
+        )
+        parser.add_argument(
+            '--repeat', type=int, default=20,
+            help='How many times every template is rendered'
+        )
+        parser.add_argument(
+            '--json', dest='json_file',
+            help='Also saves the results to this JSON file'
+        )
+
+    def handle(self, *args, **options):
+        with benchmark_database():
+            corpus = generate_corpus(options['cards'], seed=options['seed'])
+            results = run_render_benchmarks(
+                corpus, options['cards'], options['repeat']
+            )
+
+        self.stdout.write('{:<32} {:<7} {:>6} {:>14} {:>15}'.format(
+            'template', 'engine', 'cards', 'p50_ms/card', 'mean_ms/card'
+        ))
+        for result in results:
+            self.stdout.write('{:<32} {:<7} {:>6} {:>14.4f} {:>15.4f}'.format(
+                result['template'], result['engine'], result['cards'],
+                result['p50_ms_per_card'], result['mean_ms_per_card'],
+            ))
+
+        if options['json_file']:
+            with open(options['json_file'], 'w') as file:
+                json.dump({
+                    'cards': options['cards'],
+                    'seed': options['seed'],
+                    'repeat': options['repeat'],
+                    'results': results,
+                }, file, indent=2)
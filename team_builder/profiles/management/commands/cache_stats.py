@@ -0,0 +1,54 @@
+from django.core.cache import caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.management.base import BaseCommand, CommandError
+
+from profiles import caching
+
+# Backends whose counters only live in the process that counted them
+UNSHARED_CACHES = (DummyCache, LocMemCache)
+
+
+class Command(BaseCommand):
+    """
+    Shows how well the profiles caches are working. The counters are read
+    from the cache, so this needs a cache shared with the web processes,
+    like memcached.
+    """
+    help = 'Shows the hit/miss counters of the profiles caches'
+
+    def handle(self, *args, **options):
+        backend = caches['default']
+        if isinstance(backend, UNSHARED_CACHES):
+            raise CommandError(
+                'The {} cache backend is not shared between processes, so '
+                'the web processes\' counters can\'t be read from here. '
+                'Configure a shared cache, like memcached, or see '
+                '/administrative/cache_stats for the counters of the web '
+                'process that answers.'.format(type(backend).__name__)
+            )
+
+        stats = caching.get_stats()
+
+        for title, counter in (('Search results', 'search'),
+                               ('Logged out pages', 'page')):
+            hits = stats['{}_hits'.format(counter)]
+            misses = stats['{}_misses'.format(counter)]
+            stale = stats['{}_stale'.format(counter)]
+            waits = stats['{}_waits'.format(counter)]
+
+            # Stale copies and waits for a rebuild are answered from the
+            # cache too
+            lookups = hits + misses + stale + waits
+            hit_rate = (lookups - misses) / lookups if lookups else 0
+
+            self.stdout.write(title)
+            self.stdout.write('  hits:          {}'.format(hits))
+            self.stdout.write('  misses:        {}'.format(misses))
+            self.stdout.write('  stale served:  {}'.format(stale))
+            self.stdout.write('  waited:        {}'.format(waits))
+            if counter == 'search':
+                self.stdout.write('  invalidations: {}'.format(
+                    stats['search_invalidations']
+                ))
+            self.stdout.write('  hit rate:      {:.1%}'.format(hit_rate))
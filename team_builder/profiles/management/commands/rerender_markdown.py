@@ -0,0 +1,205 @@
+import json
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+from django.apps import apps
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Case, F, TextField, Value, When
+from django.db.models.functions import Now
+
+# django-markdownx
+from markdownx.utils import markdownify
+
+from team_builder.markdown_rendering import (
+    RenderedMarkdownMixin,
+    markdown_rerendered
+)
+
+
+def _setup_worker():
+    """Sets up django in a worker process that did not fork from this one"""
+    django.setup()
+
+
+def render_rows(rows: list) -> tuple:
+    """
+    Renders the Markdown of a batch of rows. This runs in the worker
+    processes, so it can't touch the database.
+
+    :param rows: A list of (pk, (markdown, ...), (html, ...)) tuples, the
+    stored Markdown and HTML of each field
+    :return: The last pk of the batch, how many rows it had, and a list
+    of the (pk, (markdown, ...), (html, ...)) tuples whose HTML changed
+    """
+    changed = []
+    for pk, markdowns, stored_html in rows:
+        html = tuple(
+            markdownify(markdown) if markdown else '' for markdown in markdowns
+        )
+        if html != stored_html:
+            changed.append((pk, markdowns, html))
+    return rows[-1][0], len(rows), changed
+
+
+def rendered_models() -> list:
+    """Gets every model that stores rendered Markdown"""
+    return [
+        model for model in apps.get_models()
+        if issubclass(model, RenderedMarkdownMixin) and model.markdown_fields
+    ]
+
+
+class Command(BaseCommand):
+    """
+    Renders the stored HTML of every Markdown field again, for when the
+    Markdown extensions change. Rows are read in pk order, rendered by a
+    pool of processes and the ones whose HTML changed are written back
+    with one UPDATE per batch.
+    """
+    help = 'Renders the HTML of every Markdown field again'
+
+    def add_arguments(self, parser):
+        # Each row is 4 query parameters when saved, which keeps 200 under
+        # the 999 parameters older SQLite versions allow
+        parser.add_argument(
+            '--batch-size', type=int, default=200,
+            help='How many rows are rendered and saved at a time'
+        )
+        parser.add_argument(
+            '--workers', type=int, default=os.cpu_count() or 1,
+            help='How many processes render Markdown (default every CPU)'
+        )
+        parser.add_argument(
+            '--checkpoint',
+            help='A JSON file recording the last row saved, so a stopped '
+                 're-render continues where it left off'
+        )
+
+    def handle(self, *args, **options):
+        self.batch_size = options['batch_size']
+        self.checkpoint_file = options['checkpoint']
+        self.checkpoint = self.load_checkpoint()
+
+        self.workers = options['workers']
+        executor = None
+        if self.workers > 1:
+            executor = ProcessPoolExecutor(
+                max_workers=self.workers, initializer=_setup_worker
+            )
+
+        try:
+            for model in rendered_models():
+                self.rerender_model(model, executor)
+        finally:
+            if executor is not None:
+                executor.shutdown()
+
+        # Everything was rendered, the next run starts from the beginning
+        if self.checkpoint_file and os.path.exists(self.checkpoint_file):
+            os.remove(self.checkpoint_file)
+
+    def load_checkpoint(self) -> dict:
+        """Gets the last pk saved for each model by a stopped run"""
+        if self.checkpoint_file and os.path.exists(self.checkpoint_file):
+            with open(self.checkpoint_file) as file:
+                return json.load(file)
+        return {}
+
+    def save_checkpoint(self, label: str, pk: int) -> None:
+        """Records the last pk saved for a model"""
+        self.checkpoint[label] = pk
+        if self.checkpoint_file:
+            with open(self.checkpoint_file, 'w') as file:
+                json.dump(self.checkpoint, file)
+
+    def batches(self, model, start_after: int):
+        """
+        Streams (pk, (markdown, ...), (html, ...)) rows of a model in pk
+        order, a batch at a time. Each batch starts after the last pk of
+        the one before, so the rows being updated are never scanned again.
+        """
+        count = len(model.markdown_fields)
+        fields = ['pk'] + list(model.markdown_fields) + \
+            list(model.markdown_fields.values())
+        last_pk = start_after
+
+        while True:
+            rows = list(
+                model.objects.filter(pk__gt=last_pk).order_by('pk')
+                .values_list(*fields)[:self.batch_size].iterator()
+            )
+            if not rows:
+                return
+            yield [
+                (row[0], row[1:count + 1], row[count + 1:]) for row in rows
+            ]
+            last_pk = rows[-1][0]
+
+    def rerender_model(self, model, executor) -> None:
+        """Renders and saves the Markdown fields of every row of a model"""
+        label = model._meta.label
+        start_after = self.checkpoint.get(label, 0)
+        total = model.objects.count()
+        done = model.objects.filter(pk__lte=start_after).count()
+
+        batches = self.batches(model, start_after)
+        if executor is None:
+            results = map(render_rows, batches)
+        else:
+            results = self.render_in_pool(batches, executor)
+
+        for last_pk, row_count, rendered in results:
+            if rendered:
+                self.save_rendered(model, rendered)
+            self.save_checkpoint(label, last_pk)
+
+            done += row_count
+            self.stdout.write('{}: {}/{}'.format(label, done, total))
+
+    def render_in_pool(self, batches, executor):
+        """
+        Renders batches in the process pool, in order. Only a couple of
+        batches per worker are read ahead, so memory use stays flat no
+        matter how many rows there are.
+        """
+        pending = deque()
+        for rows in batches:
+            pending.append(executor.submit(render_rows, rows))
+            if len(pending) >= self.workers * 2:
+                yield pending.popleft().result()
+
+        while pending:
+            yield pending.popleft().result()
+
+    @staticmethod
+    def save_rendered(model, rendered: list) -> None:
+        """
+        Saves a batch of rendered HTML with a single UPDATE, then tells the
+        receivers of markdown_rerendered which rows changed
+        """
+        pks = [pk for pk, markdowns, html in rendered]
+
+        # A field is only written if its Markdown is still what was
+        # rendered. A row edited since was rendered by its own save().
+        updates = {
+            html_field: Case(
+                *[When(pk=pk, then=Value(html[index]),
+                       **{field: markdowns[index]})
+                  for pk, markdowns, html in rendered],
+                default=F(html_field),
+                output_field=TextField()
+            )
+            for index, (field, html_field)
+            in enumerate(model.markdown_fields.items())
+        }
+        # update() doesn't set auto_now fields, which conditional GETs use
+        if any(field.name == 'updated_at' for field in model._meta.fields):
+            updates['updated_at'] = Now()
+
+        with transaction.atomic():
+            model.objects.filter(pk__in=pks).update(**updates)
+
+        markdown_rerendered.send(sender=model, pks=pks)
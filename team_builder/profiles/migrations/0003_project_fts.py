@@ -0,0 +1,58 @@
+from django.db import migrations
+from django.db.utils import OperationalError
+
+
+def create_project_fts(apps, schema_editor):
+    """
+    Creates the FTS5 table used to search Projects and fills it with
+    every existing Project. Only SQLite builds with FTS5 support get the
+    table, everything else falls back to an icontains search.
+    """
+    connection = schema_editor.connection
+    if connection.vendor != 'sqlite':
+        return
+
+    with connection.cursor() as cursor:
+        try:
+            cursor.execute(
+                "CREATE VIRTUAL TABLE profiles_project_fts USING fts5("
+                "title, time_line, requirements, description, information, "
+                "tokenize = 'porter unicode61 remove_diacritics 1')"
+            )
+        except OperationalError:
+            # This SQLite was compiled without FTS5
+            return
+
+        project_model = apps.get_model('profiles', 'Project')
+        position_model = apps.get_model('profiles', 'Position')
+
+        for project in project_model.objects.all().iterator():
+            information = ' '.join(
+                position_model.objects.filter(related_project=project)
+                .values_list('information', flat=True)
+            )
+            cursor.execute(
+                'INSERT INTO profiles_project_fts (rowid, title, time_line, '
+                'requirements, description, information) '
+                'VALUES (%s, %s, %s, %s, %s, %s)',
+                [project.pk, project.title, project.time_line,
+                 project.requirements, project.description, information]
+            )
+
+
+def drop_project_fts(apps, schema_editor):
+    """Removes the Project FTS5 table if it was created"""
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute('DROP TABLE IF EXISTS profiles_project_fts')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('profiles', '0002_add_default_skills'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_project_fts, drop_project_fts),
+    ]
@@ -0,0 +1,72 @@
+# Generated by Django 2.0.4 on 2026-10-18 08:52
+
+import re
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def trigrams(text: str) -> set:
+    """
+    A copy of profiles.search.trigrams as it was when this migration was
+    written, so later changes to it don't change the migration
+    """
+    grams = set()
+    for word in re.findall(r'\w+', text.lower()):
+        padded = '  {} '.format(word)
+        for index in range(len(padded) - 2):
+            grams.add(padded[index:index + 3])
+    return grams
+
+
+def index_existing_terms(apps, schema_editor):
+    """Splits every existing Project title and Skill name into trigrams"""
+    search_term_model = apps.get_model('profiles', 'SearchTerm')
+    trigram_model = apps.get_model('profiles', 'Trigram')
+
+    sources = (
+        ('project', apps.get_model('profiles', 'Project'), 'title'),
+        ('skill', apps.get_model('profiles', 'Skill'), 'skill'),
+    )
+    for kind, model, field in sources:
+        for object_id, value in model.objects.values_list('pk', field):
+            grams = trigrams(value)
+            term = search_term_model.objects.create(
+                kind=kind, object_id=object_id,
+                trigram_count=len(grams), value=value
+            )
+            trigram_model.objects.bulk_create(
+                trigram_model(gram=gram, term=term) for gram in grams
+            )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('profiles', '0003_project_fts'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchTerm',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('project', 'Project title'), ('skill', 'Skill')], max_length=10)),
+                ('object_id', models.PositiveIntegerField()),
+                ('trigram_count', models.PositiveSmallIntegerField()),
+                ('value', models.CharField(max_length=40)),
+            ],
+            options={
+                'unique_together': {('kind', 'object_id')},
+            },
+        ),
+        migrations.CreateModel(
+            name='Trigram',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('gram', models.CharField(db_index=True, max_length=3)),
+                ('term', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='trigrams', to='profiles.SearchTerm')),
+            ],
+        ),
+        migrations.RunPython(index_existing_terms, migrations.RunPython.noop),
+    ]
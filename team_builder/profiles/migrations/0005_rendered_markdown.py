@@ -0,0 +1,44 @@
+# Generated by Django 2.0.4 on 2026-10-18 09:04
+
+from django.db import migrations, models
+
+# django-markdownx
+from markdownx.utils import markdownify
+
+
+def render_existing_markdown(apps, schema_editor):
+    """Renders the Markdown of every existing Project and Position"""
+    sources = (
+        (apps.get_model('profiles', 'Project'), 'description'),
+        (apps.get_model('profiles', 'Position'), 'time_commitment'),
+    )
+    for model, field in sources:
+        html_field = '{}_html'.format(field)
+        for pk, markdown in model.objects.values_list('pk', field).iterator():
+            if markdown:
+                model.objects.filter(pk=pk).update(
+                    **{html_field: markdownify(markdown)}
+                )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('profiles', '0004_search_trigrams'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='position',
+            name='time_commitment_html',
+            field=models.TextField(blank=True, editable=False),
+        ),
+        migrations.AddField(
+            model_name='project',
+            name='description_html',
+            field=models.TextField(blank=True, editable=False),
+        ),
+        migrations.RunPython(
+            render_existing_markdown, migrations.RunPython.noop
+        ),
+    ]
@@ -3,7 +3,8 @@ from django.db import models
 
 # django-markdownx
 from markdownx.models import MarkdownxField
-from markdownx.utils import markdownify
+
+from team_builder.markdown_rendering import RenderedMarkdownMixin
 
 
 class AllSkills(models.Model):
@@ -55,28 +56,34 @@ class SkillConfirmation(models.Model):
             return 'Non-pending skill: {}'.format(self.skill)
 
 
-class Project(models.Model):
+class Project(RenderedMarkdownMixin, models.Model):
     """This is the model for a Project"""
     owner = models.ForeignKey(
         settings.AUTH_USER_MODEL, on_delete=models.CASCADE
     )
     description = MarkdownxField(max_length=1000)
+    # description rendered as HTML, see RenderedMarkdownMixin
+    description_html = models.TextField(blank=True, editable=False)
     positions = models.ManyToManyField('Position', blank=True)
     requirements = models.CharField(max_length=100)
     time_line = models.CharField(max_length=30)
     title = models.CharField(max_length=40, unique=True)
+    # For conditional GETs of the project page, see conditional.py
+    updated_at = models.DateTimeField(auto_now=True)
+
+    markdown_fields = {'description': 'description_html'}
 
     def __str__(self):
         return self.title
 
     @property
     def description_markdown(self):
-        """This allows us to turn self.description into markdown to send
+        """This sends self.description, already rendered from markdown,
         to a template for display."""
-        return markdownify(self.description)
+        return self.description_html
 
 
-class Position(models.Model):
+class Position(RenderedMarkdownMixin, models.Model):
     """This holds onto position information for a Project"""
     related_project = models.ForeignKey(
         Project,
@@ -105,6 +112,12 @@ class Position(models.Model):
 
     information = models.CharField(max_length=500)
     time_commitment = MarkdownxField(max_length=400)
+    # time_commitment rendered as HTML, see RenderedMarkdownMixin
+    time_commitment_html = models.TextField(blank=True, editable=False)
+    # For conditional GETs of the project page, see conditional.py
+    updated_at = models.DateTimeField(auto_now=True)
+
+    markdown_fields = {'time_commitment': 'time_commitment_html'}
 
     def __str__(self):
         """Returns the skill and information with ... if info is to long"""
@@ -128,9 +141,9 @@ class Position(models.Model):
 
     @property
     def time_commitment_markdown(self):
-        """This allows us to turn self.time_commitment into markdown to send
+        """This sends self.time_commitment, already rendered from markdown,
         to a template for display."""
-        return markdownify(self.time_commitment)
+        return self.time_commitment_html
 
 
 class Applicants(models.Model):
@@ -150,4 +163,42 @@ class Applicants(models.Model):
 
     def __str__(self):
         """Shows the User's name and Applicant pk"""
-        return str(self.applicant)
\ No newline at end of file
+        return str(self.applicant)
+
+
+class SearchTerm(models.Model):
+    """
+    A Project title or Skill name that can be found by a fuzzy search.
+    Its trigrams are held by the Trigram model.
+    """
+    PROJECT_TITLE = 'project'
+    SKILL = 'skill'
+    KIND_CHOICES = (
+        (PROJECT_TITLE, 'Project title'),
+        (SKILL, 'Skill'),
+    )
+
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+
+    # The pk of the Project or Skill this term belongs to
+    object_id = models.PositiveIntegerField()
+
+    trigram_count = models.PositiveSmallIntegerField()
+    value = models.CharField(max_length=40)
+
+    class Meta:
+        unique_together = ('kind', 'object_id')
+
+    def __str__(self):
+        return '{}: {}'.format(self.kind, self.value)
+
+
+class Trigram(models.Model):
+    """A three letter piece of a SearchTerm, indexed for fuzzy searching"""
+    gram = models.CharField(max_length=3, db_index=True)
+    term = models.ForeignKey(
+        SearchTerm, on_delete=models.CASCADE, related_name='trigrams'
+    )
+
+    def __str__(self):
+        return '{} ({})'.format(self.gram, self.term.value)
@@ -0,0 +1,171 @@
+"""
+Keyset pagination for the project listings.
+
+Instead of a page number each page link holds the pk of the first or last
+project shown, as ?before=<pk> or ?after=<pk>. A queryset page is then a
+pk range lookup on the primary key index, so later pages cost the same as
+the first instead of scanning past every earlier row like OFFSET does.
+
+Cached search results are lists of pks. Those in pk order are paged with
+the same pk keyset, found in the list with bisect. Ranked results, like
+the text search's relevance order, have no keyset to page by, so their
+pages start next to the cursor's place in the cached list.
+"""
+
+import bisect
+
+from django.conf import settings
+
+# How many projects are shown on each listing page
+PROJECTS_PER_PAGE = getattr(settings, 'PROJECTS_PER_PAGE', 20)
+
+
+class KeysetPage(object):
+    """
+    A single page of objects and the cursors of its neighbours.
+    count is the total number of objects across all pages, when it is
+    known.
+    """
+
+    def __init__(self, object_list, next_cursor=None, previous_cursor=None,
+                 count=None):
+        self.count = count
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+
+def _get_cursor(request, name: str):
+    """Gets a pk cursor from the query string, ignoring anything invalid"""
+    try:
+        return int(request.GET[name])
+    except (KeyError, ValueError):
+        return None
+
+
+def paginate_ids(project_ids: list, request, page_size: int,
+                 ranked: bool = False) -> KeysetPage:
+    """
+    Gets a page of an ordered list of pks, like cached search results
+
+    :param project_ids: A list of pks in the order they are shown
+    :param request: Standard django request object holding the cursor
+    :param page_size: How many pks are on a page
+    :param ranked: False if project_ids is in ascending pk order, which is
+    paged like paginate_queryset(), True for any other order
+    :return: A KeysetPage of pks
+    """
+    after = _get_cursor(request, 'after')
+    before = _get_cursor(request, 'before')
+
+    if ranked:
+        # A cursor that is no longer in the results starts from the
+        # beginning
+        positions = {pk: index for index, pk in enumerate(project_ids)}
+        if before in positions:
+            end = positions[before]
+            start = max(end - page_size, 0)
+        else:
+            start = positions[after] + 1 if after in positions else 0
+            end = start + page_size
+    elif before is not None:
+        # The pks below the cursor, even if it is no longer in the results
+        end = bisect.bisect_left(project_ids, before)
+        start = max(end - page_size, 0)
+    else:
+        start = 0 if after is None else bisect.bisect_right(project_ids, after)
+        end = start + page_size
+
+    page_ids = project_ids[start:end]
+    return KeysetPage(
+        page_ids,
+        next_cursor=page_ids[-1] if end < len(project_ids) else None,
+        previous_cursor=page_ids[0] if start > 0 and page_ids else None,
+        count=len(project_ids),
+    )
+
+
+def paginate_queryset(queryset, request, page_size: int) -> KeysetPage:
+    """
+    Gets a page of a queryset, ordered by pk
+
+    :param queryset: Any model queryset
+    :param request: Standard django request object holding the cursor
+    :param page_size: How many objects are on a page
+    :return: A KeysetPage of model objects
+    """
+    after = _get_cursor(request, 'after')
+    before = _get_cursor(request, 'before')
+
+    # One extra object is fetched to find out if there is another page
+    if before is not None:
+        objects = list(
+            queryset.filter(pk__lt=before).order_by('-pk')[:page_size + 1]
+        )
+        has_more = len(objects) > page_size
+        objects = objects[:page_size][::-1]
+        return KeysetPage(
+            objects,
+            next_cursor=objects[-1].pk if objects else None,
+            previous_cursor=objects[0].pk if has_more else None,
+        )
+
+    if after is not None:
+        queryset = queryset.filter(pk__gt=after)
+
+    objects = list(queryset.order_by('pk')[:page_size + 1])
+    has_more = len(objects) > page_size
+    objects = objects[:page_size]
+    return KeysetPage(
+        objects,
+        next_cursor=objects[-1].pk if has_more else None,
+        previous_cursor=objects[0].pk if after is not None and objects
+        else None,
+    )
+
+
+def page_url(request, name: str, cursor: int) -> str:
+    """
+    Creates the query string link for another page, keeping the
+    rest of the query string such as the search_term
+
+    :param request: Standard django request object
+    :param name: 'after' or 'before'
+    :param cursor: The pk to page from
+    :return: A query string starting with '?'
+    """
+    query = request.GET.copy()
+    query.pop('after', None)
+    query.pop('before', None)
+    query[name] = cursor
+    return '?' + query.urlencode()
+
+
+class KeysetPaginationMixin(object):
+    """
+    Adds next_page_url and previous_page_url to a ListView's context
+    from self.page, which the view's get_queryset() should set
+    """
+    page = None
+    page_size = PROJECTS_PER_PAGE
+
+    def get_context_data(self, **kwargs):
+        context = super(KeysetPaginationMixin, self).get_context_data(
+            **kwargs
+        )
+        if self.page is not None:
+            if self.page.next_cursor is not None:
+                context['next_page_url'] = page_url(
+                    self.request, 'after', self.page.next_cursor
+                )
+            if self.page.previous_cursor is not None:
+                context['previous_page_url'] = page_url(
+                    self.request, 'before', self.page.previous_cursor
+                )
+        return context
@@ -0,0 +1,364 @@
+"""
+Full-text searching for Projects.
+
+On SQLite the profiles_project_fts FTS5 table (see migration 0003) holds
+one row per Project, keyed by the Project's pk, with the text of every
+searchable field. The table is kept in sync by the receivers in signals.py.
+If the table does not exist the old icontains search is used instead.
+
+Project titles and Skill names are also split into trigrams (see the
+SearchTerm and Trigram models) so misspelled searches can still find them.
+"""
+
+import math
+import re
+from collections import Counter, namedtuple
+
+from django.db import connection
+from django.db.models import Count, Q
+
+from . import models
+
+FTS_TABLE = 'profiles_project_fts'
+
+# bm25() weights for the FTS_TABLE columns, in the order they were created:
+# title, time_line, requirements, description, information
+COLUMN_WEIGHTS = (10.0, 2.0, 2.0, 4.0, 3.0)
+
+# The share of a search's trigrams a term needs to count as similar
+TRIGRAM_THRESHOLD = 0.4
+
+# The most similar terms used to find Projects for a misspelled search
+SIMILAR_TERMS_LIMIT = 10
+
+# What a search found: the Project pks in display order, a dictionary of
+# Skill pk to the number of open positions for it in those Projects,
+# whether the exact search found nothing, so the Projects are the ones of
+# similar titles or skills, and the pks of the Skills searched for
+SearchResults = namedtuple(
+    'SearchResults', ['project_ids', 'skill_facets', 'fuzzy', 'skill_ids']
+)
+
+# Remembers if FTS_TABLE exists so it is only looked up once per process
+_fts_available = None
+
+
+def fts_available() -> bool:
+    """Checks if the full-text search table exists in the database"""
+    global _fts_available
+
+    if _fts_available is None:
+        _fts_available = (
+            connection.vendor == 'sqlite' and
+            FTS_TABLE in connection.introspection.table_names()
+        )
+    return _fts_available
+
+
+def build_match_expression(search_term: str) -> str:
+    """
+    Turns a user's search term into an FTS5 MATCH expression.
+
+    Every word becomes a quoted prefix query so punctuation can't be read
+    as FTS5 syntax, and so 'Djan' still finds 'Django'.
+
+    :param search_term: The string a user searched with
+    :return: A MATCH expression, or '' if the term has no words in it
+    """
+    words = re.findall(r'\w+', search_term)
+    return ' '.join('"{}"*'.format(word) for word in words)
+
+
+def index_project(project: models.Project) -> bool:
+    """
+    Adds or replaces a Project's row in the full-text search table
+
+    :param project: A Project model object
+    :return: False if the Project's searched text didn't change
+    """
+    if not fts_available():
+        return True
+
+    information = ' '.join(
+        models.Position.objects.filter(related_project=project)
+        .values_list('information', flat=True)
+    )
+    row = (project.title, project.time_line, project.requirements,
+           project.description, information)
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT title, time_line, requirements, description, '
+            'information FROM {} WHERE rowid = %s'.format(FTS_TABLE),
+            [project.pk]
+        )
+        if cursor.fetchone() == row:
+            return False
+
+        cursor.execute(
+            'DELETE FROM {} WHERE rowid = %s'.format(FTS_TABLE),
+            [project.pk]
+        )
+        cursor.execute(
+            'INSERT INTO {} (rowid, title, time_line, requirements, '
+            'description, information) VALUES (%s, %s, %s, %s, %s, %s)'
+            .format(FTS_TABLE),
+            (project.pk,) + row
+        )
+    return True
+
+
+def reindex_project(project_pk: int) -> bool:
+    """
+    Re-indexes a Project by its pk. If the Project no longer exists
+    its row is removed from the full-text search table instead.
+
+    :param project_pk: The primary key of a Project
+    :return: False if the Project's searched text didn't change, or the
+    Project no longer exists
+    """
+    try:
+        project = models.Project.objects.get(pk=project_pk)
+    except models.Project.DoesNotExist:
+        remove_project(project_pk)
+        return False
+    return index_project(project)
+
+
+def remove_project(project_pk: int) -> None:
+    """
+    Removes a Project from the full-text search table
+
+    :param project_pk: The primary key of a Project
+    """
+    if not fts_available():
+        return
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'DELETE FROM {} WHERE rowid = %s'.format(FTS_TABLE),
+            [project_pk]
+        )
+
+
+def index_all_projects() -> None:
+    """
+    Rebuilds the full-text search table from every Project in one
+    INSERT ... SELECT, for Projects created without their signals
+    """
+    if not fts_available():
+        return
+
+    with connection.cursor() as cursor:
+        cursor.execute('DELETE FROM {}'.format(FTS_TABLE))
+        cursor.execute(
+            'INSERT INTO {fts} (rowid, title, time_line, requirements, '
+            'description, information) '
+            'SELECT project.id, project.title, project.time_line, '
+            'project.requirements, project.description, '
+            "COALESCE((SELECT group_concat(position.information, ' ') "
+            'FROM {position} position '
+            'WHERE position.related_project_id = project.id), %s) '
+            'FROM {project} project'.format(
+                fts=FTS_TABLE,
+                position=models.Position._meta.db_table,
+                project=models.Project._meta.db_table,
+            ),
+            ['']
+        )
+
+
+def search_projects(queryset, search_term: str):
+    """
+    Filters a Project queryset down to the Projects matching search_term.
+
+    With the full-text search table the results are ordered by bm25
+    relevance, best match first. Otherwise every text field is checked
+    with icontains.
+
+    :param queryset: A Project model queryset
+    :param search_term: The string a user searched with
+    :return: The filtered Project queryset
+    """
+    match = build_match_expression(search_term)
+
+    if not match or not fts_available():
+        return queryset.filter(
+            Q(title__icontains=search_term) |
+            Q(time_line__icontains=search_term) |
+            Q(requirements__icontains=search_term) |
+            Q(description__icontains=search_term) |
+            Q(positions__information__icontains=search_term)
+        )
+
+    weights = ', '.join(str(weight) for weight in COLUMN_WEIGHTS)
+    project_table = models.Project._meta.db_table
+
+    return queryset.extra(
+        select={'rank': 'bm25({}, {})'.format(FTS_TABLE, weights)},
+        tables=[FTS_TABLE],
+        where=[
+            '{}.rowid = {}.id'.format(FTS_TABLE, project_table),
+            '{} MATCH %s'.format(FTS_TABLE),
+        ],
+        params=[match],
+        order_by=['rank', 'id'],
+    )
+
+
+def count_open_positions(project_ids: list) -> dict:
+    """
+    Counts the open positions per skill in the Projects a search found,
+    with a single GROUP BY over their pks. Only searches finding more pks
+    than the database takes in one query need another query.
+
+    :param project_ids: The pks of the Projects the search found
+    :return: A dictionary of Skill pk to number of open positions
+    """
+    if not project_ids:
+        return {}
+    # Only some databases, like SQLite, limit the parameters of a query
+    chunk_size = connection.features.max_query_params or len(project_ids)
+
+    counts = Counter()
+    for start in range(0, len(project_ids), chunk_size):
+        counts.update(dict(
+            models.Position.objects
+            .filter(
+                filled=False,
+                related_project__in=project_ids[start:start + chunk_size]
+            )
+            .values('skill')
+            .annotate(open_positions=Count('pk'))
+            .values_list('skill', 'open_positions')
+        ))
+    return dict(counts)
+
+
+def trigrams(text: str) -> set:
+    """
+    Splits text into the set of trigrams used for fuzzy searching.
+
+    Each word is lowercased and padded so its first and last letters are
+    weighted as heavily as the middle ones. 'Go' -> '  g', ' go', 'go '
+
+    :param text: Any string
+    :return: A set of three character strings
+    """
+    grams = set()
+    for word in re.findall(r'\w+', text.lower()):
+        padded = '  {} '.format(word)
+        for index in range(len(padded) - 2):
+            grams.add(padded[index:index + 3])
+    return grams
+
+
+def index_term(kind: str, object_id: int, value: str) -> None:
+    """
+    Adds or replaces the trigrams for a Project title or Skill name
+
+    :param kind: models.SearchTerm.PROJECT_TITLE or models.SearchTerm.SKILL
+    :param object_id: The pk of the Project or Skill
+    :param value: The title or skill name
+    """
+    try:
+        term = models.SearchTerm.objects.get(kind=kind, object_id=object_id)
+    except models.SearchTerm.DoesNotExist:
+        term = models.SearchTerm(kind=kind, object_id=object_id)
+    else:
+        # Most saves don't touch the title or skill name
+        if term.value == value:
+            return
+        term.trigrams.all().delete()
+
+    grams = trigrams(value)
+    term.trigram_count = len(grams)
+    term.value = value
+    term.save()
+
+    models.Trigram.objects.bulk_create(
+        models.Trigram(gram=gram, term=term) for gram in grams
+    )
+
+
+def remove_term(kind: str, object_id: int) -> None:
+    """
+    Removes a Project title or Skill name from the trigram index
+
+    :param kind: models.SearchTerm.PROJECT_TITLE or models.SearchTerm.SKILL
+    :param object_id: The pk of the Project or Skill
+    """
+    models.SearchTerm.objects.filter(kind=kind, object_id=object_id).delete()
+
+
+def similar_terms(kind: str, text: str):
+    """
+    Finds the SearchTerms that share most of their trigrams with text.
+
+    Only the indexed trigrams of text are looked up, and terms are ordered
+    by the number of shared trigrams, then shortest first.
+
+    :param kind: models.SearchTerm.PROJECT_TITLE or models.SearchTerm.SKILL
+    :param text: The string a user searched with
+    :return: A SearchTerm queryset with a 'shared' annotation
+    """
+    grams = trigrams(text)
+    if not grams:
+        return models.SearchTerm.objects.none()
+
+    needed = math.ceil(len(grams) * TRIGRAM_THRESHOLD)
+
+    return (
+        models.SearchTerm.objects
+        .filter(kind=kind, trigrams__gram__in=grams)
+        .annotate(shared=Count('trigrams'))
+        .filter(shared__gte=needed)
+        .order_by('-shared', 'trigram_count')
+    )
+
+
+def did_you_mean(text: str, kinds: tuple) -> str:
+    """
+    Suggests the closest Project title or Skill name to a search.
+
+    :param text: The string a user searched with
+    :param kinds: The SearchTerm kinds to take suggestions from
+    :return: The closest value, or '' if there is none or it is the same
+    as text
+    """
+    best = None
+    for kind in kinds:
+        term = similar_terms(kind, text).first()
+        if term and (best is None or term.shared > best.shared):
+            best = term
+
+    if best is None or best.value.lower() == text.lower():
+        return ''
+    return best.value
+
+
+def similar_projects(queryset, text: str, kinds: tuple):
+    """
+    Filters a Project queryset down to the Projects with a title similar
+    to text, or an open position for a Skill similar to text.
+
+    :param queryset: A Project model queryset
+    :param text: The string a user searched with
+    :param kinds: The SearchTerm kinds to match Projects with
+    :return: The filtered Project queryset
+    """
+    conditions = Q(pk__in=[])
+
+    for kind in kinds:
+        object_ids = list(
+            similar_terms(kind, text)
+            .values_list('object_id', flat=True)[:SIMILAR_TERMS_LIMIT]
+        )
+        if kind == models.SearchTerm.PROJECT_TITLE:
+            conditions |= Q(pk__in=object_ids)
+        else:
+            conditions |= Q(
+                positions__skill__in=object_ids, positions__filled=False
+            )
+
+    return queryset.filter(conditions).distinct()
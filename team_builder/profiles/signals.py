@@ -0,0 +1,247 @@
+"""
+Signal receivers for the profiles app.
+
+These are connected in ProfilesConfig.ready()
+"""
+
+from django.contrib.auth import get_user_model
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from team_builder.markdown_rendering import markdown_rerendered
+
+from . import caching
+from . import models
+from . import search
+from .autocomplete import skill_index
+
+
+@receiver(post_save, sender=models.Project)
+def index_saved_project(sender, instance, **kwargs):
+    """Keeps the search indexes up to date with a saved Project"""
+    text_changed = search.index_project(instance)
+    search.index_term(
+        models.SearchTerm.PROJECT_TITLE, instance.pk, instance.title
+    )
+    # Only changed text can make the Project match other text searches
+    caching.invalidate_project_searches(
+        instance.pk, could_join=text_changed
+    )
+    caching.bump_card_version(instance.pk)
+
+
+@receiver(post_delete, sender=models.Project)
+def unindex_deleted_project(sender, instance, **kwargs):
+    """Removes a deleted Project from the search indexes"""
+    search.remove_project(instance.pk)
+    search.remove_term(models.SearchTerm.PROJECT_TITLE, instance.pk)
+    caching.invalidate_project_searches(instance.pk)
+
+    # The owner's profile page no longer lists the Project
+    get_user_model().objects.filter(pk=instance.owner_id)\
+        .update(updated_at=timezone.now())
+
+
+@receiver(post_save, sender=models.Position)
+@receiver(post_delete, sender=models.Position)
+def reindex_position_project(sender, instance, **kwargs):
+    """Positions are searched and shown as part of their Project"""
+    text_changed = search.reindex_project(instance.related_project_id)
+
+    # A deleted or filled position can only take its Project out of
+    # searches, an open one can also add it to its skill's searches
+    is_open = kwargs['signal'] is post_save and not instance.filled
+    caching.invalidate_project_searches(
+        instance.related_project_id,
+        could_join=is_open or
+        (text_changed and kwargs['signal'] is post_save),
+        skill_pks=[instance.skill_id] if is_open else [],
+    )
+    caching.bump_card_version(instance.related_project_id)
+
+
+@receiver(post_delete, sender=models.Position)
+def touch_position_project(sender, instance, **kwargs):
+    """A deleted Position changes its Project's page"""
+    models.Project.objects.filter(pk=instance.related_project_id)\
+        .update(updated_at=timezone.now())
+
+
+@receiver(m2m_changed, sender=models.Project.positions.through)
+def invalidate_project_positions(sender, instance, action, **kwargs):
+    """Searches find, and cards show, Projects through their positions"""
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+
+    if isinstance(instance, models.Project):
+        project_pks = [instance.pk]
+        positions = models.Position.objects\
+            .filter(pk__in=kwargs['pk_set'] or [])
+    else:
+        project_pks = instance.project_set.values_list('pk', flat=True)
+        positions = models.Position.objects.filter(pk=instance.pk)
+
+    # Added open positions can add their Projects to searches
+    skill_pks = []
+    if action == 'post_add':
+        skill_pks = set(
+            positions.filter(filled=False).values_list('skill', flat=True)
+        )
+
+    for project_pk in project_pks:
+        caching.invalidate_project_searches(
+            project_pk, could_join=bool(skill_pks), skill_pks=skill_pks
+        )
+        caching.bump_card_version(project_pk)
+
+    models.Project.objects.filter(pk__in=list(project_pks))\
+        .update(updated_at=timezone.now())
+
+
+@receiver(m2m_changed, sender=models.AllSkills.skills.through)
+def touch_skills_user(sender, instance, action, **kwargs):
+    """A User's skills are shown on their profile page"""
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+
+    if isinstance(instance, models.AllSkills):
+        users = get_user_model().objects.filter(pk=instance.user_id)
+    else:
+        users = get_user_model().objects\
+            .filter(allskills__in=kwargs['pk_set'] or [])
+    users.update(updated_at=timezone.now())
+
+
+@receiver(post_save, sender=models.Skill)
+def index_saved_skill(sender, instance, **kwargs):
+    """Keeps the skill indexes and cached skills up to date with a Skill"""
+    search.index_term(models.SearchTerm.SKILL, instance.pk, instance.skill)
+    skill_index.add(instance.pk, instance.skill, caching.invalidate_skills())
+
+    # The skills version makes the searches by skill name stale, a renamed
+    # Skill also changes the cards of the Projects needing it
+    if not kwargs['created']:
+        project_pks = models.Position.objects.filter(skill=instance)\
+            .values_list('related_project_id', flat=True).distinct()
+        for project_pk in project_pks:
+            caching.bump_card_version(project_pk)
+
+        # The skill name is shown on the pages of Positions and Users
+        now = timezone.now()
+        models.Position.objects.filter(skill=instance).update(updated_at=now)
+        get_user_model().objects.filter(allskills__skills=instance)\
+            .update(updated_at=now)
+
+
+@receiver(post_delete, sender=models.Skill)
+def unindex_deleted_skill(sender, instance, **kwargs):
+    """Removes a deleted Skill from the skill indexes and cached skills"""
+    search.remove_term(models.SearchTerm.SKILL, instance.pk)
+    skill_index.remove(instance.pk, caching.invalidate_skills())
+
+
+def _purge_project_pages(project_pks) -> None:
+    """Purges the cached pages showing some Projects"""
+    groups = ['homepage']
+    for project_pk, owner_pk in models.Project.objects\
+            .filter(pk__in=list(project_pks)).values_list('pk', 'owner_id'):
+        groups += ['project:{}'.format(project_pk),
+                   'profile:{}'.format(owner_pk)]
+    caching.purge_pages(*groups)
+
+
+@receiver(post_save, sender=models.Project)
+@receiver(post_delete, sender=models.Project)
+def purge_project_pages(sender, instance, **kwargs):
+    """Purges the cached pages a Project is shown on"""
+    caching.purge_pages(
+        'homepage', 'project:{}'.format(instance.pk),
+        'profile:{}'.format(instance.owner_id)
+    )
+
+
+@receiver(post_save, sender=models.Position)
+@receiver(post_delete, sender=models.Position)
+def purge_position_pages(sender, instance, **kwargs):
+    """Purges the cached pages a Position is shown on"""
+    _purge_project_pages([instance.related_project_id])
+
+
+@receiver(m2m_changed, sender=models.Project.positions.through)
+def purge_project_positions_pages(sender, instance, action, **kwargs):
+    """Purges the cached pages of Projects whose positions changed"""
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+
+    if isinstance(instance, models.Project):
+        _purge_project_pages([instance.pk])
+    else:
+        _purge_project_pages(instance.project_set.values_list('pk', flat=True))
+
+
+@receiver(post_save, sender=models.Skill)
+@receiver(post_delete, sender=models.Skill)
+def purge_skill_pages(sender, instance, **kwargs):
+    """A new Skill is shown on the homepage, a changed one anywhere"""
+    if kwargs.get('created'):
+        caching.purge_pages('homepage')
+    else:
+        caching.purge_pages(caching.ALL_PAGES)
+
+
+@receiver(post_save, sender=get_user_model())
+def purge_user_pages(sender, instance, **kwargs):
+    """Purges a User's profile and the pages of the Projects they own"""
+    # Logging in only changes last_login, which isn't shown anywhere
+    if kwargs['update_fields'] == frozenset(['last_login']):
+        return
+
+    groups = ['profile:{}'.format(instance.pk)] + [
+        'project:{}'.format(project_pk) for project_pk in
+        models.Project.objects.filter(owner=instance)
+        .values_list('pk', flat=True)
+    ]
+    caching.purge_pages(*groups)
+
+
+@receiver(m2m_changed, sender=models.AllSkills.skills.through)
+def purge_skills_user_pages(sender, instance, action, **kwargs):
+    """A User's skills are shown on their profile page"""
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+
+    if isinstance(instance, models.AllSkills):
+        caching.purge_pages('profile:{}'.format(instance.user_id))
+    else:
+        caching.purge_pages(*[
+            'profile:{}'.format(user_pk) for user_pk in
+            models.AllSkills.objects.filter(pk__in=kwargs['pk_set'] or [])
+            .values_list('user_id', flat=True)
+        ])
+
+
+@receiver(markdown_rerendered, sender=models.Project)
+def rerendered_projects(sender, pks, **kwargs):
+    """Project descriptions are shown on their cards and pages"""
+    for project_pk in pks:
+        caching.bump_card_version(project_pk)
+    _purge_project_pages(pks)
+
+
+@receiver(markdown_rerendered, sender=models.Position)
+def rerendered_positions(sender, pks, **kwargs):
+    """Positions are shown on their Project's cards and pages"""
+    project_pks = set(
+        models.Position.objects.filter(pk__in=pks)
+        .values_list('related_project_id', flat=True)
+    )
+    for project_pk in project_pks:
+        caching.bump_card_version(project_pk)
+    _purge_project_pages(project_pks)
+
+
+@receiver(markdown_rerendered, sender=get_user_model())
+def rerendered_users(sender, pks, **kwargs):
+    """User bios are shown on their profile pages"""
+    caching.purge_pages(*['profile:{}'.format(pk) for pk in pks])
@@ -4,6 +4,7 @@ This folder helps keep the project tests organized according to view folder.
 """
 
 from .application_tests import *
+from .benchmark_tests import *
 from .administrative_tests import *
 from .miscellaneous_tests import *
 from .profile_tests import *
@@ -1,5 +1,12 @@
+import shutil
+import tempfile
+from io import StringIO
+
+from django.core.management import CommandError, call_command
+from django.test import override_settings
 from django.urls import reverse
 
+from team_builder.markdown_rendering import markdown_cache
 
 from .base_tests import BaseTest
 from ..models import (Skill, SkillConfirmation)
@@ -119,3 +126,38 @@ class AdminTests(BaseTest):
         )
 
         self.assertFalse(found_skill)
+
+    def test_cache_stats(self):
+        """Ensures the markdown preview is cached and its hits are shown"""
+        markdown_cache.clear()
+        self.client.login(username='user@user.com', password='testpass')
+
+        for _ in range(2):
+            resp = self.client.post(reverse('markdownx_markdownify'),
+                                    {'content': '*Preview* text'})
+            self.assertContains(resp, '<em>Preview</em>')
+
+        resp = self.client.get(reverse('profiles:cache_stats'))
+        stats = resp.json()['markdown']
+        self.assertEqual(stats['misses'], 1)
+        self.assertEqual(stats['hits'], 1)
+        self.assertEqual(stats['hit_rate'], 0.5)
+        self.assertIn('search_hits', resp.json()['search'])
+
+    def test_cache_stats_command_needs_shared_cache(self):
+        """
+        Ensures the cache_stats command refuses to read a cache only the
+        process running it has
+        """
+        with self.assertRaisesMessage(CommandError, 'not shared'):
+            call_command('cache_stats', stdout=StringIO())
+
+        location = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, location)
+        with override_settings(CACHES={'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': location,
+        }}):
+            out = StringIO()
+            call_command('cache_stats', stdout=out)
+        self.assertIn('Search results', out.getvalue())
@@ -1,6 +1,8 @@
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
 from django.test import TestCase
 
+from ..autocomplete import skill_index
 from ..models import (AllSkills, Skill, Project, Position)
 
 
@@ -9,6 +11,9 @@ class BaseTest(TestCase):
 
     def setUp(self):
         """Creates a Profile and some skills for testing"""
+        # Cached pages and search results must not leak between tests
+        cache.clear()
+        skill_index.reset()
 
         # Creates a couple of Skill(s)
         self.skill_1 = Skill.objects.create(skill='Django developer')
@@ -0,0 +1,85 @@
+from django.core.cache import cache
+from django.core.cache.utils import make_template_fragment_key
+from django.test import TestCase
+
+from team_builder import jinja2_environment
+
+from .. import caching
+from .. import models
+from .. import search
+from ..benchmarks.corpus import generate_corpus
+from ..benchmarks.rendering import run_render_benchmarks
+from ..benchmarks.runner import percentile, run_benchmarks
+
+
+class BenchmarkTests(TestCase):
+    """Tests the search benchmark corpus and runner"""
+
+    def test_generate_corpus(self):
+        """Ensures a corpus is created and indexed for searching"""
+        corpus = generate_corpus(20, seed=1, batch_size=7)
+
+        self.assertEqual(models.Project.objects.count(), 20)
+        self.assertTrue(models.Position.objects.exists())
+        self.assertEqual(
+            models.SearchTerm.objects.filter(
+                kind=models.SearchTerm.PROJECT_TITLE).count(),
+            20
+        )
+
+        title = models.Project.objects.first().title
+        found = search.search_projects(models.Project.objects.all(), title)
+        self.assertIn(title, [project.title for project in found])
+        self.assertTrue(corpus.user.allskills.skills.exists())
+
+    def test_generate_corpus_is_reproducible(self):
+        """Ensures the same seed creates the same projects"""
+        generate_corpus(10, seed=3)
+        titles = list(
+            models.Project.objects.order_by('pk').values_list('title')
+        )
+        models.Project.objects.all().delete()
+
+        generate_corpus(10, seed=3)
+        self.assertEqual(
+            list(models.Project.objects.order_by('pk').values_list('title')),
+            titles
+        )
+
+    def test_run_benchmarks(self):
+        """Ensures every search view is timed, cold and cached"""
+        corpus = generate_corpus(10, seed=2)
+        results = run_benchmarks(corpus, repeat=1)
+
+        self.assertEqual(len(results), 6)
+        for result in results:
+            self.assertEqual(len(result.latencies), result.requests)
+
+    def test_run_render_benchmarks(self):
+        """Ensures the card templates are timed with every engine"""
+        corpus = generate_corpus(5, seed=4)
+        results = run_render_benchmarks(corpus, cards=5, repeat=2)
+
+        engines = ['django']
+        if jinja2_environment.Environment is not None:
+            engines.append('jinja2')
+        self.assertEqual(len(results), 2 * len(engines))
+        self.assertEqual(
+            sorted({result['engine'] for result in results}), engines
+        )
+        for result in results:
+            self.assertEqual(result['cards'], 5)
+            self.assertGreater(result['mean_ms_per_card'], 0)
+
+        # The cards rendered aren't left in the cache
+        project = models.Project.objects.first()
+        self.assertIsNone(cache.get(make_template_fragment_key(
+            caching.HOMEPAGE_CARD, [project.pk, 'benchmark-0']
+        )))
+
+    def test_percentile(self):
+        """Ensures percentiles use the nearest rank"""
+        values = list(range(1, 101))
+        self.assertEqual(percentile(values, 50), 50)
+        self.assertEqual(percentile(values, 99), 99)
+        self.assertEqual(percentile([], 50), 0)
@@ -1,6 +1,19 @@
+import re
+from unittest import mock, skipUnless
+
+from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.template import engines
+from django.test import override_settings
 from django.urls import reverse
 
+from team_builder import jinja2_environment
+from team_builder.template_warmup import warm_templates
+
+from .. import caching
+from ..models import Applicants, Position, Project, Skill
+from ..views import HomepageListView
 from .base_tests import BaseTestWithPositionsProjects
 
 
@@ -24,6 +37,196 @@ class MiscellaneousTests(BaseTestWithPositionsProjects):
 
         self.assertTemplateUsed('homepage.html')
 
+    def test_homepage_pagination(self):
+        """Ensures the homepage pages through projects by pk"""
+        second_project = Project.objects.create(
+            owner=self.user, title='Second Project',
+            time_line='Soon', requirements='None', description='Second'
+        )
+        position = Position.objects.create(
+            skill=self.skill_2, information='Needed',
+            related_project=second_project
+        )
+        second_project.positions.add(position)
+
+        with mock.patch.object(HomepageListView, 'page_size', 1):
+            resp = self.client.get(reverse('profiles:homepage'))
+            self.assertEqual(list(resp.context['object_list']), [self.project])
+            self.assertNotIn('previous_page_url', resp.context)
+
+            resp = self.client.get(
+                reverse('profiles:homepage') + resp.context['next_page_url']
+            )
+            self.assertEqual(
+                list(resp.context['object_list']), [second_project]
+            )
+            self.assertNotIn('next_page_url', resp.context)
+
+            resp = self.client.get(
+                reverse('profiles:homepage') +
+                resp.context['previous_page_url']
+            )
+            self.assertEqual(list(resp.context['object_list']), [self.project])
+
+    def test_homepage_skills_are_cached(self):
+        """Ensures the skills sidebar is cached until a Skill changes"""
+        skills = caching.get_skills()
+        self.assertEqual(
+            [skill.skill for skill in skills],
+            sorted(skill.skill for skill in Skill.objects.all())
+        )
+
+        with self.assertNumQueries(0):
+            caching.get_skills()
+
+        Skill.objects.create(skill='Archery')
+        resp = self.client.get(reverse('profiles:homepage'))
+        self.assertContains(resp, 'Archery')
+
+        self.skill_3.delete()
+        resp = self.client.get(reverse('profiles:homepage'))
+        self.assertNotContains(resp, 'Mountain Climbing')
+
+    def test_evicted_skills_version(self):
+        """Ensures an evicted skills version doesn't bring back old lists"""
+        cache.delete(caching.SKILLS_VERSION_KEY)
+        caching.get_skills()
+        Skill.objects.create(skill='Archery')
+        cache.delete(caching.SKILLS_VERSION_KEY)
+
+        self.assertIn(
+            'Archery', [skill.skill for skill in caching.get_skills()]
+        )
+
+    def test_homepage_project_cards_are_cached(self):
+        """Ensures project cards are cached until their project changes"""
+        self.client.get(reverse('profiles:homepage'))
+
+        # Warm cards don't need their positions or skills loaded
+        caching.purge_pages(caching.ALL_PAGES)
+        with self.assertNumQueries(1):
+            resp = self.client.get(reverse('profiles:homepage'))
+        self.assertContains(resp, '[Django developer]')
+
+        position = Position.objects.create(
+            skill=self.skill_2, information='Needed',
+            related_project=self.project
+        )
+        self.project.positions.add(position)
+
+        resp = self.client.get(reverse('profiles:homepage'))
+        self.assertContains(resp, '[Angular]')
+
+    def test_homepage_anonymous_page_cache(self):
+        """Ensures logged out visitors get a cached homepage"""
+        resp = self.client.get(reverse('profiles:homepage'))
+        self.assertIn('public', resp['Cache-Control'])
+        self.assertIn('Cookie', resp['Vary'])
+
+        with self.assertNumQueries(0):
+            resp = self.client.get(reverse('profiles:homepage'))
+        self.assertContains(resp, 'Test Project')
+
+        # Changing a project purges the page
+        self.project.title = 'Renamed Project'
+        self.project.save()
+        resp = self.client.get(reverse('profiles:homepage'))
+        self.assertContains(resp, 'Renamed Project')
+
+        # Logged in users get their own page
+        self.client.login(username='user@user.com', password='testpass')
+        resp = self.client.get(reverse('profiles:homepage'))
+        self.assertIn('private', resp['Cache-Control'])
+        self.assertContains(resp, 'Renamed Project')
+
+    @override_settings(STREAMING_LISTINGS=True)
+    def test_homepage_streamed(self):
+        """
+        Ensures logged in users get a streamed homepage, while logged out
+        visitors get the whole cached page
+        """
+        resp = self.client.get(reverse('profiles:homepage'))
+        self.assertFalse(resp.streaming)
+        self.assertContains(resp, 'Test Project')
+        with self.assertNumQueries(0):
+            self.client.get(reverse('profiles:homepage'))
+
+        self.client.login(username='user@user.com', password='testpass')
+        resp = self.client.get(reverse('profiles:homepage'))
+        self.assertTrue(resp.streaming)
+        page = b''.join(resp.streaming_content).decode()
+        self.assertIn('Test Project', page)
+        self.assertIn('[Django developer]', page)
+
+        resp = self.client.get(reverse('profiles:search_by_skill',
+                                       kwargs={'skill': 'Angular'}))
+        self.assertTrue(resp.streaming)
+        page = b''.join(resp.streaming_content).decode()
+        self.assertIn('No results were found with: Angular', page)
+        self.assertNotIn('There are no current projects', page)
+
+    def test_template_warm_up(self):
+        """Ensures the cached template loader is filled at start up"""
+        # Templates aren't cached in DEBUG
+        self.assertEqual(warm_templates(), 0)
+
+        templates = [dict(settings.TEMPLATES[0])]
+        templates[0]['OPTIONS'] = dict(
+            templates[0]['OPTIONS'],
+            loaders=[('django.template.loaders.cached.Loader',
+                      settings.TEMPLATE_LOADERS)]
+        )
+        with override_settings(TEMPLATES=templates):
+            self.assertGreater(warm_templates(), 0)
+
+            loader = engines['django'].engine.template_loaders[0]
+            self.assertIn('layout.html', loader.get_template_cache)
+            self.assertIn('profiles/homepage.html', loader.get_template_cache)
+            # Only the project's own templates are compiled
+            self.assertNotIn('admin/base.html', loader.get_template_cache)
+
+            resp = self.client.get(reverse('profiles:homepage'))
+            self.assertContains(resp, 'Test Project')
+
+    @skipUnless(jinja2_environment.Environment, 'Jinja2 is not installed')
+    def test_jinja2_listings(self):
+        """Ensures the Jinja2 listing pages match the Django ones"""
+        self.client.login(username='user@user.com', password='testpass')
+        applicant = Applicants.objects.create(
+            applicant=self.user_2, position=self.position
+        )
+        self.position.applicants.add(applicant)
+
+        urls = [
+            reverse('profiles:homepage'),
+            reverse('profiles:search_by_skill',
+                    kwargs={'skill': 'Django_developer'}),
+            reverse('profiles:project_view_all'),
+            reverse('profiles:applications'),
+        ]
+
+        def get_pages():
+            pages = []
+            for url in urls:
+                cache.clear()
+                resp = self.client.get(url)
+                self.assertEqual(resp.status_code, 200)
+                # The engines only differ in their whitespace
+                pages.append(
+                    re.sub(r'\s+', ' ', resp.content.decode()).strip()
+                )
+            return pages
+
+        django_pages = get_pages()
+        with override_settings(
+                TEMPLATES=settings.TEMPLATES + [settings.JINJA2_BACKEND],
+                JINJA2_LISTINGS=True):
+            jinja2_pages = get_pages()
+
+        self.assertIn('Test Project', jinja2_pages[0])
+        self.assertIn('Hattie', jinja2_pages[3])
+        self.assertEqual(django_pages, jinja2_pages)
+
     def test_login_router_with_profile(self):
         """Tests the router if the user has an AllSkills model attached"""
         self.client.login(username='user@user.com', password='testpass')
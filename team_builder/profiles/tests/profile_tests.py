@@ -1,5 +1,15 @@
+import shutil
+import tempfile
+from io import BytesIO
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import Client, override_settings
 from django.urls import reverse
 
+from PIL import Image
+
+from accounts.models import AvatarJob
+
 from .base_tests import BaseTestWithPositionsProjects
 
 
@@ -31,10 +41,12 @@ class ProfileTests(BaseTestWithPositionsProjects):
         self.assertContains(resp, 'Profile')
         self.assertContains(resp, 'Bio (markdown preview bellow)')
 
-        # skills_form information
+        # skills_form information, only the user's skills are rendered
+        # the rest are found through the skill autocomplete
         self.assertContains(resp, str(self.skill_1))
         self.assertContains(resp, str(self.skill_2))
-        self.assertContains(resp, str(self.skill_3))
+        self.assertNotContains(resp, str(self.skill_3))
+        self.assertContains(resp, reverse('profiles:skill_autocomplete'))
 
         self.assertTemplateUsed('profile_edit.html')
 
@@ -56,4 +68,65 @@ class ProfileTests(BaseTestWithPositionsProjects):
         # their profile
         self.assertContains(resp, 'Edit')
 
-        self.assertTemplateUsed('profile.html')
\ No newline at end of file
+        self.assertTemplateUsed('profile.html')
+
+    def test_profile_view_conditional_get(self):
+        """Ensures a profile page changes with the user's skills"""
+        url = reverse('profiles:profile', kwargs={'pk': self.user.pk})
+        etag = self.client.get(url)['ETag']
+
+        resp = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(resp.status_code, 304)
+
+        self.user_1_skills.skills.add(self.skill_2)
+        resp = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(resp.status_code, 200)
+
+    def test_profile_edit_image_upload(self):
+        """Ensures the image editor saves the image it uploads"""
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+
+        image = BytesIO()
+        Image.new('RGB', (50, 50), 'blue').save(image, format='png')
+        avatar = SimpleUploadedFile(
+            'avatar.png', image.getvalue(), content_type='image/png'
+        )
+
+        self.client.login(username='user@user.com', password='testpass')
+        with override_settings(MEDIA_ROOT=media_root):
+            resp = self.client.post(
+                reverse('profiles:profile_edit_image'), {'avatar': avatar}
+            )
+
+        self.assertRedirects(
+            resp, reverse('profiles:profile', kwargs={'pk': self.user.pk})
+        )
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.avatar.name.endswith('.png'))
+        self.assertTrue(AvatarJob.objects.filter(user=self.user).exists())
+
+    def test_profile_edit_image_rejects_bad_uploads(self):
+        """Ensures large and broken images are not saved"""
+        self.client.login(username='user@user.com', password='testpass')
+        url = reverse('profiles:profile_edit_image')
+
+        broken = SimpleUploadedFile('avatar.png', b'not an image')
+        resp = self.client.post(url, {'avatar': broken})
+        self.assertContains(resp, 'could not be saved', status_code=400)
+
+        large = SimpleUploadedFile('avatar.png', b'0' * 2048)
+        with self.settings(AVATAR_MAX_UPLOAD_SIZE=1024):
+            resp = self.client.post(url, {'avatar': large})
+        self.assertContains(resp, 'too large', status_code=413)
+
+        self.user.refresh_from_db()
+        self.assertFalse(self.user.avatar)
+
+    def test_profile_edit_image_csrf(self):
+        """Ensures the image editor still checks the CSRF token"""
+        client = Client(enforce_csrf_checks=True)
+        client.login(username='user@user.com', password='testpass')
+        resp = client.post(reverse('profiles:profile_edit_image'))
+
+        self.assertEqual(resp.status_code, 403)
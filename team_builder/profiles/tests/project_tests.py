@@ -1,7 +1,18 @@
+import json
+import os
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
 from django.urls import reverse
 
+from team_builder.markdown_rendering import MarkdownCache
+
+from .. import caching
+from ..management.commands.rerender_markdown import Command, render_rows
 from .base_tests import BaseTestWithPositionsProjects
-from ..models import Project
+from ..models import Position, Project
 
 
 class ProjectTests(BaseTestWithPositionsProjects):
@@ -153,4 +164,160 @@ class ProjectTests(BaseTestWithPositionsProjects):
         self.assertContains(resp, 'Test Project')
         self.assertContains(resp, 'Django developer')
 
-        self.assertTemplateUsed('project_view_all.html')
\ No newline at end of file
+        self.assertTemplateUsed('project_view_all.html')
+
+    def test_project_markdown_is_stored(self):
+        """Ensures Markdown is only rendered when it changes on save"""
+        self.project.description = '**Bold** plans'
+        self.project.save()
+        self.assertIn('<strong>Bold</strong>', self.project.description_html)
+
+        project = Project.objects.get(pk=self.project.pk)
+        with mock.patch('team_builder.markdown_rendering.markdownify',
+                        return_value='<p>New plans</p>') as markdownify:
+            project.title = 'Renamed Project'
+            project.save()
+            self.assertIn('<strong>Bold</strong>',
+                          project.description_markdown)
+            markdownify.assert_not_called()
+
+            project.description = 'New plans'
+            project.save()
+            markdownify.assert_called_once_with('New plans')
+
+    def test_markdown_cache_evicts_least_recently_used(self):
+        """Ensures the Markdown cache stays within its size"""
+        cache = MarkdownCache(max_size=2)
+        cache.render('one')
+        cache.render('two')
+        cache.render('one')
+        cache.render('three')
+
+        stats = cache.stats()
+        self.assertEqual(stats['size'], 2)
+        self.assertEqual(stats['evictions'], 1)
+
+        # 'two' was used least recently so it was evicted
+        cache.render('one')
+        cache.render('two')
+        self.assertEqual(cache.stats()['hits'], 2)
+
+    def test_rerender_markdown(self):
+        """Ensures every Markdown field can be rendered again in bulk"""
+        Project.objects.update(description_html='stale')
+        Position.objects.update(time_commitment_html='stale')
+
+        for workers in (1, 2):
+            output = StringIO()
+            call_command('rerender_markdown', workers=workers, batch_size=1,
+                         stdout=output)
+            self.assertIn('profiles.Project: 1/1', output.getvalue())
+
+            self.assertEqual(
+                Project.objects.get().description_html,
+                '<p>also see README.md</p>'
+            )
+            self.assertNotEqual(
+                Position.objects.get().time_commitment_html, 'stale'
+            )
+            Project.objects.update(description_html='stale')
+
+    def test_rerender_markdown_purges_pages(self):
+        """
+        Ensures a re-render shows on cached pages and conditional GETs,
+        and only rows whose HTML changed are written
+        """
+        Project.objects.update(description_html='stale')
+        caching.set_card_versions([self.project])
+        card_version = self.project.card_version
+        url = reverse('profiles:project', kwargs={'pk': self.project.pk})
+        etag = self.client.get(url)['ETag']
+
+        call_command('rerender_markdown', workers=1, stdout=StringIO())
+
+        resp = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(resp.status_code, 200)
+        self.assertContains(resp, '<p>also see README.md</p>')
+        caching.set_card_versions([self.project])
+        self.assertNotEqual(self.project.card_version, card_version)
+
+        # Nothing changed, so nothing is written
+        updated_at = Project.objects.get().updated_at
+        call_command('rerender_markdown', workers=1, stdout=StringIO())
+        self.assertEqual(Project.objects.get().updated_at, updated_at)
+
+    def test_rerender_markdown_keeps_edits(self):
+        """Ensures Markdown edited while it renders keeps its own HTML"""
+        Project.objects.update(description_html='stale')
+        command = Command()
+        command.batch_size = 10
+        rows = next(command.batches(Project, 0))
+        last_pk, row_count, rendered = render_rows(rows)
+
+        # The project is edited after its Markdown was read
+        self.project.description = '**Edited**'
+        self.project.save()
+
+        command.save_rendered(Project, rendered)
+        self.assertEqual(
+            Project.objects.get().description_html,
+            '<p><strong>Edited</strong></p>'
+        )
+
+    def test_rerender_markdown_resumes(self):
+        """Ensures a stopped re-render continues after its checkpoint"""
+        Project.objects.update(description_html='stale')
+
+        with tempfile.TemporaryDirectory() as directory:
+            checkpoint = os.path.join(directory, 'checkpoint.json')
+            with open(checkpoint, 'w') as file:
+                json.dump({'profiles.Project': self.project.pk}, file)
+
+            call_command('rerender_markdown', workers=1,
+                         checkpoint=checkpoint, stdout=StringIO())
+
+            # The project was before the checkpoint, so it was skipped
+            self.assertEqual(Project.objects.get().description_html, 'stale')
+            self.assertFalse(os.path.exists(checkpoint))
+
+    def test_project_view_conditional_get(self):
+        """Ensures an unchanged project page is answered with a 304"""
+        url = reverse('profiles:project', kwargs={'pk': self.project.pk})
+        resp = self.client.get(url)
+        self.assertIn('Last-Modified', resp)
+
+        # Answered from the cached page, with no queries
+        with self.assertNumQueries(0):
+            resp = self.client.get(url, HTTP_IF_NONE_MATCH=resp['ETag'])
+        self.assertEqual(resp.status_code, 304)
+
+        # Answered by condition(), before the view runs
+        caching.purge_pages(caching.ALL_PAGES)
+        with self.assertNumQueries(1):
+            resp = self.client.get(url, HTTP_IF_NONE_MATCH=resp['ETag'])
+        self.assertEqual(resp.status_code, 304)
+
+        resp = self.client.get(
+            url, HTTP_IF_MODIFIED_SINCE=resp['Last-Modified']
+        )
+        self.assertEqual(resp.status_code, 304)
+
+        # Filling a position changes the page
+        etag = resp['ETag']
+        self.position.filled_by = self.user_2
+        self.position.save()
+        resp = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(resp.status_code, 200)
+
+    def test_project_view_conditional_get_logged_in(self):
+        """Ensures logged in users get their own ETag"""
+        url = reverse('profiles:project', kwargs={'pk': self.project.pk})
+        etag = self.client.get(url)['ETag']
+
+        self.client.login(username='user@user.com', password='testpass')
+        resp = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(resp.status_code, 200)
+        self.assertNotIn('Last-Modified', resp)
+
+        resp = self.client.get(url, HTTP_IF_NONE_MATCH=resp['ETag'])
+        self.assertEqual(resp.status_code, 304)
@@ -1,5 +1,15 @@
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import RequestFactory
 from django.urls import reverse
 
+from .. import caching
+from .. import search
+from ..autocomplete import SkillPrefixIndex, skill_index
+from ..models import Position, Project, Skill
+from ..pagination import paginate_ids
+from ..views import SearchBySkillListView
 from .base_tests import BaseTestWithPositionsProjects
 
 
@@ -43,6 +53,106 @@ class SearchingTests(BaseTestWithPositionsProjects):
 
         self.assertTemplateUsed('homepage.html')
 
+    def test_search_runs_once(self):
+        """Ensures a search page only runs its search queries once"""
+        # 1 for the searched skills, 1 search, 1 for the skill facets, 3 to
+        # load the page's projects, positions and skills and 1 for the
+        # skill_selector. The skills sidebar is cached.
+        caching.get_skills()
+        with self.assertNumQueries(7):
+            self.client.get(
+                reverse('profiles:search_by_skill',
+                        kwargs={'skill': 'Django developer'}))
+
+    def test_search_skill_facets(self):
+        """Ensures the sidebar counts the open positions per skill found"""
+        position = Position.objects.create(
+            skill=self.skill_2, information='Needed',
+            related_project=self.project
+        )
+        self.project.positions.add(position)
+
+        resp = self.client.get(reverse('profiles:search'),
+                               data={'search_term': 'Test Project'})
+        skills = {skill.pk: skill for skill in resp.context['skills']}
+
+        self.assertEqual(skills[self.skill_1.pk].open_positions, 1)
+        self.assertEqual(skills[self.skill_2.pk].open_positions, 1)
+        self.assertEqual(skills[self.skill_3.pk].open_positions, 0)
+        self.assertIn('Angular (1)', ' '.join(resp.content.decode().split()))
+
+    def test_skill_autocomplete_follows_other_processes(self):
+        """
+        Ensures an index that wasn't told about a new skill, like the one
+        of another web process, rebuilds itself
+        """
+        other_index = SkillPrefixIndex()
+        self.assertEqual(len(other_index.search('climb')), 1)
+
+        skill = Skill.objects.create(skill='Ice Climbing')
+        self.assertIn(
+            {'id': skill.pk, 'skill': 'Ice Climbing'},
+            other_index.search('climb')
+        )
+
+    def test_skill_autocomplete_is_updated_in_place(self):
+        """
+        Ensures a skill accepted in this process is inserted into its
+        index without reading every skill again
+        """
+        skill_index.search('climb')
+
+        skill = Skill.objects.create(skill='Ice Climbing')
+        with self.assertNumQueries(0):
+            self.assertEqual(
+                [found['skill'] for found in skill_index.search('climb')],
+                ['Ice Climbing', 'Mountain Climbing']
+            )
+
+        skill.skill = 'Ice Skating'
+        skill.save()
+        self.skill_3.delete()
+        with self.assertNumQueries(0):
+            self.assertEqual(skill_index.search('climb'), [])
+            self.assertEqual(
+                skill_index.search('skat'),
+                [{'id': skill.pk, 'skill': 'Ice Skating'}]
+            )
+
+    def test_open_positions_counted_from_the_found_pks(self):
+        """Ensures the facets are counted from the pks in one query"""
+        filled = Position.objects.create(
+            skill=self.skill_2, information='Filled',
+            related_project=self.project, filled_by=self.user_2
+        )
+        self.project.positions.add(filled)
+
+        with self.assertNumQueries(1):
+            counts = search.count_open_positions([self.project.pk])
+        self.assertEqual(counts, {self.skill_1.pk: 1})
+
+        with self.assertNumQueries(0):
+            self.assertEqual(search.count_open_positions([]), {})
+
+    def test_skill_autocomplete(self):
+        """Ensures skills are found by the start of any of their words"""
+        resp = self.client.get(
+            reverse('profiles:skill_autocomplete'), data={'q': 'climb'})
+        self.assertEqual(
+            resp.json()['skills'],
+            [{'id': self.skill_3.pk, 'skill': 'Mountain Climbing'}]
+        )
+
+        # Newly created skills are added to the index
+        new_skill = Skill.objects.create(skill='Climbing Instructor')
+        resp = self.client.get(
+            reverse('profiles:skill_autocomplete'), data={'q': 'climb'})
+        self.assertEqual(
+            resp.json()['skills'],
+            [{'id': new_skill.pk, 'skill': 'Climbing Instructor'},
+             {'id': self.skill_3.pk, 'skill': 'Mountain Climbing'}]
+        )
+
     def test_search_by_skill_invalid(self):
         """Ensures that an invalid search informs the user"""
         resp = self.client.get(
@@ -81,4 +191,251 @@ class SearchingTests(BaseTestWithPositionsProjects):
         self.assertContains(resp, 'All Needs')
         self.assertContains(resp, 'Projects')
 
-        self.assertTemplateUsed('homepage.html')
\ No newline at end of file
+        self.assertTemplateUsed('homepage.html')
+
+    def test_search_ranks_title_matches_first(self):
+        """Ensures a search term in a title outranks one in a description"""
+        description_project = Project.objects.create(
+            owner=self.user, title='Another Project',
+            time_line='Soon', requirements='None',
+            description='Needs a rocket scientist'
+        )
+        title_project = Project.objects.create(
+            owner=self.user, title='Rocket Builders',
+            time_line='Soon', requirements='None', description='Space'
+        )
+        for project in (description_project, title_project):
+            position = Position.objects.create(
+                skill=self.skill_1, information='Builds things',
+                related_project=project
+            )
+            project.positions.add(position)
+
+        resp = self.client.get(
+            reverse('profiles:search'), data={'search_term': 'rocket'})
+
+        self.assertEqual(
+            list(resp.context['object_list']),
+            [title_project, description_project]
+        )
+
+    def test_search_index_follows_changes(self):
+        """Ensures edited and deleted projects are searched correctly"""
+        self.position.information = 'Knows about penguins'
+        self.position.save()
+
+        resp = self.client.get(
+            reverse('profiles:search'), data={'search_term': 'penguins'})
+        self.assertContains(resp, str(self.project))
+
+        self.project.delete()
+        resp = self.client.get(
+            reverse('profiles:search'), data={'search_term': 'penguins'})
+        self.assertContains(resp, 'No results were found with: penguins')
+
+    def test_search_by_misspelled_skill(self):
+        """Ensures a misspelled skill still finds projects and a suggestion"""
+        resp = self.client.get(
+            reverse('profiles:search_by_skill',
+                    kwargs={'skill': 'Djnago_developer'}))
+
+        self.assertContains(resp, str(self.project))
+        self.assertContains(resp, 'Did you mean')
+        self.assertEqual(resp.context['did_you_mean'], 'Django developer')
+
+    def test_search_misspelled_title(self):
+        """Ensures a misspelled title search finds the project"""
+        resp = self.client.get(
+            reverse('profiles:search'), data={'search_term': 'Tset Project'})
+
+        self.assertContains(resp, str(self.project))
+        self.assertEqual(resp.context['did_you_mean'], 'Test Project')
+
+    def test_no_suggestion_for_found_search(self):
+        """Ensures a search that finds projects gets no suggestion"""
+        resp = self.client.get(
+            reverse('profiles:search'), data={'search_term': 'Test'})
+
+        self.assertContains(resp, str(self.project))
+        self.assertNotIn('did_you_mean', resp.context)
+        self.assertNotContains(resp, 'Did you mean')
+
+    def test_search_your_skills_ranking(self):
+        """Projects needing more of the user's skills are listed first"""
+        # self.user_2 has the Django developer and Mountain Climbing skills
+        project = Project.objects.create(
+            owner=self.user, title='Climbing Django',
+            time_line='Soon', requirements='None', description='Climb'
+        )
+        for skill in (self.skill_1, self.skill_3):
+            position = Position.objects.create(
+                skill=skill, information='Needed', related_project=project
+            )
+            project.positions.add(position)
+
+        self.client.login(username='user2@user2.com', password='testpass')
+        resp = self.client.get(reverse('profiles:search_your_skills'))
+
+        self.assertEqual(
+            list(resp.context['object_list']), [project, self.project]
+        )
+        self.assertContains(resp, '2 results were found with: Your Skills')
+
+    def test_search_your_skills_is_cached(self):
+        """Ensures the projects needing the user's skills are cached"""
+        self.client.login(username='user2@user2.com', password='testpass')
+        self.client.get(reverse('profiles:search_your_skills'))
+        resp = self.client.get(reverse('profiles:search_your_skills'))
+
+        self.assertEqual(list(resp.context['object_list']), [self.project])
+        stats = caching.get_stats()
+        self.assertEqual(stats['search_misses'], 1)
+        self.assertEqual(stats['search_hits'], 1)
+
+    def test_search_results_are_cached(self):
+        """Ensures a repeated search is served from the cache"""
+        url = reverse('profiles:search_by_skill',
+                      kwargs={'skill': 'Django developer'})
+        self.client.get(url)
+        self.client.get(url)
+
+        stats = caching.get_stats()
+        self.assertEqual(stats['search_misses'], 1)
+        self.assertEqual(stats['search_hits'], 1)
+
+    def test_search_cache_invalidation(self):
+        """Ensures a changed position makes the cached searches stale"""
+        url = reverse('profiles:search_by_skill',
+                      kwargs={'skill': 'Django developer'})
+        self.client.get(url)
+
+        # Filling the position removes the project from the search
+        self.position.filled_by = self.user_2
+        self.position.save()
+
+        self.assertTrue(caching.get_stats()['search_invalidations'])
+        resp = self.client.get(url)
+        self.assertContains(
+            resp, 'No results were found with: Django developer'
+        )
+        self.assertEqual(caching.get_stats()['search_misses'], 2)
+
+    def test_unrelated_search_stays_cached(self):
+        """
+        Ensures a changed project only makes the searches it could be in
+        stale
+        """
+        project = Project.objects.create(
+            owner=self.user, title='Penguin Watching',
+            time_line='Soon', requirements='None', description='Birds'
+        )
+        position = Position.objects.create(
+            skill=self.skill_2, information='Needed', related_project=project
+        )
+        project.positions.add(position)
+
+        skill_url = reverse('profiles:search_by_skill',
+                            kwargs={'skill': 'Angular'})
+        text_url = reverse('profiles:search')
+        self.client.get(skill_url)
+        self.client.get(text_url, data={'search_term': 'bird'})
+
+        # Saving a project without changing its text
+        self.project.save()
+        self.client.get(skill_url)
+        self.client.get(text_url, data={'search_term': 'bird'})
+        stats = caching.get_stats()
+        self.assertEqual(stats['search_misses'], 2)
+        self.assertEqual(stats['search_hits'], 2)
+
+        # New text could match any text search, not a search by skill
+        self.project.title = 'Test Project Two'
+        self.project.save()
+        self.client.get(skill_url)
+        resp = self.client.get(text_url, data={'search_term': 'bird'})
+        self.assertEqual(list(resp.context['object_list']), [project])
+        stats = caching.get_stats()
+        self.assertEqual(stats['search_misses'], 3)
+        self.assertEqual(stats['search_hits'], 3)
+
+        # A project leaves the searches it was found by
+        position.filled_by = self.user_2
+        position.save()
+        resp = self.client.get(skill_url)
+        self.assertEqual(list(resp.context['object_list']), [])
+
+    def test_expired_search_served_while_rebuilding(self):
+        """
+        Ensures an expired search is served from the cache while another
+        request rebuilds it, and rebuilt when nobody else is
+        """
+        old_results = search.SearchResults([1], {}, False, [])
+        new_results = search.SearchResults([2], {}, False, [])
+        run_search = mock.Mock(return_value=new_results)
+        key = caching.search_cache_key(
+            caching.SKILL_SEARCH, 'django developer'
+        )
+        cache.set(key, ((old_results, {}), 0))
+
+        # Another request holds the rebuild lock
+        cache.add(caching._lock_key(key), True)
+        results = caching.get_search_results(
+            caching.SKILL_SEARCH, 'Django developer', run_search
+        )
+        self.assertEqual(results, old_results)
+        self.assertFalse(run_search.called)
+        self.assertEqual(caching.get_stats()['search_stale'], 1)
+
+        cache.delete(caching._lock_key(key))
+        results = caching.get_search_results(
+            caching.SKILL_SEARCH, 'Django developer', run_search
+        )
+        self.assertEqual(results, new_results)
+        self.assertEqual(run_search.call_count, 1)
+        self.assertIsNone(cache.get(caching._lock_key(key)))
+
+    def test_search_pagination(self):
+        """Ensures search results are paged while counting every result"""
+        project = Project.objects.create(
+            owner=self.user, title='Test Project Two',
+            time_line='Soon', requirements='None', description='Two'
+        )
+        position = Position.objects.create(
+            skill=self.skill_1, information='Needed', related_project=project
+        )
+        project.positions.add(position)
+
+        with mock.patch.object(SearchBySkillListView, 'page_size', 1):
+            resp = self.client.get(
+                reverse('profiles:search_by_skill',
+                        kwargs={'skill': 'Django developer'}))
+            self.assertEqual(list(resp.context['object_list']), [self.project])
+            self.assertContains(
+                resp, '2 results were found with: Django developer'
+            )
+
+            resp = self.client.get(resp.request['PATH_INFO'] +
+                                   resp.context['next_page_url'])
+            self.assertEqual(list(resp.context['object_list']), [project])
+
+    def test_pk_ordered_search_pages(self):
+        """
+        Ensures searches in pk order are paged by pk, even from a cursor
+        that is no longer in the results
+        """
+        factory = RequestFactory()
+        project_ids = [1, 3, 5, 7, 9]
+
+        page = paginate_ids(project_ids, factory.get('/', {'after': 4}), 2)
+        self.assertEqual(page.object_list, [5, 7])
+        self.assertEqual((page.previous_cursor, page.next_cursor), (5, 7))
+
+        page = paginate_ids(project_ids, factory.get('/', {'before': 6}), 2)
+        self.assertEqual(page.object_list, [3, 5])
+        self.assertEqual((page.previous_cursor, page.next_cursor), (3, 5))
+
+        # Ranked results restart from the top for an unknown cursor
+        page = paginate_ids(
+            [9, 1, 5], factory.get('/', {'after': 4}), 2, ranked=True
+        )
+        self.assertEqual(page.object_list, [9, 1])
@@ -17,6 +17,11 @@ urlpatterns = [
         views.administrative_non_pending,
         name='administrative_non_pending'
     ),
+    path(
+        'administrative/cache_stats',
+        views.cache_stats,
+        name='cache_stats'
+    ),
     path(
         'administrative/skill/<int:pk>/accept',
         views.skill_accept,
@@ -87,6 +92,11 @@ urlpatterns = [
         views.SearchBySkillListView.as_view(),
         name='search_by_skill'
     ),
+    path(
+        'search/skill_autocomplete',
+        views.skill_autocomplete,
+        name='skill_autocomplete'
+    ),
     path('search/your_skills',
          views.SearchYourSkillsView.as_view(),
          name='search_your_skills'
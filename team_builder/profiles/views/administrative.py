@@ -1,5 +1,9 @@
+from django.http import JsonResponse
 from django.shortcuts import get_object_or_404, redirect, render
 
+from team_builder.markdown_rendering import markdown_cache
+
+from .. import caching
 from .. import models
 from ..decorators import logged_in_admin_or_staff_required
 
@@ -92,4 +96,20 @@ def skill_deny(request, pk: int):
     skill_confirmation.pending = False
     skill_confirmation.save()
 
-    return redirect('profiles:administrative')
\ No newline at end of file
+    return redirect('profiles:administrative')
+
+
+@logged_in_admin_or_staff_required
+def cache_stats(request):
+    """
+    Shows an Admin/staff user how well the caches are working. The
+    Markdown cache statistics are for the process that answered, and so
+    are the search ones unless the cache is shared between processes.
+
+    :param request: Standard django request object
+    :return: JsonResponse of the search and Markdown cache statistics
+    """
+    return JsonResponse({
+        'markdown': markdown_cache.stats(),
+        'search': caching.get_stats(),
+    })
@@ -2,11 +2,14 @@ from django.contrib.auth import get_user_model
 from django.contrib.auth.decorators import login_required
 from django.db.models import Q
 from django.http import Http404
-from django.shortcuts import get_object_or_404, redirect, render
+from django.shortcuts import get_object_or_404, redirect
 
 # django-notifications-hq
 from notifications.signals import notify
 
+from team_builder.jinja2_environment import listing_engine
+from team_builder.streaming import stream_render
+
 from .. import models
 
 
@@ -117,7 +120,7 @@ def applications(request):
         request, is_accepted=False, is_filled=False
     )
 
-    return render(
+    return stream_render(
         request,
         'profiles/applications.html',
         {
@@ -125,7 +128,8 @@ def applications(request):
             'current_tab': 'Applications',  # navigation bar selector
             'needed_skills': needed_skills,
             'projects': projects
-        })
+        },
+        using=listing_engine())
 
 
 @login_required
@@ -261,7 +265,7 @@ def applications_view_accepted(request):
         request, is_accepted=True, is_filled=True
     )
 
-    return render(
+    return stream_render(
         request,
         'profiles/applicants_accepted.html',
         {
@@ -301,7 +305,7 @@ def applications_view_rejected(request):
                     projects.append(position.related_project)
                     needed_skills.add(position.skill)
 
-    return render(
+    return stream_render(
         request,
         'profiles/applicants_rejected.html',
         {
@@ -1,16 +1,21 @@
-from operator import attrgetter
-
 from django.views.generic import ListView
 
 from django.contrib.auth import get_user_model
 from django.contrib.auth.decorators import login_required
 from django.shortcuts import redirect, render
+from django.utils.decorators import method_decorator
 
 # django-notifications-hq
 from notifications.signals import notify
 
+from team_builder.jinja2_environment import listing_engine
+from team_builder.streaming import StreamingTemplateResponseMixin
+
+from .. import caching
 from ..forms import NewSkillFormSet
 from .. import models
+from ..decorators import anonymous_page_cache
+from ..pagination import KeysetPaginationMixin, paginate_queryset
 
 
 def create_skill_confirmation(user, skill: int):
@@ -36,26 +41,36 @@ def create_skill_confirmation(user, skill: int):
 """Miscellaneous views"""
 
 
-class HomepageListView(ListView):
+@method_decorator(anonymous_page_cache('homepage'), name='dispatch')
+class HomepageListView(StreamingTemplateResponseMixin, KeysetPaginationMixin,
+                       ListView):
     """This is the homepage for the profiles app"""
     model = models.Project
     template_name = 'profiles/homepage.html'
 
+    @property
+    def template_engine(self):
+        """Renders with Jinja2 if JINJA2_LISTINGS is on"""
+        return listing_engine()
+
     def get_context_data(self, *, object_list=None, **kwargs):
         # gets skills for the template
         context = super(HomepageListView, self).get_context_data(**kwargs)
-        context['skills'] = (
-            sorted(models.Skill.objects.all(), key=attrgetter('skill'))
-        )
+        context['skills'] = caching.get_skills()
         return context
 
     def get_queryset(self):
-        """Returns all Projects that have an unfilled position"""
-        return (
+        """Returns a page of the Projects that have an unfilled position"""
+        projects = (
             models.Project.objects.filter(
                 positions__filled=False
-            ).distinct().prefetch_related('positions__skill')
+            ).distinct()
+        )
+        self.page = paginate_queryset(projects, self.request, self.page_size)
+        caching.prepare_project_cards(
+            self.page.object_list, caching.HOMEPAGE_CARD
         )
+        return self.page.object_list
 
 
 @login_required
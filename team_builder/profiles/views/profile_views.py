@@ -1,12 +1,16 @@
-import base64
-
+from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.contrib.auth.decorators import login_required
-from django.core.files.base import ContentFile
+from django.core.files.uploadhandler import TemporaryFileUploadHandler
 from django.shortcuts import get_object_or_404, redirect, render
+from django.template.defaultfilters import filesizeformat
+from django.views.decorators.csrf import csrf_exempt, csrf_protect
+from django.views.decorators.http import condition
 
+from .. import conditional
 from .. import forms
 from .. import models
+from ..decorators import anonymous_page_cache
 
 
 def create_initial_data(user) -> list:
@@ -93,6 +97,7 @@ def profile_edit(request):
 
 
 @login_required
+@csrf_exempt
 def profile_edit_image(request):
     """
     Allows a profile image to be edited
@@ -101,45 +106,70 @@ def profile_edit_image(request):
     :returns: render request 'profiles/profile_image_edit.html'
     or a redirect to 'profiles:profile' on successful request.POST
     """
-    user = request.user
-
     if request.method == 'POST':
+        # Turned away before the body is read, Content-Length is all
+        # Django reads of it
+        content_length = int(request.META.get('CONTENT_LENGTH') or 0)
+        if content_length > settings.AVATAR_MAX_UPLOAD_SIZE:
+            return _render_image_edit(
+                request,
+                {'upload_error': 'The image is too large, the most is '
+                                 '{}.'.format(filesizeformat(
+                                     settings.AVATAR_MAX_UPLOAD_SIZE))},
+                status=413,
+            )
+
+        # The image is written to a temporary file a chunk at a time,
+        # instead of being held in memory
+        request.upload_handlers = [TemporaryFileUploadHandler(request)]
+
+    return _profile_edit_image(request)
+
+
+@csrf_protect
+def _profile_edit_image(request):
+    """
+    Saves the image drawn in the image editor, after the upload handlers
+    of profile_edit_image are set
 
-        # The form is submitted in a dataurl image, so we must convert it to
-        # an image.
-
-        # A lot of the following was based off of this stackoverflow post
-        # https://stackoverflow.com/questions/39576174/
-        # save-base64-image-in-django-file-field
-
-        post_info = request.POST
-        # Convert the QueryDict to a normal dictionary
-        post_dict = dict(post_info.lists())
-        data_url = post_dict['data-url'][0]
-
-        format_var, imgstr_var = data_url.split(';base64,')
-        ext = format_var.split('/')[-1]
+    :param request: Standard django request object
+    :returns: render request 'profiles/profile_image_edit.html'
+    or a redirect to 'profiles:profile' on successful request.POST
+    """
+    user = request.user
 
-        data = ContentFile(
-            base64.b64decode(imgstr_var),
-            name='temp.' + ext
+    if request.method == 'POST':
+        # The editor posts the canvas as a PNG file
+        form = forms.AvatarUploadForm(request.POST, request.FILES)
+        if form.is_valid():
+            user.avatar = form.cleaned_data['avatar']
+            user.save()
+            return redirect('profiles:profile', pk=user.pk)
+
+        return _render_image_edit(
+            request, {'upload_error': 'The image could not be saved.'},
+            status=400,
         )
 
-        # Now we can save the image to the user's avatar
-        user.avatar = data
-        user.save()
-        return redirect('profiles:profile', pk=user.pk)
+    return _render_image_edit(request)
+
 
+def _render_image_edit(request, context=None, status=None):
+    """Renders the image editor, with any extra context"""
     return render(
         request,
         'profiles/profile_image_edit.html',
-        {
+        dict({
             'current_tab': 'Profile',  # navigation bar selector
-            'profile': user
-        }
+            'profile': request.user
+        }, **(context or {})),
+        status=status
     )
 
 
+@anonymous_page_cache('profile:{pk}')
+@condition(etag_func=conditional.profile_etag,
+           last_modified_func=conditional.profile_last_modified)
 def profile_view(request, pk: int):
     """
     Lets any user view a person's profile
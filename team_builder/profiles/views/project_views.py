@@ -2,9 +2,15 @@ from django.contrib.auth.decorators import login_required
 from django.forms import formset_factory
 from django.http import Http404
 from django.shortcuts import get_object_or_404, redirect, render
+from django.views.decorators.http import condition
 
+from team_builder.jinja2_environment import listing_engine
+
+from .. import caching
+from .. import conditional
 from .. import forms
 from .. import models
+from ..decorators import anonymous_page_cache
 
 
 def create_initial_data(positions: models.Position) -> list:
@@ -259,6 +265,9 @@ def project_new(request):
         {'project_form': project_form, 'position_form': position_form})
 
 
+@anonymous_page_cache('project:{pk}')
+@condition(etag_func=conditional.project_etag,
+           last_modified_func=conditional.project_last_modified)
 def project_view(request, pk: int):
     """
     Checks to see if the logged in user owns this project.
@@ -319,6 +328,8 @@ def project_view_all(request):
         # the first item with [0]
         needed_skills.add(position[0].skill)
 
+    caching.set_card_versions(projects)
+
     return render(
         request,
         'profiles/project_view_all.html',
@@ -326,5 +337,6 @@ def project_view_all(request):
             'current_tab': 'My Projects',  # navigation bar selector
             'needed_skills': list(needed_skills),
             'projects': projects,
-        }
+        },
+        using=listing_engine()
     )
\ No newline at end of file
@@ -1,43 +1,202 @@
-from operator import attrgetter
+from urllib.parse import urlencode
 
-from django.db.models import Q
+from django.db.models import Count, Q
+from django.http import JsonResponse
 from django.shortcuts import redirect
+from django.urls import reverse
 from django.views.generic import ListView
 
+from team_builder.jinja2_environment import listing_engine
+from team_builder.streaming import StreamingTemplateResponseMixin
+
+from .. import caching
 from .. import models
+from .. import search
+from ..autocomplete import skill_index
+from ..pagination import KeysetPaginationMixin, paginate_ids
+
+
+def find_projects_by_skill(skill: str) -> search.SearchResults:
+    """
+    Finds the projects with an open position for a skill
+
+    :param skill: The string version of the skill that was searched with
+    :return: The SearchResults of the found projects, in pk order
+    """
+    # Kept with the results, which are stale once one of these Skills
+    # gets or loses an open position
+    skill_ids = list(
+        models.Skill.objects.filter(skill__contains=skill)
+        .values_list('pk', flat=True)
+    )
+    # In pk order, so the results are paged by pk like the homepage
+    projects = models.Project.objects.filter(
+        Q(
+            positions__skill__in=skill_ids,
+            positions__filled=False,
+        )
+    ).distinct().order_by('pk')
+    project_ids = list(projects.values_list('pk', flat=True))
+
+    # The skill may have been misspelled
+    fuzzy = not project_ids
+    if fuzzy:
+        projects = search.similar_projects(
+            models.Project.objects.all(), skill, (models.SearchTerm.SKILL,)
+        ).order_by('pk')
+        project_ids = list(projects.values_list('pk', flat=True))
+
+    return search.SearchResults(
+        project_ids, search.count_open_positions(project_ids), fuzzy,
+        skill_ids
+    )
+
+
+def find_projects_by_text(search_term: str) -> search.SearchResults:
+    """
+    Searches the text of all open projects
+
+    :param search_term: The string a user searched with
+    :return: The SearchResults of the found projects, most relevant first
+    """
+    open_projects = models.Project.objects.filter(positions__filled=False)
+
+    # Ordered by relevance when the full-text search table exists
+    projects = search.search_projects(open_projects, search_term).distinct()
+    project_ids = list(projects.values_list('pk', flat=True))
+
+    # The search term may have been misspelled
+    fuzzy = not project_ids
+    if fuzzy:
+        projects = search.similar_projects(
+            open_projects, search_term,
+            (models.SearchTerm.PROJECT_TITLE, models.SearchTerm.SKILL)
+        )
+        project_ids = list(projects.values_list('pk', flat=True))
 
+    return search.SearchResults(
+        project_ids, search.count_open_positions(project_ids), fuzzy, []
+    )
 
-def create_search_result_string(projects, search_term: str) -> str:
+
+def find_projects_by_skill_ids(skill_ids: str) -> search.SearchResults:
+    """
+    Finds every open project needing one of some skills, ranked by how
+    many of the skills it needs
+
+    :param skill_ids: The Skill pks separated by spaces, like '3 8 12'
+    :return: The SearchResults of the found projects, best match first
+    """
+    skill_ids = [int(pk) for pk in skill_ids.split()]
+
+    # Filtering on both position fields at once means only open
+    # positions are counted, and the count is done by the database
+    projects = models.Project.objects\
+        .filter(positions__filled=False,
+                positions__skill__in=skill_ids)\
+        .annotate(
+            matching_skills=Count('positions__skill', distinct=True)
+        )\
+        .order_by('-matching_skills', 'pk')
+
+    project_ids = list(projects.values_list('pk', flat=True))
+    return search.SearchResults(
+        project_ids, search.count_open_positions(project_ids), False,
+        skill_ids
+    )
+
+
+def get_projects_in_order(project_ids: list) -> list:
+    """
+    Gets the projects for a list of pks, keeping the order of the pks
+
+    :param project_ids: A list of Project pks
+    :return: A list of Project model objects
+    """
+    projects = models.Project.objects.in_bulk(project_ids)
+    return [projects[pk] for pk in project_ids if pk in projects]
+
+
+def create_search_result_string(result_count: int, search_term: str) -> str:
     """
     Creates a formatted string stating what results were found
 
-    :param projects: A Project model queryset
+    :param result_count: The number of projects that were found
     :param search_term: The string version of the skill that was searched with
 
     :return: A formatted string describing if any results were found
     """
 
-    if not projects:
+    if not result_count:
         search_results = 'No results were found with: {}'.format(search_term)
     else:
         search_results = '{} results were found with: {}'.format(
-            len(projects), search_term)
+            result_count, search_term)
     return search_results
 
 
-class SearchViewMixin(object):
+class SearchViewMixin(StreamingTemplateResponseMixin,
+                      KeysetPaginationMixin):
     """
     Creates a template for the Search views's class based views.
     This sets the model and template_name as well as the skills context
+
+    Views using this set search_kind and search_function, and override
+    get_search_term() if the term isn't the 'search_term' query string.
+    The search runs once per request in get_queryset(), its results are
+    cached, only the projects on the current page are loaded, and
+    self.page.count holds the number of projects found. Each skill in the
+    sidebar gets an open_positions count for the projects found.
     """
     model = models.Project
+    results = None
     template_name = 'profiles/homepage.html'
 
+    # The kind of search, one of the caching.*_SEARCH constants
+    search_kind = None
+    # Takes the normalized search term and returns search.SearchResults
+    search_function = None
+    # False if the search finds its projects in pk order, see pagination.py
+    ranked_results = True
+
+    @property
+    def template_engine(self):
+        """Renders with Jinja2 if JINJA2_LISTINGS is on"""
+        return listing_engine()
+
+    def get_search_term(self) -> str:
+        """Gets what the user searched for"""
+        return self.request.GET.get('search_term', '')
+
+    def get_search_results(self) -> search.SearchResults:
+        """Gets the cached SearchResults of the search, or runs it"""
+        search_term = self.get_search_term()
+        if not search_term:
+            return search.SearchResults([], {}, False, [])
+
+        return caching.get_search_results(
+            self.search_kind, search_term, self.search_function
+        )
+
+    def get_queryset(self):
+        """Gets the current page of the found projects"""
+        self.results = self.get_search_results()
+        self.page = paginate_ids(
+            self.results.project_ids, self.request, self.page_size,
+            ranked=self.ranked_results
+        )
+        projects = get_projects_in_order(self.page.object_list)
+        caching.prepare_project_cards(projects, caching.HOMEPAGE_CARD)
+        return projects
+
     def get_context_data(self, **kwargs):
         context = super(SearchViewMixin, self).get_context_data(**kwargs)
-        context['skills'] = (
-            sorted(models.Skill.objects.all(), key=attrgetter('skill'))
-        )
+        skills = caching.get_skills()
+
+        for skill in skills:
+            skill.open_positions = self.results.skill_facets.get(skill.pk, 0)
+
+        context['skills'] = skills
         return context
 
 
@@ -46,6 +205,8 @@ class SearchViewMixin(object):
 
 class SearchListView(SearchViewMixin, ListView):
     """Searches all projects and returns the results"""
+    search_kind = caching.TEXT_SEARCH
+    search_function = staticmethod(find_projects_by_text)
 
     def get_context_data(self, *, object_list=None, **kwargs):
         """"Gets all skills from the database and the search_results string"""
@@ -55,29 +216,28 @@ class SearchListView(SearchViewMixin, ListView):
         if not search_term:
             return redirect('profiles:homepage')
         context['search_results'] = (
-            create_search_result_string(self.get_queryset(), search_term)
+            create_search_result_string(self.page.count, search_term)
         )
-        return context
 
-    def get_queryset(self):
-        """Filters all fields for all projects by the search term"""
-        search_term = self.request.GET.get('search_term')
-        if not search_term:
-            return redirect('profiles:homepage')
-
-        return models.Project.objects.filter(positions__filled=False)\
-            .prefetch_related('positions')\
-            .filter(
-                Q(title__icontains=search_term) |
-                Q(time_line__icontains=search_term) |
-                Q(requirements__icontains=search_term) |
-                Q(description__icontains=search_term) |
-                Q(positions__information__icontains=search_term)
-        ).distinct()
+        # Only searches the exact search found nothing for get a suggestion
+        suggestion = self.results.fuzzy and search.did_you_mean(
+            search_term,
+            (models.SearchTerm.PROJECT_TITLE, models.SearchTerm.SKILL)
+        )
+        if suggestion:
+            context['did_you_mean'] = suggestion
+            context['did_you_mean_url'] = '{}?{}'.format(
+                reverse('profiles:search'),
+                urlencode({'search_term': suggestion})
+            )
+        return context
 
 
 class SearchBySkillListView(SearchViewMixin, ListView):
     """Searches projects by skills needed"""
+    search_kind = caching.SKILL_SEARCH
+    search_function = staticmethod(find_projects_by_skill)
+    ranked_results = False
 
     def get_context_data(self, *, object_list=None, **kwargs):
         """"Gets all skills from the database and the search_results string"""
@@ -88,7 +248,7 @@ class SearchBySkillListView(SearchViewMixin, ListView):
         # See Skill's readable_to_url method
         skill = self.kwargs['skill'].replace('_', ' ')
         context['search_results'] = (
-            create_search_result_string(self.get_queryset(), skill)
+            create_search_result_string(self.page.count, skill)
         )
 
         # if the searched skill is not a Skill, don't create a
@@ -99,24 +259,29 @@ class SearchBySkillListView(SearchViewMixin, ListView):
         except models.Skill.DoesNotExist:
             pass
 
+        suggestion = self.results.fuzzy and search.did_you_mean(
+            skill, (models.SearchTerm.SKILL,)
+        )
+        if suggestion:
+            context['did_you_mean'] = suggestion
+            context['did_you_mean_url'] = reverse(
+                'profiles:search_by_skill',
+                kwargs={'skill': suggestion.replace(' ', '_')}
+            )
+
         return context
 
-    def get_queryset(self):
-        """Filters all fields for all projects by the search term"""
+    def get_search_term(self) -> str:
+        """Gets the searched skill"""
         # See above get_context_data
-        skill = self.kwargs['skill'].replace('_', ' ')
-
-        return models.Project.objects.filter(
-            Q(
-                positions__skill__skill__contains=skill,
-                positions__filled=False,
-            )
-        ).prefetch_related('positions__skill').distinct()
+        return self.kwargs['skill'].replace('_', ' ')
 
 
 class SearchYourSkillsView(SearchViewMixin, ListView):
     """Finds all of the projects that needs the user's skills"""
     login_required = True
+    search_kind = caching.SKILL_IDS_SEARCH
+    search_function = staticmethod(find_projects_by_skill_ids)
 
     def get_context_data(self, *, object_list=None, **kwargs):
         """"Gets all skills from the database and the search_results string"""
@@ -124,33 +289,29 @@ class SearchYourSkillsView(SearchViewMixin, ListView):
 
         context['skill_selector'] = 'Your Projects'
         context['search_results'] = (
-            create_search_result_string(self.get_queryset(), 'Your Skills')
+            create_search_result_string(self.page.count, 'Your Skills')
         )
 
         return context
 
-    def get_queryset(self):
-        """Filters all fields for all projects by the search term"""
-        # The user's skills
-        skills = self.request.user.allskills.skills.all()
-
-        # Get all of the projects
-        all_projects = models.Project.objects\
-            .filter(positions__filled=False).distinct()
+    def get_search_term(self) -> str:
+        """
+        Gets the user's skills as a search term, so users with the same
+        skills share the cached results
+        """
+        skill_ids = self.request.user.allskills.skills\
+            .order_by('pk').values_list('pk', flat=True)
+        return ' '.join(str(pk) for pk in skill_ids)
 
-        # Create a list to add all the found projects to
-        found_projects = set()
-
-        for skill in skills:
-            query = all_projects.filter(
-                Q(positions__skill__skill__contains=skill))
-            # If the query is empty, do not add to found_projects
-            if len(query):
-                found_projects.add(query)
 
-        projects = []
-        for queryset in found_projects:
-            for query in queryset:
-                projects.append(query)
+def skill_autocomplete(request):
+    """
+    Finds the skills with a word starting with the 'q' query string,
+    for the skill fields' autocomplete widgets
 
-        return projects
+    :param request: Standard django request object
+    :return: JsonResponse {'skills': [{'id': pk, 'skill': name}, ...]}
+    """
+    return JsonResponse(
+        {'skills': skill_index.search(request.GET.get('q', ''))}
+    )
@@ -0,0 +1,76 @@
+"""
+The optional Jinja2 rendering of the busiest listing pages.
+
+The homepage and search results, My Projects and Applications pages loop
+over many project cards and positions, which Jinja2 renders a lot faster
+than the Django template language. With JINJA2_LISTINGS on, and Jinja2
+installed, those pages render the templates in the jinja2 directories
+instead. Every other page, and the layout they share, stays the same.
+
+The Jinja2 project cards are cached with the same keys as the Django
+{% cache %} fragments, so the engines share them.
+"""
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.cache import InvalidCacheBackendError, caches
+from django.core.cache.utils import make_template_fragment_key
+from django.template.defaultfilters import truncatechars
+from django.urls import reverse
+
+try:
+    from jinja2 import Environment
+    from markupsafe import Markup
+except ImportError:
+    # Jinja2 is only needed with JINJA2_LISTINGS on
+    Environment = Markup = None
+
+
+def listing_engine():
+    """
+    Gets the template engine the listing pages are rendered with
+
+    :return: 'jinja2', or None for the default engine
+    """
+    return 'jinja2' if getattr(settings, 'JINJA2_LISTINGS', False) else None
+
+
+def url(viewname: str, *args, **kwargs) -> str:
+    """Works like the {% url %} tag"""
+    return reverse(viewname, args=args or None, kwargs=kwargs or None)
+
+
+def cache_fragment(timeout: int, fragment_name: str, *vary_on, caller):
+    """
+    Works like the {% cache %} tag, used with {% call %}
+
+    :param timeout: How long the fragment is cached for, in seconds
+    :param fragment_name: The name of the fragment
+    :param vary_on: The values the fragment is cached for
+    :param caller: Renders the fragment, given by {% call %}
+    :return: The cached or rendered fragment
+    """
+    # Uses the same cache as the {% cache %} tag
+    try:
+        fragment_cache = caches['template_fragments']
+    except InvalidCacheBackendError:
+        fragment_cache = caches['default']
+
+    key = make_template_fragment_key(fragment_name, vary_on)
+    fragment = fragment_cache.get(key)
+    if fragment is None:
+        fragment = str(caller())
+        fragment_cache.set(key, fragment, timeout)
+    return Markup(fragment)
+
+
+def environment(**options):
+    """Creates the Jinja2 environment of the Jinja2 template backend"""
+    env = Environment(**options)
+    env.globals.update({
+        'cache_fragment': cache_fragment,
+        'static': staticfiles_storage.url,
+        'url': url,
+    })
+    env.filters['truncatechars'] = truncatechars
+    return env
@@ -0,0 +1,175 @@
+"""
+Markdown rendering for the whole site.
+
+The rendered HTML of Markdown fields is stored so pages never have to run
+the Markdown parser when they are viewed, and every render goes through a
+process wide LRU cache keyed by a hash of the Markdown. The markdownx
+preview, which renders the same text over and over while a user types,
+uses the cache through the MARKDOWNX_MARKDOWNIFY_FUNCTION setting.
+"""
+
+import hashlib
+import threading
+from collections import OrderedDict
+
+from django.conf import settings
+from django.dispatch import Signal
+
+# django-markdownx
+from markdownx.utils import markdownify as render_markdown
+
+# The most rendered Markdown texts kept in memory by each process
+MARKDOWN_CACHE_SIZE = getattr(settings, 'MARKDOWN_CACHE_SIZE', 1024)
+
+# Sent by the rerender_markdown command after it saves a batch of HTML
+# with update(), which doesn't send post_save. pks are the rows changed.
+markdown_rerendered = Signal(providing_args=['pks'])
+
+
+class MarkdownCache(object):
+    """A thread safe LRU cache of rendered Markdown, with hit statistics"""
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def _key(markdown: str) -> bytes:
+        """Hashes Markdown so long texts aren't kept twice in memory"""
+        return hashlib.sha1(markdown.encode('utf-8')).digest()
+
+    def render(self, markdown: str) -> str:
+        """
+        Gets the HTML of some Markdown, rendering it on a miss
+
+        :param markdown: Markdown text
+        :return: The rendered HTML
+        """
+        key = self._key(markdown)
+
+        with self._lock:
+            html = self._entries.get(key)
+            if html is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return html
+            self.misses += 1
+
+        # Rendered outside the lock so other threads aren't held up
+        html = render_markdown(markdown)
+
+        with self._lock:
+            self._entries[key] = html
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+        return html
+
+    def clear(self) -> None:
+        """Empties the cache and resets its statistics"""
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = self.evictions = 0
+
+    def stats(self) -> dict:
+        """
+        Gets the cache's statistics
+
+        :return: A dictionary of the size, limit, hits, misses, evictions
+        and hit rate
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'max_size': self.max_size,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': self.hits / lookups if lookups else 0,
+            }
+
+
+markdown_cache = MarkdownCache(MARKDOWN_CACHE_SIZE)
+
+
+def markdownify(markdown: str) -> str:
+    """
+    Renders Markdown to HTML through the process wide cache
+
+    :param markdown: Markdown text
+    :return: The rendered HTML
+    """
+    return markdown_cache.render(markdown)
+
+
+class RenderedMarkdownMixin(object):
+    """
+    Keeps HTML fields in sync with the Markdown fields they are rendered
+    from. markdown_fields maps each Markdown field name to the name of the
+    field holding its HTML. A field is only rendered again on save() if
+    its Markdown changed since it was loaded.
+    """
+    markdown_fields = {}
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        """Remembers the Markdown the object was loaded with"""
+        instance = super(RenderedMarkdownMixin, cls).from_db(
+            db, field_names, values
+        )
+        instance._remember_markdown()
+        return instance
+
+    def _remember_markdown(self) -> None:
+        """Remembers the current Markdown of every loaded field"""
+        self._loaded_markdown = {
+            field: self.__dict__[field] for field in self.markdown_fields
+            if field in self.__dict__
+        }
+
+    def render_markdown_fields(self, fields=None) -> list:
+        """
+        Renders the Markdown fields whose text changed into their HTML
+        fields
+
+        :param fields: Only these Markdown fields are checked, if given
+        :return: The names of the HTML fields that were rendered
+        """
+        loaded = getattr(self, '_loaded_markdown', {})
+        rendered = []
+
+        for field, html_field in self.markdown_fields.items():
+            # Deferred fields were not changed
+            if field not in self.__dict__:
+                continue
+            if fields is not None and field not in fields:
+                continue
+
+            markdown = getattr(self, field)
+            up_to_date = getattr(self, html_field) or not markdown
+            if field in loaded and loaded[field] == markdown and up_to_date:
+                continue
+
+            setattr(self, html_field, markdownify(markdown) if markdown
+                    else '')
+            rendered.append(html_field)
+
+        return rendered
+
+    def save(self, *args, **kwargs):
+        """Renders any changed Markdown before saving"""
+        update_fields = kwargs.get('update_fields')
+        rendered = self.render_markdown_fields(update_fields)
+
+        if update_fields is not None:
+            kwargs['update_fields'] = set(update_fields) | set(rendered)
+
+        super(RenderedMarkdownMixin, self).save(*args, **kwargs)
+        self._remember_markdown()
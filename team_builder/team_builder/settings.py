@@ -67,11 +67,22 @@ MIDDLEWARE = [
 
 ROOT_URLCONF = 'team_builder.urls'
 
+TEMPLATE_LOADERS = [
+    'django.template.loaders.filesystem.Loader',
+    'django.template.loaders.app_directories.Loader',
+]
+
+# Outside of DEBUG compiled templates are kept for the life of the
+# process, and wsgi.py compiles them all before the first request
+if not DEBUG:
+    TEMPLATE_LOADERS = [
+        ('django.template.loaders.cached.Loader', TEMPLATE_LOADERS),
+    ]
+
 TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
-        'DIRS': [os.path.join(BASE_DIR), 'templates'],
-        'APP_DIRS': True,
+        'DIRS': [os.path.join(BASE_DIR, 'templates')],
         'OPTIONS': {
             'context_processors': [
                 'django.template.context_processors.debug',
@@ -79,10 +90,36 @@ TEMPLATES = [
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
             ],
+            'loaders': TEMPLATE_LOADERS,
         },
     },
 ]
 
+# Renders the homepage, search, My Projects and Applications pages with
+# Jinja2, which is faster at their long lists of project cards. Needs
+# Jinja2 installed (pip install Jinja2), see jinja2_environment.py
+JINJA2_LISTINGS = False
+
+JINJA2_BACKEND = {
+    'BACKEND': 'django.template.backends.jinja2.Jinja2',
+    'DIRS': [os.path.join(BASE_DIR, 'jinja2')],
+    'APP_DIRS': True,
+    'OPTIONS': {
+        'environment': 'team_builder.jinja2_environment.environment',
+        'context_processors': [
+            'django.contrib.auth.context_processors.auth',
+        ],
+    },
+}
+
+if JINJA2_LISTINGS:
+    TEMPLATES.append(JINJA2_BACKEND)
+
+# Streams the rows of long listing pages, like the notifications, to the
+# browser STREAMING_CHUNK_SIZE rows at a time (see streaming.py)
+STREAMING_LISTINGS = False
+STREAMING_CHUNK_SIZE = 50
+
 WSGI_APPLICATION = 'team_builder.wsgi.application'
 
 
@@ -97,6 +134,45 @@ DATABASES = {
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/2.0/topics/cache/
+# The local memory cache is per process, use a shared cache such as
+# memcached in production so every worker sees the same search results
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'team_builder',
+    }
+}
+
+# How long search results are cached for, in seconds
+SEARCH_CACHE_TIMEOUT = 60 * 15
+
+# The longest the skills sidebar is cached for, in seconds. Changed skills
+# are shown at once by every process sharing the cache, and by the others
+# after this long.
+SKILLS_CACHE_TIMEOUT = 60 * 15
+
+# How long whole pages are cached for logged out visitors, in seconds.
+# PAGE_CACHE_MAX_AGE is how long browsers and proxies may keep them.
+PAGE_CACHE_TIMEOUT = 60 * 10
+PAGE_CACHE_MAX_AGE = 60
+
+# How long an expired cached page or search may still be served while
+# another request rebuilds it, in seconds
+CACHE_STALE_GRACE = 60 * 5
+
+# How many projects the homepage and search listings show per page
+PROJECTS_PER_PAGE = 20
+
+# The markdownx preview renders through the same LRU cache as the models
+MARKDOWNX_MARKDOWNIFY_FUNCTION = 'team_builder.markdown_rendering.markdownify'
+
+# How many rendered Markdown texts each process keeps in memory
+MARKDOWN_CACHE_SIZE = 1024
+
+
 # Password validation
 # https://docs.djangoproject.com/en/2.0/ref/settings/#auth-password-validators
 
@@ -154,5 +230,5 @@ EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
 
 EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
 
-# Allows base64 encoded images to be much larger
-DATA_UPLOAD_MAX_MEMORY_SIZE = 1048576000
\ No newline at end of file
+# The largest image the image editor accepts, checked before it is read
+AVATAR_MAX_UPLOAD_SIZE = 5 * 1024 * 1024
\ No newline at end of file
@@ -0,0 +1,162 @@
+"""
+Streams listing pages to the browser while their rows are rendered.
+
+A listing page is rendered as usual, except every {% streamed_for %} loop
+leaves a marker where its rows go. The page up to the first marker is
+sent straight away, then the rows are loaded and rendered STREAMING_CHUNK_SIZE
+at a time, so the browser starts on the layout and stylesheets early and
+a long list is never held in memory as one string.
+
+Streaming is turned on with the STREAMING_LISTINGS setting. Pages cached
+whole for logged out visitors are joined back together before caching.
+"""
+
+import secrets
+from itertools import islice
+
+from django.conf import settings
+from django.db.models import prefetch_related_objects
+from django.db.models.query import QuerySet
+from django.http import HttpResponse, StreamingHttpResponse
+from django.shortcuts import render
+from django.template import Context, loader
+from django.utils.safestring import mark_safe
+
+# The name of the context variable {% streamed_for %} finds a page in
+STREAMED_PAGE = 'streamed_page'
+
+
+def streaming_enabled() -> bool:
+    """Checks if listing pages are streamed"""
+    return getattr(settings, 'STREAMING_LISTINGS', False)
+
+
+def chunk_size() -> int:
+    """Gets how many rows are rendered and sent at a time"""
+    return getattr(settings, 'STREAMING_CHUNK_SIZE', 50)
+
+
+def iterate_in_chunks(items, size: int):
+    """
+    Splits rows into lists of size rows. QuerySets are read with a single
+    query through iterator(), and their prefetch_related() lookups are
+    run for each chunk.
+
+    :param items: A QuerySet or any other iterable
+    :param size: The most rows in a chunk
+    :return: A generator of lists of rows
+    """
+    lookups = ()
+    if isinstance(items, QuerySet) and items._result_cache is None:
+        # iterator() doesn't prefetch, so it is done a chunk at a time
+        lookups = items._prefetch_related_lookups
+        items = items.iterator(chunk_size=size)
+
+    iterator = iter(items)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        if lookups:
+            prefetch_related_objects(chunk, *lookups)
+        yield chunk
+
+
+class StreamedPage(object):
+    """Holds the rows of a page's {% streamed_for %} loops until it's sent"""
+
+    def __init__(self):
+        # A page's own content can't guess the markers
+        self.token = secrets.token_hex(8)
+        self.loops = []
+
+    def add_loop(self, node, items, context) -> str:
+        """
+        Saves a loop's rows and a copy of its context for later
+
+        :param node: The StreamedForNode of the loop
+        :param items: The rows the loop goes over
+        :param context: The context the loop is rendered in
+        :return: The marker rendered in place of the rows
+        """
+        marker = '<!--streamed:{}:{}-->'.format(self.token, len(self.loops))
+        self.loops.append((marker, node, items, context.flatten(),
+                           context.template, context.autoescape))
+        return mark_safe(marker)
+
+    def stream(self, html: str):
+        """
+        Sends a rendered page, with the rows of its loops in place of the
+        markers
+
+        :param html: The page rendered with markers
+        :return: A generator of strings
+        """
+        for marker, node, items, values, template, autoescape in self.loops:
+            # Loops the page didn't show, like in a block that was replaced
+            if marker not in html:
+                continue
+
+            head, html = html.split(marker, 1)
+            yield head
+
+            context = Context(values, autoescape=autoescape)
+            with context.bind_template(template):
+                yield from node.render_chunks(context, items, chunk_size())
+        yield html
+
+
+def stream_render(request, template_name, context=None, using=None):
+    """
+    Works like render(), but streams the rows of the page's
+    {% streamed_for %} loops if STREAMING_LISTINGS is on
+
+    :param request: Standard django request object
+    :param template_name: A template name, or a list of them
+    :param context: The template context
+    :param using: The name of the template engine to use
+    :return: A StreamingHttpResponse, or an HttpResponse
+    """
+    if not streaming_enabled():
+        return render(request, template_name, context, using=using)
+
+    page = StreamedPage()
+    context = dict(context or {}, **{STREAMED_PAGE: page})
+    html = loader.render_to_string(template_name, context, request, using)
+
+    # Templates without a {% streamed_for %} loop, like the Jinja2 ones
+    if not page.loops:
+        return HttpResponse(html)
+    return StreamingHttpResponse(page.stream(html))
+
+
+def join_streaming_response(response):
+    """
+    Turns a StreamingHttpResponse into an HttpResponse, for caching it
+
+    :param response: Any response
+    :return: The response, with its content joined if it was streamed
+    """
+    if not response.streaming:
+        return response
+
+    joined = HttpResponse(
+        b''.join(response.streaming_content), status=response.status_code
+    )
+    for header, value in response.items():
+        joined[header] = value
+    return joined
+
+
+class StreamingTemplateResponseMixin(object):
+    """Streams a class based view's page if STREAMING_LISTINGS is on"""
+
+    def render_to_response(self, context, **response_kwargs):
+        if not streaming_enabled():
+            return super(StreamingTemplateResponseMixin, self)\
+                .render_to_response(context, **response_kwargs)
+
+        return stream_render(
+            self.request, self.get_template_names(), context,
+            using=self.template_engine
+        )
@@ -0,0 +1,81 @@
+"""
+Compiles the project's templates when a worker starts.
+
+Outside of DEBUG the templates are loaded through Django's cached loader,
+which keeps every compiled template for the life of the process. Without
+a warm-up the first request each worker serves pays for parsing
+layout.html, nav_bar.html and the page's own templates. wsgi.py calls
+warm_templates() so that work is done before the first request arrives.
+"""
+
+import logging
+import os
+
+from django.conf import settings
+from django.template import TemplateDoesNotExist, TemplateSyntaxError, engines
+from django.template.backends.django import DjangoTemplates
+from django.template.loaders.cached import Loader as CachedLoader
+
+logger = logging.getLogger(__name__)
+
+
+def _template_dirs(loaders) -> list:
+    """Gets the template directories of some loaders inside the project"""
+    dirs = []
+    for loader in loaders:
+        if isinstance(loader, CachedLoader):
+            dirs.extend(_template_dirs(loader.loaders))
+        elif hasattr(loader, 'get_dirs'):
+            # Leaves out the admin and third party packages' templates
+            dirs.extend(
+                directory for directory in loader.get_dirs()
+                if os.path.abspath(directory).startswith(settings.BASE_DIR)
+            )
+    return dirs
+
+
+def project_template_names(engine) -> list:
+    """
+    Finds the name of every template in the project's template directories
+
+    :param engine: A django.template.Engine
+    :return: A sorted list of template names, like 'profiles/homepage.html'
+    """
+    names = set()
+    for directory in _template_dirs(engine.template_loaders):
+        for root, _, files in os.walk(directory):
+            for file in files:
+                path = os.path.join(root, file)
+                names.add(os.path.relpath(path, directory).replace(
+                    os.sep, '/'
+                ))
+    return sorted(names)
+
+
+def warm_templates() -> int:
+    """
+    Compiles every project template into the cached loaders. Engines that
+    don't cache their templates, like in DEBUG, are skipped.
+
+    :return: The number of templates compiled
+    """
+    compiled = 0
+    for backend in engines.all():
+        if not isinstance(backend, DjangoTemplates):
+            continue
+
+        engine = backend.engine
+        if not any(isinstance(loader, CachedLoader)
+                   for loader in engine.template_loaders):
+            continue
+
+        for name in project_template_names(engine):
+            try:
+                engine.get_template(name)
+            except (TemplateDoesNotExist, TemplateSyntaxError) as error:
+                # Broken templates still fail on the request that uses them
+                logger.warning('Could not compile %s: %s', name, error)
+            else:
+                compiled += 1
+
+    return compiled
@@ -0,0 +1,82 @@
+from django import template
+
+from team_builder.streaming import STREAMED_PAGE, iterate_in_chunks
+
+register = template.Library()
+
+
+class StreamedForNode(template.Node):
+    """Renders a {% streamed_for %} loop, see team_builder/streaming.py"""
+
+    def __init__(self, loop_var: str, sequence, nodelist_loop,
+                 nodelist_empty):
+        self.loop_var = loop_var
+        self.sequence = sequence
+        self.nodelist_loop = nodelist_loop
+        self.nodelist_empty = nodelist_empty
+
+    def render(self, context):
+        items = self.sequence.resolve(context, ignore_failures=True)
+        if items is None:
+            items = []
+
+        page = context.get(STREAMED_PAGE)
+        if page is not None:
+            return page.add_loop(self, items, context)
+
+        return ''.join(self.render_chunks(context, items, None))
+
+    def render_chunks(self, context, items, size):
+        """
+        Renders the loop's rows, or its {% empty %} content if there are
+        none
+
+        :param context: The context to render the rows in
+        :param items: The rows
+        :param size: How many rows to render at a time, or None for all
+        :return: A generator of rendered chunks of rows
+        """
+        chunks = iterate_in_chunks(items, size) if size else [items]
+        empty = True
+
+        for chunk in chunks:
+            rendered = []
+            for item in chunk:
+                empty = False
+                with context.push(**{self.loop_var: item}):
+                    rendered.append(self.nodelist_loop.render(context))
+            if rendered:
+                yield ''.join(rendered)
+
+        if empty and self.nodelist_empty is not None:
+            yield self.nodelist_empty.render(context)
+
+
+@register.tag
+def streamed_for(parser, token):
+    """
+    Works like {% for item in items %} with an optional {% empty %}, but
+    the rows are streamed to the browser when the page is rendered with
+    team_builder.streaming.stream_render(). It doesn't set forloop.
+
+    {% streamed_for project in projects %}
+      <tr>...</tr>
+    {% empty %}
+      <h2>There are no projects</h2>
+    {% endstreamed_for %}
+    """
+    bits = token.split_contents()
+    if len(bits) != 4 or bits[2] != 'in':
+        raise template.TemplateSyntaxError(
+            "'streamed_for' statements should look like "
+            "'streamed_for x in y': {}".format(token.contents)
+        )
+
+    sequence = parser.compile_filter(bits[3])
+    nodelist_loop = parser.parse(('empty', 'endstreamed_for'))
+    nodelist_empty = None
+    if parser.next_token().contents == 'empty':
+        nodelist_empty = parser.parse(('endstreamed_for',))
+        parser.delete_first_token()
+
+    return StreamedForNode(bits[1], sequence, nodelist_loop, nodelist_empty)
@@ -21,6 +21,8 @@ from django.urls import path
 # django-notifications
 import notifications.urls
 
+from accounts.views import serve_media
+
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('accounts/', include('accounts.urls'),),
@@ -38,4 +40,7 @@ if settings.DEBUG:
     import debug_toolbar
     urlpatterns = [
         url(r'^__debug__/', include(debug_toolbar.urls)),
+        # The web server serves uploads in production, see the README
+        url(r'^{}(?P<path>.*)$'.format(settings.MEDIA_URL.lstrip('/')),
+            serve_media, name='media'),
     ] + urlpatterns
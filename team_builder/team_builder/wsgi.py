@@ -14,3 +14,8 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "team_builder.settings")
 
 application = get_wsgi_application()
+
+# Compiles the templates before this worker serves its first request
+from team_builder.template_warmup import warm_templates  # noqa: E402
+
+warm_templates()